@@ -1,9 +1,43 @@
 import frappe
 from frappe import _
+from frappe.query_builder import Order
+from frappe.query_builder.functions import Coalesce, Min
 from frappe.translate import get_all_translations
-from frappe.utils import days_diff, format_date, format_time, today
-
+from frappe.utils import (
+	add_days,
+	cint,
+	format_date,
+	format_time,
+	get_datetime,
+	getdate,
+	now,
+	now_datetime,
+)
+from werkzeug.wrappers import Response
+
+from buzz.buzz.doctype.buzz_custom_field.buzz_custom_field import (
+	get_custom_field_definitions,
+	get_custom_field_map,
+)
+from buzz.checkin_roster import get_roster
+from buzz.events.doctype.event_check_in.event_check_in import (
+	get_attendance_counters,
+	update_live_attendance,
+)
 from buzz.payments import get_payment_gateways_for_event, get_payment_link_for_booking
+from buzz.qr import get_qr_cache_key, get_qr_image
+from buzz.ticket_token import (
+	get_ticket_validity,
+	get_verification_key,
+	is_ticket_token,
+	verify_ticket_token,
+)
+from buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code import (
+	check_coupon_rules,
+	check_coupon_usage,
+	get_coupon_rules,
+	get_coupon_usage,
+)
 from buzz.utils import is_app_installed
 
 
@@ -13,119 +47,97 @@ def get_event_payment_gateways(event: str) -> list[str]:
 	return get_payment_gateways_for_event(event)
 
 
-def is_ticket_transfer_allowed(event_id: str | int) -> bool:
-	"""Check if ticket transfer is allowed based on event start date and settings."""
-	try:
-		# Get event details
-		event = frappe.get_cached_doc("Buzz Event", event_id)
-
-		# Get event management settings
-		settings = frappe.get_single("Buzz Settings")
-
-		# Default to 7 days if no setting is found
-		transfer_cutoff_days = settings.get("allow_transfer_ticket_before_event_start_days", 7)
-
-		# Calculate days difference between today and event start date
-		event_start_date = event.start_date
-		if not event_start_date:
-			return False
-
-		# Get days remaining until event starts
-		days_until_event = days_diff(event_start_date, today())
-
-		# Transfer is allowed if there are more days remaining than the cutoff
-		return days_until_event >= transfer_cutoff_days
-
-	except Exception as e:
-		frappe.log_error(f"Error checking ticket transfer eligibility: {e!s}")
-		return False
-
-
-def is_add_on_change_allowed(event_id: str | int) -> bool:
-	"""Check if add-on changes are allowed based on event start date and settings."""
-	try:
-		# Get event details
-		event = frappe.get_cached_doc("Buzz Event", event_id)
-
-		# Get event management settings
-		settings = frappe.get_cached_doc("Buzz Settings")
-
-		# Default to 7 days if no setting is found
-		add_on_change_cutoff_days = settings.get("allow_add_ons_change_before_event_start_days", 7)
+EVENT_POLICY_CACHE_KEY = "buzz:event_policy_windows"
+# Changes attendees can make to their tickets, and the Buzz Settings field with the number of
+# days before the event start until which each stays open
+EVENT_POLICY_WINDOWS = {
+	"transfer": "allow_transfer_ticket_before_event_start_days",
+	"add_on_change": "allow_add_ons_change_before_event_start_days",
+	"cancellation_request": "allow_ticket_cancellation_request_before_event_start_days",
+}
+DEFAULT_POLICY_CUTOFF_DAYS = 7
 
-		# Calculate days difference between today and event start date
-		event_start_date = event.start_date
-		if not event_start_date:
-			return False
 
-		# Get days remaining until event starts
-		days_until_event = days_diff(event_start_date, today())
-
-		# Add-on changes are allowed if there are more days remaining than the cutoff
-		return days_until_event >= add_on_change_cutoff_days
-
-	except Exception as e:
-		frappe.log_error(f"Error checking add-on change eligibility: {e!s}")
-		return False
+@frappe.whitelist()
+def get_event_policies(event_id: str | int) -> dict:
+	"""Whether each ticket change window of an event is open now, and when it closes."""
+	current_time = now_datetime()
+	policies = {"event_id": event_id}
+	for window, closes_at in get_event_policy_windows(event_id).items():
+		policies[window] = {"allowed": bool(closes_at and current_time < closes_at), "closes_at": closes_at}
+	return policies
+
+
+def is_policy_window_open(event_id: str | int, window: str) -> bool:
+	closes_at = get_event_policy_windows(event_id)[window]
+	return bool(closes_at and now_datetime() < closes_at)
+
+
+def get_event_policy_windows(event_id: str | int) -> dict:
+	"""Cutoff datetime of each window of the event (None if it has no start date).
+
+	The cutoffs only depend on the event's start date and Buzz Settings, so they are cached
+	until either changes and each check is a comparison with the current time.
+	"""
+	windows = frappe.cache.hget(EVENT_POLICY_CACHE_KEY, str(event_id))
+	if windows is not None:
+		return windows
+
+	start_date = frappe.db.get_value("Buzz Event", event_id, "start_date")
+	settings = frappe.get_cached_doc("Buzz Settings")
+	windows = {}
+	for window, fieldname in EVENT_POLICY_WINDOWS.items():
+		cutoff_days = settings.get(fieldname)
+		if cutoff_days is None:
+			cutoff_days = DEFAULT_POLICY_CUTOFF_DAYS
+		# Open while at least `cutoff_days` remain before the start, i.e. through the end of that day
+		windows[window] = get_datetime(add_days(start_date, 1 - cutoff_days)) if start_date else None
+
+	frappe.cache.hset(EVENT_POLICY_CACHE_KEY, str(event_id), windows)
+	return windows
+
+
+def clear_event_policy_windows(doc, method=None):
+	"""Drop the cached policy windows of an event, or of all events when settings change."""
+	if doc.doctype == "Buzz Event":
+		frappe.cache.hdel(EVENT_POLICY_CACHE_KEY, str(doc.name))
+	else:
+		frappe.cache.delete_value(EVENT_POLICY_CACHE_KEY)
 
 
 @frappe.whitelist()
 def can_transfer_ticket(event_id: str | int) -> dict:
 	"""API endpoint to check if ticket transfer is allowed for an event."""
-	return {"can_transfer": is_ticket_transfer_allowed(event_id), "event_id": event_id}
+	return {"can_transfer": is_policy_window_open(event_id, "transfer"), "event_id": event_id}
 
 
 @frappe.whitelist()
 def can_change_add_ons(event_id: str | int) -> dict:
 	"""API endpoint to check if add-on changes are allowed for an event."""
-	return {"can_change_add_ons": is_add_on_change_allowed(event_id), "event_id": event_id}
-
-
-def is_cancellation_request_allowed(event_id: str | int) -> bool:
-	"""Check if cancellation request is allowed based on event start date and settings."""
-	try:
-		# Get event details
-		event = frappe.get_cached_doc("Buzz Event", event_id)
-
-		# Get event management settings
-		settings = frappe.get_cached_doc("Buzz Settings")
-
-		# Default to 7 days if no setting is found
-		cancellation_cutoff_days = settings.get(
-			"allow_ticket_cancellation_request_before_event_start_days", 7
-		)
-
-		# Calculate days difference between today and event start date
-		event_start_date = event.start_date
-		if not event_start_date:
-			return False
-
-		# Get days remaining until event starts
-		days_until_event = days_diff(event_start_date, today())
-
-		# Cancellation request is allowed if there are more days remaining than the cutoff
-		return days_until_event >= cancellation_cutoff_days
-
-	except Exception as e:
-		frappe.log_error(f"Error checking cancellation request eligibility: {e!s}")
-		return False
+	return {"can_change_add_ons": is_policy_window_open(event_id, "add_on_change"), "event_id": event_id}
 
 
 @frappe.whitelist()
 def can_request_cancellation(event_id: str | int) -> dict:
 	"""API endpoint to check if cancellation request is allowed for an event."""
-	return {"can_request_cancellation": is_cancellation_request_allowed(event_id), "event_id": event_id}
+	return {
+		"can_request_cancellation": is_policy_window_open(event_id, "cancellation_request"),
+		"event_id": event_id,
+	}
+
+
+BOOKING_PAGE_CACHE_PREFIX = "buzz:booking_page:"
+BOOKING_PAGE_CACHE_TTL = 24 * 60 * 60
 
 
 @frappe.whitelist()
 def get_event_booking_data(event_route: str) -> dict:
-	data = frappe._dict()
-	event_doc = frappe.get_cached_doc("Buzz Event", {"route": event_route})
+	data = frappe._dict(get_booking_page_static_data(event_route))
 
-	# Ticket Types
+	# Ticket Types (availability changes with every sale, so it is never cached)
 	available_ticket_types = []
 	published_ticket_types = frappe.db.get_all(
-		"Event Ticket Type", filters={"is_published": True, "event": event_doc.name}, pluck="name"
+		"Event Ticket Type", filters={"is_published": True, "event": data.event_details.name}, pluck="name"
 	)
 	for ticket_type in published_ticket_types:
 		tt = frappe.get_cached_doc("Event Ticket Type", ticket_type)
@@ -133,6 +145,22 @@ def get_event_booking_data(event_route: str) -> dict:
 			available_ticket_types.append(tt)
 	data.available_ticket_types = available_ticket_types
 
+	return data
+
+
+def get_booking_page_static_data(event_route: str) -> dict:
+	"""Return the parts of the booking page that only change when the event is edited.
+
+	Cached per route and cleared by `clear_booking_page_cache` whenever the event,
+	its add-ons or its custom fields are updated.
+	"""
+	cache_key = f"{BOOKING_PAGE_CACHE_PREFIX}{event_route}"
+	if (data := frappe.cache.get_value(cache_key)) is not None:
+		return data
+
+	data = frappe._dict()
+	event_doc = frappe.get_cached_doc("Buzz Event", {"route": event_route})
+
 	# Ticket Add-ons
 	add_ons = frappe.db.get_all(
 		"Ticket Add-on", filters={"event": event_doc.name, "enabled": 1}, fields=["*"], order_by="title"
@@ -151,23 +179,31 @@ def get_event_booking_data(event_route: str) -> dict:
 		"tax_percentage": event_doc.tax_percentage or 0,
 	}
 
-	data.event_details = event_doc
+	data.event_details = event_doc.as_dict(no_nulls=True)
 
 	# Custom Fields
-	custom_fields = frappe.db.get_all(
-		"Buzz Custom Field",
-		filters={"event": event_doc.name, "enabled": 1},
-		fields=["*"],
-		order_by="order",
-	)
-	data.custom_fields = custom_fields
+	data.custom_fields = get_custom_field_definitions(event_doc.name)
 
 	# Payment Gateways
 	data.payment_gateways = get_payment_gateways_for_event(event_doc.name)
 
+	frappe.cache.set_value(cache_key, data, expires_in_sec=BOOKING_PAGE_CACHE_TTL)
 	return data
 
 
+def clear_booking_page_cache(doc, method=None):
+	"""Drop the cached booking page of the event `doc` belongs to (hooked on update/trash)."""
+	if doc.doctype == "Buzz Event":
+		doc_before_save = doc.get_doc_before_save()
+		routes = {doc.route, doc_before_save and doc_before_save.route}
+	else:
+		routes = {frappe.db.get_value("Buzz Event", doc.event, "route")}
+
+	cache_keys = [f"{BOOKING_PAGE_CACHE_PREFIX}{route}" for route in routes if route]
+	if cache_keys:
+		frappe.cache.delete_value(cache_keys)
+
+
 @frappe.whitelist()
 def process_booking(
 	attendees: list[dict],
@@ -196,12 +232,7 @@ def process_booking(
 	# Add booking-level custom fields
 	if booking_custom_fields:
 		# Get custom field definitions for this event to get proper labels and types
-		booking_custom_field_defs = frappe.db.get_all(
-			"Buzz Custom Field",
-			filters={"event": event, "enabled": 1, "applied_to": "Booking"},
-			fields=["fieldname", "label", "fieldtype"],
-		)
-		custom_field_map = {cf["fieldname"]: cf for cf in booking_custom_field_defs}
+		custom_field_map = get_custom_field_map(event, "Booking")
 
 		for field_name, field_value in booking_custom_fields.items():
 			if field_value and field_name in custom_field_map:  # Only add non-empty values and valid fields
@@ -215,21 +246,17 @@ def process_booking(
 						"fieldtype": field_def["fieldtype"],
 					},
 				)
-	for attendee in attendees:
-		add_ons = attendee.get("add_ons", None)
-		if add_ons:
-			add_ons = create_add_on_doc(
-				attendee_name=attendee["full_name"],
-				add_ons=add_ons,
-			)
+	# Add-on records for every attendee are created in bulk, before the booking is built
+	attendee_add_ons = create_add_on_docs(attendees)
 
+	for attendee, add_ons in zip(attendees, attendee_add_ons, strict=True):
 		# Process custom fields for this attendee
 		custom_fields = attendee.get("custom_fields", {})
 		attendee_row = {
 			"full_name": attendee.get("full_name"),
 			"email": attendee.get("email"),
 			"ticket_type": attendee.get("ticket_type"),
-			"add_ons": add_ons.name if add_ons else None,
+			"add_ons": add_ons,
 			"custom_fields": custom_fields if custom_fields else None,
 		}
 
@@ -252,14 +279,83 @@ def process_booking(
 	}
 
 
-def create_add_on_doc(attendee_name: str, add_ons: list[dict]):
-	"""Create a new Attendee Ticket Add-on document."""
-	for add_on in add_ons:
-		add_on["currency"] = frappe.db.get_value("Ticket Add-on", add_on["add_on"], "currency")
+def create_add_on_docs(attendees: list[dict]) -> list[str | None]:
+	"""Create the Attendee Ticket Add-on records for all attendees at once.
+
+	Prices and currencies of the selected add-ons are resolved with a single query and
+	the records are written with two bulk inserts, so the number of round trips does
+	not grow with the number of attendees.
+
+	:return: the Attendee Ticket Add-on name for each attendee (None if no add-ons), in order
+	"""
+	add_on_names = {
+		str(add_on["add_on"]) for attendee in attendees for add_on in (attendee.get("add_ons") or [])
+	}
+	if not add_on_names:
+		return [None] * len(attendees)
+
+	add_on_details = {
+		str(add_on.name): add_on
+		for add_on in frappe.get_all(
+			"Ticket Add-on",
+			filters={"name": ("in", list(add_on_names))},
+			fields=["name", "price", "currency"],
+		)
+	}
+
+	timestamp = now()
+	user = frappe.session.user
+	standard_values = (timestamp, timestamp, user, user, 0)
+
+	add_on_doc_names, add_on_docs, add_on_rows = [], [], []
+	for attendee in attendees:
+		if not attendee.get("add_ons"):
+			add_on_doc_names.append(None)
+			continue
+
+		add_on_doc_name = frappe.generate_hash(length=10)
+		add_on_doc_names.append(add_on_doc_name)
+		add_on_docs.append((add_on_doc_name, *standard_values, attendee.get("full_name")))
+
+		for idx, add_on in enumerate(attendee["add_ons"], start=1):
+			details = add_on_details.get(str(add_on["add_on"]))
+			if not details:
+				frappe.throw(_("Add-on {0} not found").format(add_on["add_on"]), frappe.DoesNotExistError)
+
+			add_on_rows.append(
+				(
+					frappe.generate_hash(length=10),
+					*standard_values,
+					idx,
+					add_on_doc_name,
+					"Attendee Ticket Add-on",
+					"add_ons",
+					details.name,
+					add_on.get("value"),
+					details.price,
+					details.currency,
+				)
+			)
+
+	standard_fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus"]
+	frappe.db.bulk_insert("Attendee Ticket Add-on", [*standard_fields, "attendee_name"], add_on_docs)
+	frappe.db.bulk_insert(
+		"Ticket Add-on Value",
+		[
+			*standard_fields,
+			"idx",
+			"parent",
+			"parenttype",
+			"parentfield",
+			"add_on",
+			"value",
+			"price",
+			"currency",
+		],
+		add_on_rows,
+	)
 
-	return frappe.get_doc(
-		{"doctype": "Attendee Ticket Add-on", "add_ons": add_ons, "attendee_name": attendee_name}
-	).insert(ignore_permissions=True)
+	return add_on_doc_names
 
 
 @frappe.whitelist()
@@ -279,7 +375,7 @@ def transfer_ticket(ticket_id: str, new_name: str, new_email: str):
 	):
 		frappe.throw(frappe._("Not permitted to transfer this ticket."))
 
-	if not is_ticket_transfer_allowed(ticket.event):
+	if not is_policy_window_open(ticket.event, "transfer"):
 		frappe.throw(frappe._("Ticket transfer is not allowed at this time. The transfer window has closed."))
 
 	# Store old attendee info for notification
@@ -370,67 +466,16 @@ def send_ticket_transfer_emails(ticket_id: str, old_name: str, old_email: str, n
 
 @frappe.whitelist()
 def get_booking_details(booking_id: str) -> dict:
-	"""Get detailed information about a specific booking."""
+	"""Get detailed information about a specific booking.
+
+	Everything the booking page shows is read in a fixed number of queries (tickets, their
+	add-ons and the cancellation request), whatever the number of tickets.
+	"""
 	details = frappe._dict()
 	booking_doc = frappe.get_cached_doc("Event Booking", booking_id)
 	details.doc = booking_doc
 
-	tickets = frappe.db.get_all(
-		"Event Ticket",
-		filters={"booking": booking_id},
-		fields=[
-			"name",
-			"attendee_name",
-			"attendee_email",
-			"ticket_type.title as ticket_type",
-			"qr_code",
-			"event",
-			"docstatus",
-		],
-	)
-
-	add_ons = frappe.db.get_all(
-		"Ticket Add-on Value",
-		filters={"parent": ("in", [ticket.name for ticket in tickets])},
-		fields=[
-			"parent",
-			"name",
-			"add_on",
-			"value",
-			"add_on.title as add_on_title",
-			"add_on.user_selects_option as user_selects_option",
-		],
-	)
-
-	# Get available options for add-ons
-	event_add_ons = frappe.db.get_all(
-		"Ticket Add-on",
-		filters={"event": booking_doc.event, "user_selects_option": True},
-		fields=["name", "title", "user_selects_option", "options"],
-	)
-
-	add_on_options_map = {}
-	for event_add_on in event_add_ons:
-		if event_add_on.user_selects_option:
-			add_on_options_map[event_add_on.name] = (
-				event_add_on.options.split("\n") if event_add_on.options else []
-			)
-
-	for ticket in tickets:
-		ticket.add_ons = []
-		for add_on in add_ons:
-			if add_on.parent == ticket.name:
-				add_on_data = {
-					"id": add_on.name,
-					"name": add_on.add_on,
-					"title": add_on.add_on_title,
-					"value": add_on.value,
-					"user_selects_option": add_on.user_selects_option,
-					"options": add_on_options_map.get(add_on.add_on, []),
-				}
-				ticket.add_ons.append(add_on_data)
-		ticket.add_ons = sorted(ticket.add_ons, key=lambda x: x["title"])
-
+	tickets = get_booking_tickets(booking_id)
 	details.tickets = tickets
 	details.event = frappe.get_cached_doc("Buzz Event", booking_doc.event)
 
@@ -438,20 +483,10 @@ def get_booking_details(booking_id: str) -> dict:
 	if details.event.venue:
 		details.venue = frappe.get_cached_doc("Event Venue", details.event.venue)
 
-	details.can_transfer_ticket = can_transfer_ticket(details.event.name)
-	details.can_change_add_ons = can_change_add_ons(details.event.name)
-	details.can_request_cancellation = can_request_cancellation(details.event.name)
-
-	# Payment
-	frappe.db.get_all("Event Payment", filters={})
+	details.policies = get_event_policies(details.event.name)
 
 	# Check for existing cancellation request
-	existing_cancellation = frappe.db.get_value(
-		"Ticket Cancellation Request",
-		{"booking": booking_id},
-		["name", "cancel_full_booking", "creation", "status", "docstatus"],
-		as_dict=True,
-	)
+	existing_cancellation, requested_tickets = get_booking_cancellation_request(booking_id)
 	details.cancellation_request = existing_cancellation
 
 	# Determine which tickets have cancellation requested (not yet submitted/accepted)
@@ -464,11 +499,7 @@ def get_booking_details(booking_id: str) -> dict:
 			# If full booking cancellation requested, all tickets have pending cancellation
 			details.cancellation_requested_tickets = [ticket.name for ticket in tickets]
 		else:
-			# If partial cancellation requested, get specific tickets
-			requested_tickets = frappe.db.get_all(
-				"Ticket Cancellation Item", filters={"parent": existing_cancellation.name}, fields=["ticket"]
-			)
-			details.cancellation_requested_tickets = [item.ticket for item in requested_tickets]
+			details.cancellation_requested_tickets = requested_tickets
 
 	# Get list of actually cancelled tickets (docstatus = 2)
 	details.cancelled_tickets = [ticket.name for ticket in tickets if ticket.docstatus == 2]
@@ -476,6 +507,96 @@ def get_booking_details(booking_id: str) -> dict:
 	return details
 
 
+def get_booking_tickets(booking_id: str) -> list[dict]:
+	"""Tickets of a booking, each with its add-ons (and their options) sorted by title."""
+	tickets = frappe.db.get_all(
+		"Event Ticket",
+		filters={"booking": booking_id},
+		fields=[
+			"name",
+			"attendee_name",
+			"attendee_email",
+			"ticket_type.title as ticket_type",
+			"qr_code",
+			"event",
+			"docstatus",
+		],
+	)
+	if not tickets:
+		return tickets
+
+	AddOnValue = frappe.qb.DocType("Ticket Add-on Value")
+	AddOn = frappe.qb.DocType("Ticket Add-on")
+	add_ons = (
+		frappe.qb.from_(AddOnValue)
+		.left_join(AddOn)
+		.on(AddOn.name == AddOnValue.add_on)
+		.select(
+			AddOnValue.parent,
+			AddOnValue.name,
+			AddOnValue.add_on,
+			AddOnValue.value,
+			AddOn.title,
+			AddOn.user_selects_option,
+			AddOn.options,
+		)
+		.where(
+			(AddOnValue.parenttype == "Event Ticket")
+			& AddOnValue.parent.isin([ticket.name for ticket in tickets])
+		)
+		.orderby(AddOn.title)
+		.run(as_dict=True)
+	)
+
+	add_ons_by_ticket = {}
+	for add_on in add_ons:
+		options = add_on.options.split("\n") if add_on.user_selects_option and add_on.options else []
+		add_ons_by_ticket.setdefault(add_on.parent, []).append(
+			{
+				"id": add_on.name,
+				"name": add_on.add_on,
+				"title": add_on.title,
+				"value": add_on.value,
+				"user_selects_option": add_on.user_selects_option,
+				"options": options,
+			}
+		)
+
+	for ticket in tickets:
+		ticket.add_ons = add_ons_by_ticket.get(ticket.name, [])
+
+	return tickets
+
+
+def get_booking_cancellation_request(booking_id: str) -> tuple[dict | None, list[str]]:
+	"""Latest cancellation request of a booking and the tickets it asks to cancel."""
+	Request = frappe.qb.DocType("Ticket Cancellation Request")
+	Item = frappe.qb.DocType("Ticket Cancellation Item")
+	rows = (
+		frappe.qb.from_(Request)
+		.left_join(Item)
+		.on((Item.parent == Request.name) & (Item.parenttype == "Ticket Cancellation Request"))
+		.select(
+			Request.name,
+			Request.cancel_full_booking,
+			Request.creation,
+			Request.status,
+			Request.docstatus,
+			Item.ticket,
+		)
+		.where(Request.booking == booking_id)
+		.orderby(Request.modified, order=Order.desc)
+		.run(as_dict=True)
+	)
+	if not rows:
+		return None, []
+
+	request = frappe._dict(rows[0])
+	tickets = [row.ticket for row in rows if row.name == request.name and row.ticket]
+	del request["ticket"]
+	return request, tickets
+
+
 @frappe.whitelist()
 def change_add_on_preference(add_on_id: str, new_value: str):
 	"""Change the preference value for a ticket add-on."""
@@ -490,7 +611,7 @@ def change_add_on_preference(add_on_id: str, new_value: str):
 	ticket = frappe.get_cached_doc("Event Ticket", add_on_value.parent)
 
 	# Check if add-on changes are allowed for this event
-	if not is_add_on_change_allowed(ticket.event):
+	if not is_policy_window_open(ticket.event, "add_on_change"):
 		frappe.throw(
 			frappe._(
 				"Add-on changes are not allowed at this time. The change window has closed as the event is approaching."
@@ -504,53 +625,81 @@ def change_add_on_preference(add_on_id: str, new_value: str):
 		new_value,
 	)
 
+	# Add-on preferences are printed on the ticket
+	ticket.invalidate_pdf()
+
 
 @frappe.whitelist()
 def get_sponsorship_details(enquiry_id: str) -> dict:
 	"""Get detailed information about a sponsorship enquiry including event and sponsor details."""
-	# Get the sponsorship enquiry
-	enquiry = frappe.get_doc("Sponsorship Enquiry", enquiry_id)
+	Enquiry = frappe.qb.DocType("Sponsorship Enquiry")
+	Event = frappe.qb.DocType("Buzz Event")
+	Sponsor = frappe.qb.DocType("Event Sponsor")
+	SponsorTier = frappe.qb.DocType("Sponsorship Tier").as_("sponsor_tiers")
+
+	# The enquiry with its event, tier and sponsor (and the sponsor's tier) in one query
+	query, sponsors = get_sponsorship_enquiry_query()
+	enquiry = (
+		query.left_join(Sponsor)
+		.on(Sponsor.name == sponsors.sponsor)
+		.left_join(SponsorTier)
+		.on(SponsorTier.name == Sponsor.tier)
+		.select(
+			Enquiry.company_logo,
+			Enquiry.owner,
+			Event.short_description,
+			Event.about,
+			Event.start_date,
+			Event.end_date,
+			Event.venue,
+			Event.route,
+			Sponsor.name.as_("sponsor_name"),
+			Sponsor.company_name.as_("sponsor_company_name"),
+			Sponsor.company_logo.as_("sponsor_company_logo"),
+			Sponsor.creation.as_("sponsor_creation"),
+			Sponsor.event.as_("sponsor_event"),
+			Sponsor.tier.as_("sponsor_tier"),
+			Coalesce(SponsorTier.title, Sponsor.tier).as_("sponsor_tier_title"),
+		)
+		.where(Enquiry.name == enquiry_id)
+		.run(as_dict=True)
+	)
+	if not enquiry:
+		frappe.throw(_("Sponsorship Enquiry {0} not found").format(enquiry_id), frappe.DoesNotExistError)
+	enquiry = enquiry[0]
 
 	# Check if user has permission to view this enquiry
 	if enquiry.owner != frappe.session.user and not frappe.has_permission(
-		"Sponsorship Enquiry", "read", enquiry
+		"Sponsorship Enquiry", "read", enquiry_id
 	):
 		frappe.throw(frappe._("Not permitted to view this sponsorship enquiry"))
 
-	# Get tier title if tier exists
-	tier_title = ""
-	if enquiry.tier:
-		tier_title = frappe.db.get_value("Sponsorship Tier", enquiry.tier, "title") or enquiry.tier
-
 	# Get event details
 	event_details = {}
 	if enquiry.event:
-		event = frappe.get_cached_doc("Buzz Event", enquiry.event)
 		event_details = {
-			"title": event.title,
-			"short_description": getattr(event, "short_description", ""),
-			"about": getattr(event, "about", ""),
-			"start_date": event.start_date,
-			"end_date": getattr(event, "end_date", ""),
-			"venue": getattr(event, "venue", ""),
-			"route": getattr(event, "route", ""),
+			"title": enquiry.event_title,
+			"short_description": enquiry.short_description,
+			"about": enquiry.about,
+			"start_date": enquiry.start_date,
+			"end_date": enquiry.end_date,
+			"venue": enquiry.venue,
+			"route": enquiry.route,
 		}
 
 	# Check if there's a corresponding Event Sponsor
 	sponsor_details = None
-	sponsors = frappe.db.get_all(
-		"Event Sponsor",
-		filters={"enquiry": enquiry_id},
-		fields=["name", "company_name", "company_logo", "creation", "event", "tier"],
-		limit=1,
-	)
-
-	if sponsors:
-		sponsor_details = sponsors[0]
-		# Get sponsor tier title too
-		if sponsor_details.get("tier"):
-			sponsor_tier_title = frappe.db.get_value("Sponsorship Tier", sponsor_details["tier"], "title")
-			sponsor_details["tier_title"] = sponsor_tier_title or sponsor_details["tier"]
+	if enquiry.sponsor_name:
+		sponsor_details = frappe._dict(
+			name=enquiry.sponsor_name,
+			company_name=enquiry.sponsor_company_name,
+			company_logo=enquiry.sponsor_company_logo,
+			creation=enquiry.sponsor_creation,
+			event=enquiry.sponsor_event,
+			tier=enquiry.sponsor_tier,
+		)
+		if enquiry.sponsor_tier:
+			sponsor_details.tier_title = enquiry.sponsor_tier_title
 
 	return {
 		"enquiry": {
@@ -559,7 +708,7 @@ def get_sponsorship_details(enquiry_id: str) -> dict:
 			"company_logo": enquiry.company_logo,
 			"event": enquiry.event,
 			"tier": enquiry.tier,
-			"tier_title": tier_title,
+			"tier_title": enquiry.tier_title,
 			"status": enquiry.status,
 			"creation": enquiry.creation,
 			"owner": enquiry.owner,
@@ -570,45 +719,86 @@ def get_sponsorship_details(enquiry_id: str) -> dict:
 	}
 
 
-@frappe.whitelist()
-def get_user_sponsorship_inquiries() -> list:
-	"""Get all sponsorship inquiries for the current user."""
-	inquiries = frappe.db.get_all(
-		"Sponsorship Enquiry",
-		filters={"owner": frappe.session.user},
-		fields=["name", "company_name", "event", "tier", "status", "creation"],
-		order_by="creation desc",
-	)
+SPONSORSHIP_INQUIRIES_PAGE_LENGTH = 50
+MAX_SPONSORSHIP_INQUIRIES_PAGE_LENGTH = 500
 
-	# Get event titles and tier titles
-	for inquiry in inquiries:
-		if inquiry.event:
-			event_title = frappe.db.get_value("Buzz Event", inquiry.event, "title")
-			inquiry["event_title"] = event_title
 
-		if inquiry.tier:
-			tier_title = frappe.db.get_value("Sponsorship Tier", inquiry.tier, "title")
-			inquiry["tier_title"] = tier_title or inquiry.tier
-		else:
-			inquiry["tier_title"] = ""
-
-	# Check which inquiries have corresponding sponsors
-	inquiry_names = [inquiry.name for inquiry in inquiries]
-	if inquiry_names:
-		sponsors = frappe.db.get_all(
-			"Event Sponsor",
-			filters={"enquiry": ["in", inquiry_names]},
-			fields=["enquiry"],
+@frappe.whitelist()
+def get_user_sponsorship_inquiries(cursor: str | None = None, page_length: int | None = None) -> dict:
+	"""Get the sponsorship inquiries of the current user, newest first, a page at a time.
+
+	Returns `{"inquiries", "next_cursor"}`; pass `next_cursor` back to get the next page.
+	"""
+	page_length = min(
+		cint(page_length) or SPONSORSHIP_INQUIRIES_PAGE_LENGTH, MAX_SPONSORSHIP_INQUIRIES_PAGE_LENGTH
+	)
+	Enquiry = frappe.qb.DocType("Sponsorship Enquiry")
+
+	query, sponsors = get_sponsorship_enquiry_query()
+	query = (
+		query.select(sponsors.sponsor)
+		.where(Enquiry.owner == frappe.session.user)
+		.orderby(Enquiry.creation, order=Order.desc)
+		.orderby(Enquiry.name, order=Order.desc)
+		.limit(page_length + 1)
+	)
+	if cursor:
+		# Keyset on (creation, name), so later pages cost the same as the first
+		creation, name = cursor.rsplit("|", 1)
+		query = query.where(
+			(Enquiry.creation < creation) | ((Enquiry.creation == creation) & (Enquiry.name < name))
 		)
-		sponsored_inquiries = {sponsor.enquiry for sponsor in sponsors}
 
-		for inquiry in inquiries:
-			inquiry["has_sponsor"] = inquiry.name in sponsored_inquiries
-	else:
-		for inquiry in inquiries:
-			inquiry["has_sponsor"] = False
+	inquiries = query.run(as_dict=True)
+	next_cursor = None
+	if len(inquiries) > page_length:
+		inquiries = inquiries[:page_length]
+		next_cursor = f"{inquiries[-1].creation}|{inquiries[-1].name}"
 
-	return inquiries
+	for inquiry in inquiries:
+		inquiry.has_sponsor = bool(inquiry.pop("sponsor"))
+
+	return {"inquiries": inquiries, "next_cursor": next_cursor}
+
+
+def get_sponsorship_enquiry_query():
+	"""Enquiries joined with their event and tier titles and their sponsor, if any.
+
+	Returns the query and the joined sponsors subquery (with the `sponsor` name).
+	"""
+	Enquiry = frappe.qb.DocType("Sponsorship Enquiry")
+	Event = frappe.qb.DocType("Buzz Event")
+	Tier = frappe.qb.DocType("Sponsorship Tier")
+	Sponsor = frappe.qb.DocType("Event Sponsor")
+
+	# One sponsor per enquiry, so joining it does not repeat enquiries
+	sponsors = (
+		frappe.qb.from_(Sponsor)
+		.select(Sponsor.enquiry, Min(Sponsor.name).as_("sponsor"))
+		.where(Sponsor.enquiry.isnotnull())
+		.groupby(Sponsor.enquiry)
+	).as_("sponsors")
+
+	query = (
+		frappe.qb.from_(Enquiry)
+		.left_join(Event)
+		.on(Event.name == Enquiry.event)
+		.left_join(Tier)
+		.on(Tier.name == Enquiry.tier)
+		.left_join(sponsors)
+		.on(sponsors.enquiry == Enquiry.name)
+		.select(
+			Enquiry.name,
+			Enquiry.company_name,
+			Enquiry.event,
+			Enquiry.tier,
+			Enquiry.status,
+			Enquiry.creation,
+			Event.title.as_("event_title"),
+			Coalesce(Tier.title, Enquiry.tier, "").as_("tier_title"),
+		)
+	)
+	return query, sponsors
 
 
 @frappe.whitelist()
@@ -721,15 +911,7 @@ def get_ticket_details(ticket_id: str) -> dict:
 		details.booking = None
 
 	details.ticket_type = frappe.get_cached_doc("Event Ticket Type", ticket_doc.ticket_type)
-	details.can_transfer_ticket = (
-		can_transfer_ticket(details.event.name) if details.event else {"can_transfer": False}
-	)
-	details.can_change_add_ons = (
-		can_change_add_ons(details.event.name) if details.event else {"can_change_add_ons": False}
-	)
-	details.can_request_cancellation = (
-		can_request_cancellation(details.event.name) if details.event else {"can_request_cancellation": False}
-	)
+	details.policies = get_event_policies(details.event.name)
 
 	# Get Zoom webinar join URL if applicable
 	details.zoom_join_url = None
@@ -747,6 +929,38 @@ def get_ticket_details(ticket_id: str) -> dict:
 	return details
 
 
+@frappe.whitelist()
+def download_ticket_pdf(ticket_id: str):
+	"""Download the stored PDF of a ticket."""
+	ticket_doc = frappe.get_doc("Event Ticket", ticket_id)
+
+	if frappe.session.user != "Administrator":
+		# Verify the ticket belongs to the current user
+		if ticket_doc.attendee_email != frappe.session.user:
+			frappe.throw(frappe._("Not permitted to view this ticket"))
+
+	frappe.local.response.filename = f"ticket-{ticket_doc.name}.pdf"
+	frappe.local.response.filecontent = ticket_doc.get_pdf()
+	frappe.local.response.type = "pdf"
+
+
+TICKET_QR_CODE_MAX_AGE = 7 * 24 * 60 * 60
+
+
+@frappe.whitelist(allow_guest=True, methods=["GET"])
+def get_ticket_qr_code(ticket: str):
+	"""Serve the QR code image of a ticket that generates it on demand.
+
+	The image only encodes the ticket's own payload, so it is safe to serve to guests
+	(email clients and PDF renderers fetch it without a session).
+	"""
+	payload = frappe.get_doc("Event Ticket", ticket).get_qr_payload()
+	response = Response(get_qr_image(payload), mimetype="image/png")
+	response.headers["Cache-Control"] = f"public, max-age={TICKET_QR_CODE_MAX_AGE}"
+	response.set_etag(get_qr_cache_key(payload))
+	return response.make_conditional(frappe.request)
+
+
 @frappe.whitelist()
 def create_cancellation_request(booking_id: str, ticket_ids: list | None = None) -> dict:
 	"""Create a cancellation request for a booking and optionally specific tickets."""
@@ -760,7 +974,7 @@ def create_cancellation_request(booking_id: str, ticket_ids: list | None = None)
 		frappe.throw(frappe._("Not permitted to request cancellation for this booking."))
 
 	# Check if cancellation request is allowed for this event
-	if not is_cancellation_request_allowed(booking_doc.event):
+	if not is_policy_window_open(booking_doc.event, "cancellation_request"):
 		frappe.throw("Cancellation requests are no longer allowed for this event.")
 
 	# Check if a cancellation request already exists for this booking
@@ -815,13 +1029,25 @@ def get_user_info() -> dict:
 
 
 @frappe.whitelist()
-def validate_ticket_for_checkin(ticket_id: str) -> dict:
+def validate_ticket_for_checkin(ticket_id: str, event: str | None = None) -> dict:
+	"""Validate a scanned ticket id or signed QR token, optionally for the event at the desk."""
 	frappe.only_for("Frontdesk Manager", True)
+
+	# Forged, wrong event and expired tokens are turned away before any lookup
+	if is_ticket_token(ticket_id):
+		claims, error = verify_ticket_token(ticket_id, event=event)
+		if not claims:
+			frappe.throw(error)
+		ticket_id = claims.ticket
+
 	if not frappe.db.exists("Event Ticket", ticket_id):
 		frappe.throw(_("Ticket not found"))
 
 	ticket_doc = frappe.get_cached_doc("Event Ticket", ticket_id)
 
+	if event and str(ticket_doc.event) != str(event):
+		frappe.throw(_("This ticket is for a different event"))
+
 	if ticket_doc.docstatus == 2:
 		frappe.throw(_("This ticket has been cancelled and cannot be checked in"))
 
@@ -910,7 +1136,7 @@ def checkin_ticket(ticket_id: str) -> dict:
 
 	# Create check-in record
 	checkin_doc = frappe.new_doc("Event Check In")
-	checkin_doc.ticket = ticket_id
+	checkin_doc.ticket = validation_result["ticket"]["id"]
 	checkin_doc.date = checkin_date
 	checkin_doc.insert(ignore_permissions=True)
 	checkin_doc.submit()
@@ -929,6 +1155,166 @@ def checkin_ticket(ticket_id: str) -> dict:
 	}
 
 
+# Scans a scanner can sync in one request
+MAX_CHECKIN_SYNC_BATCH = 500
+
+
+@frappe.whitelist()
+def sync_checkins(scans: list[dict], event: str | None = None) -> dict:
+	"""Check in a batch of scans buffered by a scanner, e.g. while it was offline.
+
+	Each scan is `{"ticket_id", "scanned_at", "client_id"}`, where the ticket id may be a
+	signed QR token, and is checked in for the day it was scanned. Scans dated before the
+	ticket could be used (see `get_ticket_validity`) are rejected. Existing check-ins are
+	found in one query and new ones are inserted in bulk, so a burst of scans costs a few
+	queries. Returns a result per scan, in order.
+	"""
+	frappe.only_for("Frontdesk Manager", True)
+
+	scans = frappe.parse_json(scans) or []
+	if len(scans) > MAX_CHECKIN_SYNC_BATCH:
+		frappe.throw(_("Cannot sync more than {0} scans at once").format(MAX_CHECKIN_SYNC_BATCH))
+
+	current_time = now_datetime()
+	for scan in scans:
+		scan["ticket_id"] = str(scan.get("ticket_id") or "").strip()
+		# Clocks of offline devices drift, a scan can not be from the future
+		scan["scanned_at"] = min(get_datetime(scan.get("scanned_at") or current_time), current_time)
+		scan["date"] = getdate(scan["scanned_at"])
+
+		if is_ticket_token(scan["ticket_id"]):
+			claims, scan["error"] = verify_ticket_token(scan["ticket_id"], event=event, on_date=scan["date"])
+			scan["ticket_id"] = claims.ticket if claims else ""
+
+	tickets, checked_in, valid_from = {}, set(), {}
+	ticket_ids = list({scan["ticket_id"] for scan in scans if scan["ticket_id"]})
+	if ticket_ids:
+		tickets = {
+			ticket.name: ticket
+			for ticket in frappe.get_all(
+				"Event Ticket",
+				filters={"name": ("in", ticket_ids)},
+				fields=["name", "event", "ticket_type", "attendee_name", "docstatus"],
+			)
+		}
+
+	if tickets:
+		# Clocks of offline devices drift the other way too, nothing is scanned before the event
+		for event_row in frappe.get_all(
+			"Buzz Event",
+			filters={
+				"name": ("in", list({ticket.event for ticket in tickets.values()})),
+				"start_date": ("is", "set"),
+			},
+			fields=["name", "start_date", "end_date"],
+		):
+			valid_from[event_row.name] = getdate(
+				get_ticket_validity(event_row.start_date, event_row.end_date)[0]
+			)
+
+		existing_checkins = frappe.get_all(
+			"Event Check In",
+			filters={
+				"ticket": ("in", list(tickets)),
+				"date": ("in", list({scan["date"] for scan in scans})),
+				"docstatus": ("!=", 2),
+			},
+			fields=["ticket", "date"],
+		)
+		checked_in = {(row.ticket, row.date) for row in existing_checkins}
+
+	results, new_checkins, live_attendance = [], [], {}
+	for scan in scans:
+		ticket = tickets.get(scan["ticket_id"])
+		result = {"client_id": scan.get("client_id"), "ticket_id": scan["ticket_id"]}
+		results.append(result)
+
+		if scan.get("error"):
+			result.update(status="invalid", message=scan["error"])
+		elif not ticket:
+			result.update(status="not_found", message=_("Ticket not found"))
+		elif event and str(ticket.event) != str(event):
+			result.update(status="invalid", message=_("This ticket is for a different event"))
+		elif ticket.docstatus == 2:
+			result.update(
+				status="cancelled", message=_("This ticket has been cancelled and cannot be checked in")
+			)
+		elif ticket.docstatus == 0:
+			result.update(
+				status="not_confirmed",
+				message=_("This ticket is not confirmed and cannot be used for check-in"),
+			)
+		elif ticket.event in valid_from and scan["date"] < valid_from[ticket.event]:
+			result.update(
+				status="invalid",
+				message=_("This ticket is not valid before {0}").format(
+					frappe.format(valid_from[ticket.event], {"fieldtype": "Date"})
+				),
+			)
+		elif (ticket.name, scan["date"]) in checked_in:
+			result.update(status="already_checked_in", message=_("This ticket was already checked in"))
+		else:
+			# Later scans of the same ticket and day in this batch are duplicates
+			checked_in.add((ticket.name, scan["date"]))
+			new_checkins.append((ticket, scan))
+			counters = live_attendance.setdefault(ticket.event, {})
+			key = (str(scan["date"]), str(ticket.ticket_type))
+			counters[key] = counters.get(key, 0) + 1
+			result.update(
+				status="checked_in",
+				message=_("Successfully checked in {0}").format(ticket.attendee_name),
+				attendee_name=ticket.attendee_name,
+				check_in_date=scan["date"],
+			)
+
+	if new_checkins:
+		user = frappe.session.user
+		frappe.db.bulk_insert(
+			"Event Check In",
+			["name", "ticket", "event", "date", "docstatus", "creation", "modified", "owner", "modified_by"],
+			[
+				(
+					frappe.generate_hash(length=10),
+					ticket.name,
+					ticket.event,
+					scan["date"],
+					1,
+					scan["scanned_at"],
+					current_time,
+					user,
+					user,
+				)
+				for ticket, scan in new_checkins
+			],
+		)
+
+	for ticket_event, deltas in live_attendance.items():
+		update_live_attendance(ticket_event, deltas)
+
+	return {"results": results}
+
+
+@frappe.whitelist()
+def get_ticket_verification_key() -> str:
+	"""Public key for scanners to verify signed ticket QR codes on the device."""
+	frappe.only_for("Frontdesk Manager", True)
+	return get_verification_key()
+
+
+@frappe.whitelist()
+def get_checkin_roster(event: str, since: str | None = None) -> dict:
+	"""Roster of the event for scanners to validate tickets locally, or its changes since a version."""
+	frappe.only_for("Frontdesk Manager", True)
+	return get_roster(event, since)
+
+
+@frappe.whitelist()
+def get_live_attendance(event: str) -> dict:
+	"""Attendees checked in per day and ticket type, from live counters (no report recompute)."""
+	frappe.only_for(["Frontdesk Manager", "Event Manager"], True)
+	return get_attendance_counters(event)
+
+
 @frappe.whitelist()
 def get_enabled_languages():
 	"""Get all enabled languages from the Language doctype."""
@@ -966,43 +1352,40 @@ def has_app_permission():
 
 @frappe.whitelist()
 def validate_coupon(coupon_code: str, event: str) -> dict:
-	if not frappe.db.exists("Buzz Coupon Code", coupon_code):
+	rules = get_coupon_rules(coupon_code)
+	if not rules:
 		return {"valid": False, "error": _("Invalid coupon code")}
 
-	coupon = frappe.get_doc("Buzz Coupon Code", coupon_code)
-
-	is_valid, error = coupon.is_valid_for_event(event)
+	is_valid, error = check_coupon_rules(rules, event)
 	if not is_valid:
 		return {"valid": False, "error": error}
 
-	is_available, error = coupon.is_usage_available()
+	# Only the usage counters are read from the database
+	usage = get_coupon_usage(rules.code, frappe.session.user)
+	is_available, error = check_coupon_usage(rules, usage)
 	if not is_available:
 		return {"valid": False, "error": error}
 
-	is_limited, error = coupon.is_user_limit_reached()
-	if is_limited:
-		return {"valid": False, "error": error}
-
-	if coupon.coupon_type == "Discount":
+	if rules.coupon_type == "Discount":
 		return {
 			"valid": True,
 			"coupon_type": "Discount",
-			"discount_type": coupon.discount_type,
-			"discount_value": coupon.discount_value,
-			"max_discount_amount": coupon.maximum_discount_amount or 0,
-			"min_order_value": coupon.minimum_order_value or 0,
+			"discount_type": rules.discount_type,
+			"discount_value": rules.discount_value,
+			"max_discount_amount": rules.maximum_discount_amount,
+			"min_order_value": rules.minimum_order_value,
 		}
 
-	remaining = coupon.number_of_free_tickets - coupon.free_tickets_claimed
+	remaining = rules.number_of_free_tickets - usage.free_tickets_claimed
 	if remaining <= 0:
 		return {"valid": False, "error": _("All free tickets have been claimed")}
 
 	return {
 		"valid": True,
 		"coupon_type": "Free Tickets",
-		"ticket_type": coupon.ticket_type,
+		"ticket_type": rules.ticket_type,
 		"remaining_tickets": remaining,
-		"free_add_ons": [a.add_on for a in coupon.free_add_ons],
+		"free_add_ons": rules.free_add_ons,
 	}
 
 
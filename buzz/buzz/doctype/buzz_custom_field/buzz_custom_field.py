@@ -4,6 +4,8 @@
 import frappe
 from frappe.model.document import Document
 
+CUSTOM_FIELDS_CACHE_KEY = "buzz:event_custom_fields"
+
 
 class BuzzCustomField(Document):
 	# begin: auto-generated types
@@ -30,3 +32,46 @@ class BuzzCustomField(Document):
 	def validate(self):
 		if not self.fieldname:
 			self.fieldname = frappe.scrub(self.label)
+
+	def on_update(self):
+		self.clear_event_cache()
+
+	def on_trash(self):
+		self.clear_event_cache()
+
+	def clear_event_cache(self):
+		events = {self.event}
+		if doc_before_save := self.get_doc_before_save():
+			events.add(doc_before_save.event)
+
+		for event in events:
+			frappe.cache.hdel(CUSTOM_FIELDS_CACHE_KEY, str(event))
+
+
+def get_custom_field_definitions(event: str | int, applied_to: str | None = None) -> list[dict]:
+	"""Return the enabled custom fields of an event, ordered for display.
+
+	Definitions are cached per event in Redis (and memoized for the request by the
+	cache layer), so callers can look them up once per attendee without extra queries.
+
+	:param applied_to: "Booking" or "Ticket" to only return fields applied to that doctype
+	"""
+	custom_fields = frappe.cache.hget(
+		CUSTOM_FIELDS_CACHE_KEY,
+		str(event),
+		generator=lambda: frappe.get_all(
+			"Buzz Custom Field",
+			filters={"event": event, "enabled": 1},
+			fields=["*"],
+			order_by="order asc",
+		),
+	)
+
+	if applied_to:
+		return [cf for cf in custom_fields if cf.applied_to == applied_to]
+	return custom_fields
+
+
+def get_custom_field_map(event: str | int, applied_to: str) -> dict[str, dict]:
+	"""Return enabled custom fields of an event applied to `applied_to`, keyed by fieldname."""
+	return {cf.fieldname: cf for cf in get_custom_field_definitions(event, applied_to)}
@@ -1,9 +1,15 @@
 # Copyright (c) 2025, BWH Studios and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests import IntegrationTestCase
 
+from buzz.buzz.doctype.buzz_custom_field.buzz_custom_field import (
+	CUSTOM_FIELDS_CACHE_KEY,
+	get_custom_field_definitions,
+	get_custom_field_map,
+)
+
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
 # Use these module variables to add/remove to/from that list
@@ -17,4 +23,47 @@ class IntegrationTestBuzzCustomField(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def setUp(self):
+		self.test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+
+	def tearDown(self):
+		frappe.db.rollback()
+		# The cache lives in Redis, which is not rolled back with the test
+		frappe.cache.hdel(CUSTOM_FIELDS_CACHE_KEY, str(self.test_event.name))
+
+	def _create_custom_field(self, label, applied_to="Ticket"):
+		return frappe.get_doc(
+			{
+				"doctype": "Buzz Custom Field",
+				"event": self.test_event.name,
+				"label": label,
+				"fieldtype": "Data",
+				"applied_to": applied_to,
+				"enabled": 1,
+			}
+		).insert()
+
+	def test_definitions_are_filtered_by_applied_to(self):
+		self._create_custom_field("Company", applied_to="Booking")
+		self._create_custom_field("T-Shirt Size", applied_to="Ticket")
+
+		self.assertIn("company", get_custom_field_map(self.test_event.name, "Booking"))
+		self.assertNotIn("company", get_custom_field_map(self.test_event.name, "Ticket"))
+		self.assertIn("t_shirt_size", get_custom_field_map(self.test_event.name, "Ticket"))
+
+	def test_definitions_are_cached_and_invalidated_on_save(self):
+		custom_field = self._create_custom_field("Dietary Preference")
+		fieldnames = [cf.fieldname for cf in get_custom_field_definitions(self.test_event.name)]
+		self.assertIn("dietary_preference", fieldnames)
+
+		# Cached lookups should not hit the database again
+		with self.assertQueryCount(0):
+			get_custom_field_definitions(self.test_event.name)
+
+		custom_field.enabled = 0
+		custom_field.save()
+		fieldnames = [cf.fieldname for cf in get_custom_field_definitions(self.test_event.name)]
+		self.assertNotIn("dietary_preference", fieldnames)
+
+		custom_field.delete()
+		self.assertNotIn("dietary_preference", get_custom_field_map(self.test_event.name, "Ticket"))
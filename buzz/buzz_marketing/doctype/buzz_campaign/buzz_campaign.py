@@ -5,7 +5,8 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 
-from buzz.utils import generate_qr_code_file, is_app_installed
+from buzz.qr import generate_qr_code_file
+from buzz.utils import is_app_installed
 
 
 class BuzzCampaign(Document):
@@ -0,0 +1,131 @@
+import frappe
+from frappe.utils import add_to_date, getdate, now_datetime
+
+ROSTER_CACHE_PREFIX = "buzz:checkin_roster:"
+# A full roster is built once and shared by all scanners of the event for this long
+ROSTER_SNAPSHOT_TTL = 5 * 60
+# Rows committed by slower transactions can carry a slightly older `modified`, so deltas overlap
+ROSTER_DELTA_OVERLAP = 60
+
+
+def get_roster(event: str, since: str | None = None) -> dict:
+	"""Roster of the event's tickets for today, or only the tickets changed since a version.
+
+	Returns `{"event", "version", "full", "tickets"}` (and `ticket_types` with a full roster). Scanners
+	keep the version and ask for the changes since it. A version from another day gets the
+	full roster again, as check-in state is per day.
+	"""
+	version = now_datetime()
+	if since and getdate(since) == getdate(version):
+		tickets = get_roster_entries(event, get_changed_tickets(event, since))
+		return {"event": event, "version": str(version), "full": False, "tickets": tickets}
+
+	snapshot = get_roster_snapshot(event, version)
+	tickets = {ticket["id"]: ticket for ticket in snapshot["tickets"]}
+	# The snapshot may be a few minutes old, bring it up to date
+	for ticket in get_roster_entries(event, get_changed_tickets(event, snapshot["version"])):
+		tickets[ticket["id"]] = ticket
+
+	return {
+		"event": event,
+		"version": str(version),
+		"full": True,
+		"tickets": list(tickets.values()),
+		"ticket_types": dict(
+			frappe.get_all(
+				"Event Ticket Type", filters={"event": event}, fields=["name", "title"], as_list=True
+			)
+		),
+	}
+
+
+def get_roster_snapshot(event: str, now) -> dict:
+	key = f"{ROSTER_CACHE_PREFIX}{event}"
+	snapshot = frappe.cache.get_value(key)
+	if not snapshot or getdate(snapshot["version"]) != getdate(now):
+		snapshot = {"version": str(now), "tickets": get_roster_entries(event)}
+		frappe.cache.set_value(key, snapshot, expires_in_sec=ROSTER_SNAPSHOT_TTL)
+	return snapshot
+
+
+def get_changed_tickets(event: str, since: str) -> list[str]:
+	"""Tickets of the event whose details, add-ons or check-in state for today changed since."""
+	since = add_to_date(since, seconds=-ROSTER_DELTA_OVERLAP)
+	Ticket = frappe.qb.DocType("Event Ticket")
+	AddOnValue = frappe.qb.DocType("Ticket Add-on Value")
+	CheckIn = frappe.qb.DocType("Event Check In")
+
+	queries = (
+		frappe.qb.from_(Ticket)
+		.select(Ticket.name)
+		.where((Ticket.event == event) & (Ticket.modified > since)),
+		frappe.qb.from_(AddOnValue)
+		.join(Ticket)
+		.on(AddOnValue.parent == Ticket.name)
+		.select(Ticket.name)
+		.where(
+			(Ticket.event == event)
+			& (AddOnValue.parenttype == "Event Ticket")
+			& (AddOnValue.modified > since)
+		),
+		frappe.qb.from_(CheckIn)
+		.select(CheckIn.ticket)
+		.where((CheckIn.event == event) & (CheckIn.date == getdate()) & (CheckIn.modified > since)),
+	)
+	return list({name for query in queries for name in query.run(pluck=True)})
+
+
+def get_roster_entries(event: str, tickets: list[str] | None = None) -> list[dict]:
+	"""Compact roster entries for the event's confirmed and cancelled tickets (or only `tickets`)."""
+	if tickets is not None and not tickets:
+		return []
+
+	Ticket = frappe.qb.DocType("Event Ticket")
+	AddOnValue = frappe.qb.DocType("Ticket Add-on Value")
+	AddOn = frappe.qb.DocType("Ticket Add-on")
+	CheckIn = frappe.qb.DocType("Event Check In")
+
+	conditions = (Ticket.event == event) & (Ticket.docstatus != 0)
+	if tickets is not None:
+		conditions &= Ticket.name.isin(tickets)
+
+	rows = (
+		frappe.qb.from_(Ticket)
+		.select(Ticket.name, Ticket.attendee_name, Ticket.ticket_type, Ticket.docstatus)
+		.where(conditions)
+		.run(as_dict=True)
+	)
+
+	add_ons = {}
+	for add_on in (
+		frappe.qb.from_(AddOnValue)
+		.join(Ticket)
+		.on(AddOnValue.parent == Ticket.name)
+		.join(AddOn)
+		.on(AddOn.name == AddOnValue.add_on)
+		.select(AddOnValue.parent, AddOn.title, AddOnValue.value)
+		.where(conditions & (AddOnValue.parenttype == "Event Ticket"))
+		.run(as_dict=True)
+	):
+		add_ons.setdefault(add_on.parent, {})[add_on.title] = add_on.value
+
+	checked_in = set(
+		frappe.qb.from_(CheckIn)
+		.join(Ticket)
+		.on(CheckIn.ticket == Ticket.name)
+		.select(CheckIn.ticket)
+		.where(conditions & (CheckIn.date == getdate()) & (CheckIn.docstatus == 1))
+		.run(pluck=True)
+	)
+
+	return [
+		{
+			"id": row.name,
+			"attendee_name": row.attendee_name,
+			"ticket_type": row.ticket_type,
+			"cancelled": row.docstatus == 2,
+			"add_ons": add_ons.get(row.name, {}),
+			"checked_in": row.name in checked_in,
+		}
+		for row in rows
+	]
@@ -158,6 +158,22 @@ class BuzzEvent(Document):
 
 	def on_update(self):
 		self.update_zoom_webinar()
+		self.refresh_ticket_qr_codes()
+
+	def refresh_ticket_qr_codes(self):
+		"""Ticket QR codes are signed with the event's dates, so reissue them when the dates move."""
+		if not self.get_doc_before_save():
+			return
+
+		if self.has_value_changed("start_date") or self.has_value_changed("end_date"):
+			frappe.enqueue(
+				"buzz.ticketing.doctype.event_ticket.event_ticket.refresh_ticket_qr_codes",
+				queue="long",
+				job_id=f"refresh_ticket_qr_codes::{self.name}",
+				deduplicate=True,
+				enqueue_after_commit=True,
+				event=self.name,
+			)
 
 	@only_if_app_installed("zoom_integration")
 	def update_zoom_webinar(self):
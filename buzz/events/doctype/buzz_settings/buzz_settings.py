@@ -19,11 +19,14 @@ class BuzzSettings(Document):
 		allow_ticket_cancellation_request_before_event_start_days: DF.Int
 		allow_transfer_ticket_before_event_start_days: DF.Int
 		auto_send_pitch_deck: DF.Check
+		background_ticket_generation_threshold: DF.Int
 		default_sponsor_deck_cc: DF.SmallText | None
 		default_sponsor_deck_email_template: DF.Link | None
 		default_sponsor_deck_reply_to: DF.Data
 		default_ticket_email_template: DF.Link | None
+		generate_ticket_qr_on_demand: DF.Check
 		support_email: DF.Data | None
+		ticket_hold_minutes: DF.Int
 	# end: auto-generated types
 
 	def validate(self):
@@ -1,8 +1,11 @@
 # Copyright (c) 2025, BWH Studios and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, get_datetime, today
+
+from buzz.api import EVENT_POLICY_CACHE_KEY, get_event_policies
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -17,4 +20,30 @@ class IntegrationTestBuzzSettings(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def tearDown(self):
+		frappe.db.rollback()
+		frappe.cache.delete_value(EVENT_POLICY_CACHE_KEY)
+
+	def test_policy_windows_follow_event_and_settings(self):
+		event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		event.start_date = add_days(today(), 10)
+		event.end_date = event.start_date
+		event.save()
+
+		settings = frappe.get_single("Buzz Settings")
+		settings.allow_transfer_ticket_before_event_start_days = 7
+		settings.save()
+
+		policies = get_event_policies(event.name)
+		self.assertTrue(policies["transfer"]["allowed"])
+		# Open through the last day with 7 days left before the start
+		self.assertEqual(policies["transfer"]["closes_at"], get_datetime(add_days(event.start_date, -6)))
+
+		settings.allow_transfer_ticket_before_event_start_days = 11
+		settings.save()
+		self.assertFalse(get_event_policies(event.name)["transfer"]["allowed"])
+
+		event.start_date = add_days(today(), 30)
+		event.end_date = event.start_date
+		event.save()
+		self.assertTrue(get_event_policies(event.name)["transfer"]["allowed"])
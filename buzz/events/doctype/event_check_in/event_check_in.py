@@ -2,7 +2,15 @@
 # For license information, please see license.txt
 
 import frappe
+import redis
 from frappe.model.document import Document
+from frappe.query_builder.functions import Count
+
+# Hash of "date|ticket type" -> attendees checked in, per event
+LIVE_ATTENDANCE_CACHE_PREFIX = "buzz:live_attendance:"
+# Counters are rebuilt from check-ins at least this often, healing any drift
+LIVE_ATTENDANCE_TTL = 6 * 60 * 60
+LIVE_ATTENDANCE_REALTIME_EVENT = "buzz_live_attendance"
 
 
 class EventCheckIn(Document):
@@ -23,3 +31,114 @@ class EventCheckIn(Document):
 	def before_insert(self):
 		if not self.date:
 			self.date = frappe.utils.today()
+
+	def on_submit(self):
+		# A second scan on the same day is not another attendee
+		if not self.is_duplicate_of_day():
+			update_live_attendance(self.event, {(str(self.date), self.get_ticket_type()): 1})
+
+	def on_cancel(self):
+		if not self.is_duplicate_of_day():
+			update_live_attendance(self.event, {(str(self.date), self.get_ticket_type()): -1})
+
+	def is_duplicate_of_day(self) -> bool:
+		return bool(
+			frappe.db.exists(
+				"Event Check In",
+				{"ticket": self.ticket, "date": self.date, "docstatus": 1, "name": ("!=", self.name)},
+			)
+		)
+
+	def get_ticket_type(self) -> str:
+		return str(frappe.db.get_value("Event Ticket", self.ticket, "ticket_type"))
+
+
+def get_live_attendance_key(event: str) -> str:
+	return frappe.cache.make_key(f"{LIVE_ATTENDANCE_CACHE_PREFIX}{event}")
+
+
+def get_counter_client() -> redis.Redis:
+	"""A client on frappe.cache's connections that stores plain integers instead of pickled values."""
+	return redis.Redis(connection_pool=frappe.cache.connection_pool)
+
+
+def update_live_attendance(event: str, deltas: dict[tuple[str, str], int]):
+	"""Add `deltas` ({(date, ticket type): change}) to the live counters once the transaction commits.
+
+	Counters that are not in cache are left alone, they are rebuilt from check-ins when next read.
+	"""
+
+	def apply():
+		client = get_counter_client()
+		key = get_live_attendance_key(event)
+		if not client.exists(key):
+			return
+
+		pipeline = client.pipeline()
+		for (date, ticket_type), delta in deltas.items():
+			pipeline.hincrby(key, f"{date}|{ticket_type}", delta)
+		pipeline.execute()
+
+		frappe.publish_realtime(
+			LIVE_ATTENDANCE_REALTIME_EVENT,
+			get_attendance_counters(event),
+			doctype="Buzz Event",
+			docname=event,
+		)
+
+	frappe.db.after_commit.add(apply)
+
+
+def get_attendance_counters(event: str) -> dict:
+	"""Attendees checked in to an event per day and ticket type, from the live counters."""
+	key = get_live_attendance_key(event)
+	counters = get_counter_client().hgetall(key)
+	if not counters:
+		counters = rebuild_live_attendance(event)
+
+	days = {}
+	for field, count in counters.items():
+		field = frappe.safe_decode(field)
+		if "|" not in field:
+			# Placeholder of an event without check-ins
+			continue
+
+		date, ticket_type = field.split("|", 1)
+		day = days.setdefault(date, {"date": date, "checked_in": 0, "ticket_types": {}})
+		day["checked_in"] += int(count)
+		day["ticket_types"][ticket_type] = int(count)
+
+	days = sorted(days.values(), key=lambda day: day["date"])
+	return {
+		"event": event,
+		"today": next((day["checked_in"] for day in days if day["date"] == frappe.utils.today()), 0),
+		"days": days,
+	}
+
+
+def rebuild_live_attendance(event: str) -> dict:
+	"""Recount the live counters of an event from its check-ins, with one grouped query."""
+	EventCheckIn = frappe.qb.DocType("Event Check In")
+	EventTicket = frappe.qb.DocType("Event Ticket")
+
+	rows = (
+		frappe.qb.from_(EventCheckIn)
+		.join(EventTicket)
+		.on(EventTicket.name == EventCheckIn.ticket)
+		.select(EventCheckIn.date, EventTicket.ticket_type, Count(EventCheckIn.ticket).distinct())
+		.where(EventCheckIn.event == event)
+		.where(EventCheckIn.docstatus == 1)
+		.where(EventCheckIn.date.isnotnull())
+		.groupby(EventCheckIn.date, EventTicket.ticket_type)
+	).run()
+
+	counters = {f"{date}|{ticket_type}": count for date, ticket_type, count in rows} or {"_": 0}
+
+	key = get_live_attendance_key(event)
+	pipeline = get_counter_client().pipeline()
+	pipeline.delete(key)
+	pipeline.hset(key, mapping=counters)
+	pipeline.expire(key, LIVE_ATTENDANCE_TTL)
+	pipeline.execute()
+
+	return counters
@@ -1,8 +1,20 @@
 # Copyright (c) 2025, BWH Studios and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import patch
+
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, today
+
+from buzz.checkin_roster import ROSTER_CACHE_PREFIX, get_roster
+from buzz.events.doctype.event_check_in.event_check_in import (
+	get_attendance_counters,
+	get_counter_client,
+	get_live_attendance_key,
+	rebuild_live_attendance,
+)
+from buzz.ticket_token import make_ticket_token
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -17,4 +29,143 @@ class IntegrationTestEventCheckIn(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def setUp(self):
+		self.test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		self.ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": self.test_event.name,
+				"title": "Live Counter Ticket",
+				"price": 0,
+				"is_published": True,
+			}
+		).insert()
+
+	def tearDown(self):
+		# Counters live in Redis, which is not rolled back with the test
+		get_counter_client().delete(get_live_attendance_key(self.test_event.name))
+		frappe.cache.delete_value(f"{ROSTER_CACHE_PREFIX}{self.test_event.name}")
+
+	def make_ticket(self):
+		return frappe.get_doc(
+			{
+				"doctype": "Event Ticket",
+				"ticket_type": self.ticket_type.name,
+				"attendee_name": "Live Counter",
+				"attendee_email": "live-counter@example.com",
+			}
+		).submit()
+
+	def check_in(self, ticket):
+		checkin = frappe.get_doc({"doctype": "Event Check In", "ticket": ticket.name, "date": today()})
+		checkin.submit()
+		# Counters are updated once the check-in is committed
+		frappe.db.after_commit.run()
+		return checkin
+
+	def get_today_count(self):
+		counters = get_attendance_counters(self.test_event.name)
+		day = next((day for day in counters["days"] if day["date"] == today()), {"ticket_types": {}})
+		return day["ticket_types"].get(str(self.ticket_type.name), 0)
+
+	@patch("frappe.publish_realtime")
+	def test_live_counters_follow_check_ins(self, mock_publish_realtime):
+		rebuild_live_attendance(self.test_event.name)
+		self.assertEqual(self.get_today_count(), 0)
+
+		ticket = self.make_ticket()
+		checkin = self.check_in(ticket)
+		self.assertEqual(self.get_today_count(), 1)
+		self.assertEqual(mock_publish_realtime.call_args.kwargs["docname"], self.test_event.name)
+
+		# Scanning the same ticket again on the same day is not another attendee
+		self.check_in(ticket)
+		self.assertEqual(self.get_today_count(), 1)
+
+		checkin.cancel()
+		frappe.db.after_commit.run()
+		self.assertEqual(self.get_today_count(), 1)
+
+	def test_counters_are_rebuilt_from_check_ins(self):
+		ticket = self.make_ticket()
+		self.check_in(ticket)
+
+		rebuild_live_attendance(self.test_event.name)
+		self.assertEqual(self.get_today_count(), 1)
+
+	@patch("frappe.publish_realtime")
+	def test_sync_checkins_in_batch(self, mock_publish_realtime):
+		from buzz.api import sync_checkins
+
+		rebuild_live_attendance(self.test_event.name)
+		ticket = self.make_ticket()
+		scanned_at = frappe.utils.now()
+		scans = [
+			{"client_id": "a", "ticket_id": ticket.name, "scanned_at": scanned_at},
+			{"client_id": "b", "ticket_id": ticket.name, "scanned_at": scanned_at},
+			{"client_id": "c", "ticket_id": "NOT-A-TICKET", "scanned_at": scanned_at},
+		]
+
+		results = sync_checkins(scans)["results"]
+		frappe.db.after_commit.run()
+
+		self.assertEqual(
+			[result["status"] for result in results], ["checked_in", "already_checked_in", "not_found"]
+		)
+		self.assertEqual(frappe.db.count("Event Check In", {"ticket": ticket.name, "docstatus": 1}), 1)
+		self.assertEqual(self.get_today_count(), 1)
+
+		# Syncing the same scans again does not check the ticket in twice
+		results = sync_checkins(scans[:1])["results"]
+		self.assertEqual(results[0]["status"], "already_checked_in")
+		self.assertEqual(frappe.db.count("Event Check In", {"ticket": ticket.name}), 1)
+
+	def test_sync_rejects_scans_before_the_event(self):
+		from buzz.api import sync_checkins
+
+		ticket = self.make_ticket()
+		scanned_at = add_days(self.test_event.start_date, -30)
+		scans = [{"client_id": "early", "ticket_id": ticket.name, "scanned_at": scanned_at}]
+
+		results = sync_checkins(scans)["results"]
+
+		self.assertEqual(results[0]["status"], "invalid")
+		self.assertFalse(frappe.db.exists("Event Check In", {"ticket": ticket.name}))
+
+	@patch("frappe.publish_realtime")
+	def test_checkin_with_signed_token(self, mock_publish_realtime):
+		from buzz.api import checkin_ticket
+
+		ticket = self.make_ticket()
+		token = make_ticket_token(ticket.name, self.test_event.name, self.ticket_type.name, today(), today())
+
+		result = checkin_ticket(token)
+
+		# The check-in is recorded against the ticket, not the scanned token
+		self.assertEqual(result["ticket"]["id"], ticket.name)
+		self.assertTrue(frappe.db.exists("Event Check In", {"ticket": ticket.name, "date": today()}))
+
+	@patch("frappe.publish_realtime")
+	def test_roster_snapshot_and_delta(self, mock_publish_realtime):
+		ticket = self.make_ticket()
+
+		roster = get_roster(self.test_event.name)
+		self.assertTrue(roster["full"])
+		entry = next(entry for entry in roster["tickets"] if entry["id"] == ticket.name)
+		self.assertFalse(entry["checked_in"])
+		self.assertEqual(roster["ticket_types"][self.ticket_type.name], self.ticket_type.title)
+
+		self.check_in(ticket)
+		delta = get_roster(self.test_event.name, since=roster["version"])
+		self.assertFalse(delta["full"])
+		entry = next(entry for entry in delta["tickets"] if entry["id"] == ticket.name)
+		self.assertTrue(entry["checked_in"])
+
+		# The shared snapshot is brought up to date for the next scanner
+		roster = get_roster(self.test_event.name)
+		entry = next(entry for entry in roster["tickets"] if entry["id"] == ticket.name)
+		self.assertTrue(entry["checked_in"])
+
+		# Check-in state is per day, a version from yesterday gets the full roster
+		yesterday = frappe.utils.add_days(frappe.utils.now_datetime(), -1)
+		self.assertTrue(get_roster(self.test_event.name, since=str(yesterday))["full"])
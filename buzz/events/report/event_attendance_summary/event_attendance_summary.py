@@ -3,6 +3,7 @@
 
 import frappe
 from frappe import _
+from frappe.query_builder.functions import Count
 from frappe.utils import formatdate
 
 
@@ -17,30 +18,41 @@ def execute(filters: dict | None = None):
 	if not event:
 		return [], []
 
-	# Get all unique check-in dates for this event (sorted)
-	check_in_dates = get_check_in_dates(event)
+	# Attendance per check-in date, counted in the database (sorted by date)
+	daily_attendance = get_daily_attendance(event)
+	check_in_dates = [day.date for day in daily_attendance]
 
 	columns = get_columns(check_in_dates)
 	data = get_data(event, check_in_dates)
-	chart = get_chart(data, check_in_dates)
-	report_summary = get_report_summary(data, check_in_dates)
+	chart = get_chart(daily_attendance)
+	report_summary = get_report_summary(daily_attendance, get_unique_attendee_count(event))
 
 	return columns, data, None, chart, report_summary
 
 
-def get_check_in_dates(event: str) -> list:
-	"""Get all unique check-in dates for the event, sorted chronologically."""
-	dates = frappe.db.sql(
-		"""
-		SELECT DISTINCT date
-		FROM `tabEvent Check In`
-		WHERE event = %s AND docstatus = 1 AND date IS NOT NULL
-		ORDER BY date ASC
-		""",
-		(event,),
-		as_dict=True,
-	)
-	return [d.date for d in dates]
+def get_daily_attendance(event: str) -> list[dict]:
+	"""Get the number of attendees checked in on each date of the event, sorted chronologically."""
+	EventCheckIn = frappe.qb.DocType("Event Check In")
+	return (
+		frappe.qb.from_(EventCheckIn)
+		.select(EventCheckIn.date, Count(EventCheckIn.ticket).distinct().as_("attendees"))
+		.where(EventCheckIn.event == event)
+		.where(EventCheckIn.docstatus == 1)
+		.where(EventCheckIn.date.isnotnull())
+		.groupby(EventCheckIn.date)
+		.orderby(EventCheckIn.date)
+	).run(as_dict=True)
+
+
+def get_unique_attendee_count(event: str) -> int:
+	"""Count attendees checked in on at least one day."""
+	EventCheckIn = frappe.qb.DocType("Event Check In")
+	return (
+		frappe.qb.from_(EventCheckIn)
+		.select(Count(EventCheckIn.ticket).distinct())
+		.where(EventCheckIn.event == event)
+		.where(EventCheckIn.docstatus == 1)
+	).run()[0][0]
 
 
 def get_columns(check_in_dates: list) -> list[dict]:
@@ -95,103 +107,90 @@ def get_columns(check_in_dates: list) -> list[dict]:
 def get_data(event: str, check_in_dates: list) -> list[dict]:
 	"""Return data for the report.
 
-	Shows each ticket with check-in status for each day.
+	Shows each ticket with check-in status for each day. The distinct (ticket, date)
+	pairs come sorted by attendee, so the pivot is built in a single pass.
 	"""
-	# Get all check-ins for this event
-	check_ins = frappe.get_all(
-		"Event Check In",
-		filters={"event": event, "docstatus": 1},
-		fields=["ticket", "date"],
-	)
-
-	if not check_ins:
-		return []
+	EventCheckIn = frappe.qb.DocType("Event Check In")
+	EventTicket = frappe.qb.DocType("Event Ticket")
+
+	check_ins = (
+		frappe.qb.from_(EventCheckIn)
+		.join(EventTicket)
+		.on(EventTicket.name == EventCheckIn.ticket)
+		.select(
+			EventTicket.name.as_("ticket"),
+			EventTicket.attendee_name,
+			EventTicket.attendee_email,
+			EventTicket.ticket_type,
+			EventCheckIn.date,
+		)
+		.distinct()
+		.where(EventCheckIn.event == event)
+		.where(EventCheckIn.docstatus == 1)
+		.orderby(EventTicket.attendee_name)
+		.orderby(EventTicket.name)
+	).run(as_dict=True)
 
-	# Build a map of ticket -> set of dates checked in
-	ticket_dates = {}
-	for ci in check_ins:
-		if ci.ticket not in ticket_dates:
-			ticket_dates[ci.ticket] = set()
-		if ci.date:
-			ticket_dates[ci.ticket].add(ci.date)
-
-	# Get ticket details
-	tickets = frappe.get_all(
-		"Event Ticket",
-		filters={"name": ["in", list(ticket_dates.keys())]},
-		fields=["name", "attendee_name", "attendee_email", "ticket_type"],
-	)
+	day_columns = {date: f"day_{i}" for i, date in enumerate(check_in_dates)}
 
-	# Build the data rows
+	# Build the data rows, one per ticket
 	data = []
-	for ticket in tickets:
-		row = {
-			"ticket": ticket.name,
-			"attendee_name": ticket.attendee_name,
-			"attendee_email": ticket.attendee_email,
-			"ticket_type": ticket.ticket_type,
-		}
-
-		# Add check-in status for each date (1 or 0 for Check fieldtype)
-		checked_in_dates = ticket_dates.get(ticket.name, set())
-		for i, date in enumerate(check_in_dates):
-			row[f"day_{i}"] = 1 if date in checked_in_dates else 0
-
-		data.append(row)
+	row = None
+	for ci in check_ins:
+		if not row or row["ticket"] != ci.ticket:
+			row = {
+				"ticket": ci.ticket,
+				"attendee_name": ci.attendee_name,
+				"attendee_email": ci.attendee_email,
+				"ticket_type": ci.ticket_type,
+			}
+			# Check-in status for each date (1 or 0 for Check fieldtype)
+			row.update(dict.fromkeys(day_columns.values(), 0))
+			data.append(row)
 
-	# Sort by attendee name
-	data.sort(key=lambda x: (x.get("attendee_name") or "").lower())
+		if ci.date in day_columns:
+			row[day_columns[ci.date]] = 1
 
 	return data
 
 
-def get_chart(data: list[dict], check_in_dates: list) -> dict:
+def get_chart(daily_attendance: list[dict]) -> dict:
 	"""Return chart data showing attendance per day."""
-	if not data or not check_in_dates:
+	if not daily_attendance:
 		return {}
 
-	labels = []
-	values = []
-
-	for i, date in enumerate(check_in_dates):
-		labels.append(formatdate(date, "d MMM"))
-		day_count = sum(1 for row in data if row.get(f"day_{i}") == 1)
-		values.append(day_count)
-
 	return {
 		"data": {
-			"labels": labels,
-			"datasets": [{"name": _("Attendees"), "values": values}],
+			"labels": [formatdate(day.date, "d MMM") for day in daily_attendance],
+			"datasets": [{"name": _("Attendees"), "values": [day.attendees for day in daily_attendance]}],
 		},
 		"type": "bar",
 		"colors": ["#4F46E5"],
 	}
 
 
-def get_report_summary(data: list[dict], check_in_dates: list) -> list[dict]:
+def get_report_summary(daily_attendance: list[dict], unique_attendees: int) -> list[dict]:
 	"""Return report summary with attendance counts per day and total unique attendees."""
-	if not data:
+	if not unique_attendees:
 		return []
 
 	summary = []
 
-	# Count attendance for each day
-	for i, date in enumerate(check_in_dates):
-		day_count = sum(1 for row in data if row.get(f"day_{i}") == 1)
+	# Attendance for each day
+	for day in daily_attendance:
 		summary.append(
 			{
-				"value": day_count,
-				"label": formatdate(date, "d MMM YYYY"),
+				"value": day.attendees,
+				"label": formatdate(day.date, "d MMM YYYY"),
 				"datatype": "Int",
 				"indicator": "blue",
 			}
 		)
 
 	# Total unique attendees (anyone who attended at least one day)
-	total_unique = len(data)
 	summary.append(
 		{
-			"value": total_unique,
+			"value": unique_attendees,
 			"label": _("Total Unique Attendees"),
 			"datatype": "Int",
 			"indicator": "green",
@@ -0,0 +1,65 @@
+# Copyright (c) 2025, BWH Studios and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, today
+
+from buzz.events.report.event_attendance_summary.event_attendance_summary import execute
+
+
+class TestEventAttendanceSummaryReport(IntegrationTestCase):
+	def setUp(self):
+		self.test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		self.ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": self.test_event.name,
+				"title": "Attendance Ticket",
+				"price": 0,
+				"is_published": True,
+			}
+		).insert()
+
+	def make_ticket(self, attendee_name):
+		return frappe.get_doc(
+			{
+				"doctype": "Event Ticket",
+				"ticket_type": self.ticket_type.name,
+				"attendee_name": attendee_name,
+				"attendee_email": f"{attendee_name.lower()}@attendance.test",
+			}
+		).submit()
+
+	def check_in(self, ticket, date):
+		frappe.get_doc({"doctype": "Event Check In", "ticket": ticket.name, "date": date}).submit()
+
+	def test_pivots_check_ins_per_day(self):
+		day_one, day_two = add_days(today(), -1), today()
+		alice, bob = self.make_ticket("Alice"), self.make_ticket("Bob")
+
+		self.check_in(alice, day_one)
+		self.check_in(alice, day_two)
+		# A second scan on the same day is one attendance
+		self.check_in(alice, day_two)
+		self.check_in(bob, day_two)
+
+		columns, data, _message, chart, summary = execute({"event": self.test_event.name})
+
+		day_columns = {column["label"]: column["fieldname"] for column in columns[4:]}
+		rows = {row["ticket"]: row for row in data}
+		day_one_column = day_columns[frappe.utils.formatdate(day_one, "d MMM")]
+		day_two_column = day_columns[frappe.utils.formatdate(day_two, "d MMM")]
+
+		self.assertEqual(rows[alice.name][day_one_column], 1)
+		self.assertEqual(rows[alice.name][day_two_column], 1)
+		self.assertEqual(rows[bob.name][day_one_column], 0)
+		self.assertEqual(rows[bob.name][day_two_column], 1)
+		self.assertEqual(len(data), len(rows))
+
+		# Chart and summary agree with the rows
+		for i, column in enumerate(columns[4:]):
+			attendees = sum(row[column["fieldname"]] for row in data)
+			self.assertEqual(chart["data"]["datasets"][0]["values"][i], attendees)
+			self.assertEqual(summary[i]["value"], attendees)
+		self.assertEqual(summary[-1]["value"], len(data))
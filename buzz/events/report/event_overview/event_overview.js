@@ -9,5 +9,21 @@ frappe.query_reports["Event Overview"] = {
 			fieldtype: "Link",
 			options: "Buzz Event",
 		},
+		{
+			fieldname: "category",
+			label: __("Category"),
+			fieldtype: "Link",
+			options: "Event Category",
+		},
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+		},
+		{
+			fieldname: "to_date",
+			label: __("To Date"),
+			fieldtype: "Date",
+		},
 	],
 };
@@ -3,6 +3,8 @@
 
 import frappe
 from frappe import _
+from frappe.query_builder import Criterion, Order
+from frappe.query_builder.functions import Coalesce, Count, Sum
 
 
 def execute(filters: dict | None = None):
@@ -45,47 +47,81 @@ def get_data(filters: dict) -> list[dict]:
 	"""Return data for the report.
 
 	The report data is a list of rows, with each row being a list of cell values.
+	All events are summarised in one query, with each figure aggregated per event
+	in a grouped subquery instead of being queried event by event.
 	"""
-	event = filters.get("event")
-
-	if event:
-		return [get_summary_for_event(event)]
-
-	data = []
-	events = frappe.db.get_all("Buzz Event", pluck="name")
-	for event in events:
-		summary = get_summary_for_event(event)
-		summary["event"] = event
-		data.append(summary)
-
-	return data
-
-
-def get_summary_for_event(event: str) -> dict:
-	"""Return summary data for the event.
-
-	This function is used to get a summary of the event, such as total tickets sold,
-	total add-ons sold, and total sales.
-	"""
-	event_tickets = frappe.db.get_all("Event Ticket", filters={"event": event, "docstatus": 1}, pluck="name")
-	num_tickets_sold = len(event_tickets)
-	sales = frappe.db.get_all(
-		"Event Booking",
-		filters={"docstatus": 1, "event": event},
-		fields=[{"SUM": "total_amount", "as": "sales"}],
-		pluck="sales",
-	)[0]
-
-	num_add_ons_sold = frappe.db.get_all(
-		"Ticket Add-on Value",
-		filters={"parenttype": "Event Ticket", "parentfield": "add_ons", "parent": ["in", event_tickets]},
-		fields=[{"COUNT": "*", "as": "num_add_ons_sold"}],
-		pluck="num_add_ons_sold",
-	)[0]
-
-	return {
-		"event": event,
-		"num_tickets_sold": num_tickets_sold,
-		"num_add_ons_sold": num_add_ons_sold,
-		"sales": sales,
-	}
+	filters = filters or {}
+
+	BuzzEvent = frappe.qb.DocType("Buzz Event")
+	EventTicket = frappe.qb.DocType("Event Ticket")
+	EventBooking = frappe.qb.DocType("Event Booking")
+	TicketAddonValue = frappe.qb.DocType("Ticket Add-on Value")
+
+	events = get_event_conditions(BuzzEvent, filters)
+
+	tickets = (
+		frappe.qb.from_(EventTicket)
+		.select(EventTicket.event, Count("*").as_("num_tickets_sold"))
+		.where(EventTicket.docstatus == 1)
+		.groupby(EventTicket.event)
+	)
+	add_ons = (
+		frappe.qb.from_(TicketAddonValue)
+		.join(EventTicket)
+		.on(EventTicket.name == TicketAddonValue.parent)
+		.select(EventTicket.event, Count("*").as_("num_add_ons_sold"))
+		.where(TicketAddonValue.parenttype == "Event Ticket")
+		.where(TicketAddonValue.parentfield == "add_ons")
+		.where(EventTicket.docstatus == 1)
+		.groupby(EventTicket.event)
+	)
+	sales = (
+		frappe.qb.from_(EventBooking)
+		.select(EventBooking.event, Sum(EventBooking.total_amount).as_("sales"))
+		.where(EventBooking.docstatus == 1)
+		.groupby(EventBooking.event)
+	)
+
+	if events is not None:
+		# Aggregate only the selected events instead of every event on the site
+		selected = frappe.qb.from_(BuzzEvent).select(BuzzEvent.name).where(events)
+		tickets = tickets.where(EventTicket.event.isin(selected))
+		add_ons = add_ons.where(EventTicket.event.isin(selected))
+		sales = sales.where(EventBooking.event.isin(selected))
+
+	tickets, add_ons, sales = tickets.as_("tickets"), add_ons.as_("add_ons"), sales.as_("sales")
+	query = (
+		frappe.qb.from_(BuzzEvent)
+		.left_join(tickets)
+		.on(tickets.event == BuzzEvent.name)
+		.left_join(add_ons)
+		.on(add_ons.event == BuzzEvent.name)
+		.left_join(sales)
+		.on(sales.event == BuzzEvent.name)
+		.select(
+			BuzzEvent.name.as_("event"),
+			Coalesce(tickets.num_tickets_sold, 0).as_("num_tickets_sold"),
+			Coalesce(add_ons.num_add_ons_sold, 0).as_("num_add_ons_sold"),
+			Coalesce(sales.sales, 0).as_("sales"),
+		)
+		.orderby(BuzzEvent.start_date, order=Order.desc)
+	)
+	if events is not None:
+		query = query.where(events)
+
+	return query.run(as_dict=True)
+
+
+def get_event_conditions(BuzzEvent, filters: dict):
+	"""Return the condition selecting the events to summarise, or None for all events."""
+	conditions = []
+	if filters.get("event"):
+		conditions.append(BuzzEvent.name == filters.get("event"))
+	if filters.get("category"):
+		conditions.append(BuzzEvent.category == filters.get("category"))
+	if filters.get("from_date"):
+		conditions.append(BuzzEvent.start_date >= filters.get("from_date"))
+	if filters.get("to_date"):
+		conditions.append(BuzzEvent.start_date <= filters.get("to_date"))
+
+	return Criterion.all(conditions) if conditions else None
@@ -0,0 +1,64 @@
+# Copyright (c) 2025, BWH Studios and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days
+
+from buzz.events.report.event_overview.event_overview import execute
+
+
+class TestEventOverviewReport(IntegrationTestCase):
+	def setUp(self):
+		self.test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		self.ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": self.test_event.name,
+				"title": "Overview Ticket",
+				"price": 100,
+				"is_published": True,
+			}
+		).insert()
+
+	def get_row(self, filters=None):
+		_columns, data = execute(filters or {})
+		return next((row for row in data if str(row.event) == str(self.test_event.name)), None)
+
+	def test_summarises_all_events_in_one_query(self):
+		before = self.get_row()
+
+		frappe.get_doc(
+			{
+				"doctype": "Event Booking",
+				"event": self.test_event.name,
+				"user": "Administrator",
+				"attendees": [
+					{
+						"full_name": "Overview One",
+						"email": "one@overview.test",
+						"ticket_type": self.ticket_type.name,
+					},
+					{
+						"full_name": "Overview Two",
+						"email": "two@overview.test",
+						"ticket_type": self.ticket_type.name,
+					},
+				],
+			}
+		).insert().submit()
+
+		with self.assertQueryCount(1):
+			_columns, data = execute({})
+
+		after = next(row for row in data if str(row.event) == str(self.test_event.name))
+		self.assertEqual(after.num_tickets_sold - before.num_tickets_sold, 2)
+		self.assertGreater(after.sales, before.sales)
+
+	def test_filters_by_category_and_date_range(self):
+		start_date = self.test_event.start_date
+
+		self.assertIsNotNone(self.get_row({"category": self.test_event.category}))
+		self.assertIsNotNone(self.get_row({"from_date": start_date, "to_date": start_date}))
+		self.assertIsNone(self.get_row({"from_date": add_days(start_date, 1)}))
+		self.assertIsNone(self.get_row({"event": self.test_event.name, "to_date": add_days(start_date, -1)}))
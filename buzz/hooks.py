@@ -24,7 +24,10 @@ website_route_rules = [
 # Scheduled Tasks
 # ---------------
 
-scheduler_events = {"daily": ["buzz.tasks.unpublish_ticket_types_after_last_date"]}
+scheduler_events = {
+	"daily": ["buzz.tasks.unpublish_ticket_types_after_last_date"],
+	"cron": {"*/5 * * * *": ["buzz.tasks.release_expired_ticket_holds"]},
+}
 
 # Testing
 # -------
@@ -37,6 +40,29 @@ doc_events = {
 		"after_insert": "buzz.utils.add_buzz_user_role",
 		"on_update": "buzz.events.doctype.speaker_profile.speaker_profile.update_speaker_display_name",
 	},
+	"Buzz Event": {
+		"on_update": [
+			"buzz.api.clear_booking_page_cache",
+			"buzz.api.clear_event_policy_windows",
+			"buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code.clear_category_coupon_rules",
+		],
+		"on_trash": [
+			"buzz.api.clear_booking_page_cache",
+			"buzz.api.clear_event_policy_windows",
+			"buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code.clear_category_coupon_rules",
+		],
+	},
+	"Buzz Settings": {
+		"on_update": "buzz.api.clear_event_policy_windows",
+	},
+	"Ticket Add-on": {
+		"on_update": "buzz.api.clear_booking_page_cache",
+		"on_trash": "buzz.api.clear_booking_page_cache",
+	},
+	"Buzz Custom Field": {
+		"on_update": "buzz.api.clear_booking_page_cache",
+		"on_trash": "buzz.api.clear_booking_page_cache",
+	},
 }
 
 fixtures = [{"dt": "Role", "filters": {"name": ["in", ["Buzz User", "Frontdesk Manager"]]}}]
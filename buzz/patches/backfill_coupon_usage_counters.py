@@ -0,0 +1,5 @@
+from buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code import reconcile_coupon_usage
+
+
+def execute():
+	reconcile_coupon_usage()
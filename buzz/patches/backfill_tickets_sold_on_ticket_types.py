@@ -0,0 +1,5 @@
+from buzz.ticketing.doctype.event_ticket_type.event_ticket_type import reconcile_ticket_counters
+
+
+def execute():
+	reconcile_ticket_counters()
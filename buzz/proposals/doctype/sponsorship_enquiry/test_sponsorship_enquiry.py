@@ -169,3 +169,71 @@ class TestSponsorshipEnquiryEmail(IntegrationTestCase):
 			settings.save()
 			frappe.delete_doc("Email Template", event_template.name, force=True)
 			frappe.delete_doc("Email Template", global_template.name, force=True)
+
+
+class TestSponsorshipInquiriesAPI(IntegrationTestCase):
+	"""Tests for the sponsorship list and details endpoints of the dashboard."""
+
+	@patch("frappe.sendmail")
+	def setUp(self, mock_sendmail):
+		self.test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		self.tier = frappe.get_doc(
+			{"doctype": "Sponsorship Tier", "event": self.test_event.name, "title": "API Gold", "price": 100}
+		).insert()
+		self.enquiries = [
+			frappe.get_doc(
+				{
+					"doctype": "Sponsorship Enquiry",
+					"event": self.test_event.name,
+					"company_name": f"API Sponsor {i}",
+					"company_logo": "/files/test-logo.png",
+					"tier": self.tier.name,
+				}
+			).insert()
+			for i in range(3)
+		]
+		self.sponsor = frappe.get_doc(
+			{
+				"doctype": "Event Sponsor",
+				"event": self.test_event.name,
+				"company_name": "API Sponsor 0",
+				"company_logo": "/files/test-logo.png",
+				"tier": self.tier.name,
+				"enquiry": self.enquiries[0].name,
+			}
+		).insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_inquiries_are_paginated_with_titles_in_one_query(self):
+		from buzz.api import get_user_sponsorship_inquiries
+
+		inquiries, cursor = {}, None
+		while True:
+			with self.assertQueryCount(1):
+				page = get_user_sponsorship_inquiries(cursor=cursor, page_length=2)
+			self.assertLessEqual(len(page["inquiries"]), 2)
+			for inquiry in page["inquiries"]:
+				self.assertNotIn(inquiry.name, inquiries)
+				inquiries[inquiry.name] = inquiry
+			if not (cursor := page["next_cursor"]):
+				break
+
+		first, second = inquiries[self.enquiries[0].name], inquiries[self.enquiries[1].name]
+		self.assertEqual(first.event_title, self.test_event.title)
+		self.assertEqual(first.tier_title, "API Gold")
+		self.assertTrue(first.has_sponsor)
+		self.assertFalse(second.has_sponsor)
+
+	def test_sponsorship_details_in_one_query(self):
+		from buzz.api import get_sponsorship_details
+
+		with self.assertQueryCount(1):
+			details = get_sponsorship_details(self.enquiries[0].name)
+
+		self.assertEqual(details["enquiry"]["tier_title"], "API Gold")
+		self.assertEqual(details["event_details"]["route"], self.test_event.route)
+		self.assertTrue(details["has_sponsor"])
+		self.assertEqual(details["sponsor_details"]["name"], self.sponsor.name)
+		self.assertEqual(details["sponsor_details"]["tier_title"], "API Gold")
@@ -0,0 +1,154 @@
+import functools
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import frappe
+
+# Bump when the rendering style changes so cached QR files are not reused
+QR_RENDER_VERSION = 1
+
+# Cache of payload key -> file url of the rendered PNG
+QR_FILES_CACHE_KEY = "buzz:qr_code_files"
+
+# Batches at least this large are rendered in a process pool, outside of web requests only.
+# A code takes ~65 ms inline while starting a pool costs ~0.5 s before its workers import frappe,
+# so smaller batches (and every synchronous booking) are faster rendered inline.
+QR_PROCESS_POOL_THRESHOLD = 64
+QR_PROCESS_POOL_MAX_WORKERS = 4
+
+# Images rendered on demand are kept in memory by each worker process
+QR_IMAGE_LRU_SIZE = 1024
+
+
+def make_qr_image(data: str) -> bytes:
+	"""
+	Generate QR code image bytes from data string.
+
+	:param data: The data to encode in the QR code
+	:return: PNG image as bytes
+	"""
+	import qrcode
+	from qrcode.image.styledpil import StyledPilImage
+	from qrcode.image.styles.moduledrawers.pil import HorizontalBarsDrawer
+
+	qr = qrcode.QRCode(
+		version=1,
+		error_correction=qrcode.constants.ERROR_CORRECT_H,
+		box_size=10,
+		border=4,
+	)
+	qr.add_data(data)
+	qr.make(fit=True)
+
+	img = qr.make_image(image_factory=StyledPilImage, module_drawer=HorizontalBarsDrawer())
+	output = io.BytesIO()
+	img.save(output, format="PNG")
+	return output.getvalue()
+
+
+@functools.lru_cache(maxsize=QR_IMAGE_LRU_SIZE)
+def get_qr_image(data: str) -> bytes:
+	"""Render a QR image for on-demand serving, keeping the most recent renders in memory."""
+	return make_qr_image(data)
+
+
+def get_qr_cache_key(data: str) -> str:
+	"""Content address of a QR code: same payload and render version, same image."""
+	return hashlib.sha256(f"{QR_RENDER_VERSION}:{data}".encode()).hexdigest()
+
+
+def render_qr_images(payloads: list[str]) -> dict[str, bytes]:
+	"""
+	Render many payloads at once, returning a map of payload to PNG bytes.
+
+	Large batches in background jobs are spread over a process pool since rendering is CPU bound.
+	"""
+	payloads = list(dict.fromkeys(payloads))
+	workers = min(os.cpu_count() or 1, QR_PROCESS_POOL_MAX_WORKERS)
+
+	in_request = getattr(frappe.local, "request", None) is not None
+	if in_request or len(payloads) < QR_PROCESS_POOL_THRESHOLD or workers < 2:
+		return {data: make_qr_image(data) for data in payloads}
+
+	# forked workers would inherit the open database connection and locks of this process
+	start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+	mp_context = multiprocessing.get_context(start_method)
+	with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as pool:
+		images = pool.map(make_qr_image, payloads, chunksize=max(1, len(payloads) // (workers * 4)))
+		return dict(zip(payloads, images, strict=True))
+
+
+def prerender_qr_images(payloads: list[str]):
+	"""
+	Render payloads in one batch ahead of `generate_qr_code_file` calls in this request.
+
+	Payloads that already have a stored file are skipped.
+	"""
+	pending = [data for data in payloads if not get_cached_qr_file_url(data)]
+	if pending:
+		get_prerendered_images().update(render_qr_images(pending))
+
+
+def get_prerendered_images() -> dict[str, bytes]:
+	if not hasattr(frappe.local, "buzz_prerendered_qr_images"):
+		frappe.local.buzz_prerendered_qr_images = {}
+	return frappe.local.buzz_prerendered_qr_images
+
+
+def get_cached_qr_file_url(data: str) -> str | None:
+	file_url = frappe.cache.hget(QR_FILES_CACHE_KEY, get_qr_cache_key(data))
+	if file_url and frappe.db.exists("File", {"file_url": file_url}):
+		return file_url
+
+
+def generate_qr_code_file(doc, data: str, field_name: str = "qr_code", file_prefix: str = "qr-code") -> str:
+	"""
+	Generate QR code image and attach as File to a document.
+
+	Rendered images are content addressed by payload: a payload rendered before
+	reuses the stored PNG instead of rendering it again, and identical PNGs
+	share one file on disk.
+
+	:param doc: The Frappe document to attach the QR code to
+	:param data: The data to encode in the QR code
+	:param field_name: The field name to attach the file to (default: "qr_code")
+	:param file_prefix: Prefix for the file name (default: "qr-code")
+	:return: The file URL of the created QR code image
+	"""
+	attached_to = {
+		"attached_to_doctype": doc.doctype,
+		"attached_to_name": doc.name,
+		"attached_to_field": field_name,
+	}
+
+	if file_url := get_cached_qr_file_url(data):
+		if frappe.db.exists("File", {"file_url": file_url, **attached_to}):
+			return file_url
+
+		# Point a new File at the stored image, nothing is written to disk
+		qr_code_file = frappe.get_doc(
+			{
+				"doctype": "File",
+				"file_url": file_url,
+				"file_name": f"{file_prefix}-{doc.name}.png",
+				**attached_to,
+			}
+		).save(ignore_permissions=True)
+		return qr_code_file.file_url
+
+	qr_data = get_prerendered_images().pop(data, None) or make_qr_image(data)
+	# File dedupes identical content by hash, so equal images share one file on disk
+	qr_code_file = frappe.get_doc(
+		{
+			"doctype": "File",
+			"content": qr_data,
+			"file_name": f"{file_prefix}-{doc.name}.png",
+			**attached_to,
+		}
+	).save(ignore_permissions=True)
+
+	frappe.cache.hset(QR_FILES_CACHE_KEY, get_qr_cache_key(data), qr_code_file.file_url)
+	return qr_code_file.file_url
@@ -1,5 +1,5 @@
 import frappe
-from frappe.utils import today
+from frappe.utils import now_datetime, today
 
 
 def unpublish_ticket_types_after_last_date():
@@ -10,3 +10,15 @@ def unpublish_ticket_types_after_last_date():
 		False,
 	)
 	frappe.db.commit()
+
+
+def release_expired_ticket_holds():
+	expired_bookings = frappe.get_all(
+		"Event Booking",
+		filters={"docstatus": 0, "reservation_status": "Held", "reserved_until": ("<", now_datetime())},
+		pluck="name",
+	)
+
+	for booking in expired_bookings:
+		frappe.get_doc("Event Booking", booking).release_ticket_hold("Expired")
+		frappe.db.commit()
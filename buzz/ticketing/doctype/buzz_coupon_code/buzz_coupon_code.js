@@ -21,6 +21,63 @@ frappe.ui.form.on("Buzz Coupon Code", {
 
 		frm.trigger("coupon_type");
 		frm.trigger("applies_to");
+
+		frappe.realtime.off("buzz_generated_codes_export");
+		frappe.realtime.on("buzz_generated_codes_export", (data) => {
+			if (data.template === frm.doc.name) window.open(data.file_url);
+		});
+
+		if (!frm.is_new()) {
+			frm.add_custom_button(__("Reconcile Usage Counters"), () => {
+				frm.call({ doc: frm.doc, method: "reconcile_usage_counters", freeze: true }).then(() =>
+					frm.reload_doc()
+				);
+			});
+		}
+
+		if (!frm.is_new() && !frm.doc.generated_from) {
+			frm.add_custom_button(
+				__("Generate Codes"),
+				() => {
+					frappe.prompt(
+						[
+							{
+								fieldname: "count",
+								fieldtype: "Int",
+								label: __("Number of Codes"),
+								reqd: 1,
+							},
+							{ fieldname: "prefix", fieldtype: "Data", label: __("Prefix") },
+						],
+						(values) => {
+							frm.call({ doc: frm.doc, method: "generate_codes", args: values }).then(() =>
+								frappe.show_alert(__("Generating codes in the background"))
+							);
+						},
+						__("Generate Coupon Codes"),
+						__("Generate")
+					);
+				},
+				__("Bulk Codes")
+			);
+
+			frm.add_custom_button(
+				__("Download Codes"),
+				() => {
+					frappe.call({
+						method: "buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code.export_generated_codes",
+						args: { template: frm.doc.name },
+						callback: () => {
+							frappe.show_alert({
+								message: __("Export started, the file will download when it is ready"),
+								indicator: "blue",
+							});
+						},
+					});
+				},
+				__("Bulk Codes")
+			);
+		}
 	},
 
 	coupon_type(frm) {
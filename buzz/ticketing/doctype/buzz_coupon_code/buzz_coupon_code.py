@@ -1,9 +1,22 @@
 # Copyright (c) 2025, BWH Studios and contributors
 # For license information, please see license.txt
 
+import csv
+import hashlib
+
 import frappe
 from frappe import _
+from frappe.model import no_value_fields, table_fields
 from frappe.model.document import Document
+from frappe.utils import cint, getdate, now
+
+from buzz.utils import get_affected_rows
+
+COUPON_CODE_LENGTH = 8
+BULK_COUPON_BATCH_SIZE = 1000
+
+# Compiled coupon rules (validity, scope and benefits) keyed by coupon code
+COUPON_RULES_CACHE_KEY = "buzz:coupon_rules"
 
 
 class BuzzCouponCode(Document):
@@ -25,6 +38,8 @@ class BuzzCouponCode(Document):
 		event: DF.Link | None
 		event_category: DF.Link | None
 		free_add_ons: DF.Table[CouponFreeAddon]
+		free_tickets_claimed: DF.Int
+		generated_from: DF.Link | None
 		is_active: DF.Check
 		max_usage_count: DF.Int
 		max_usage_per_user: DF.Int
@@ -32,13 +47,14 @@ class BuzzCouponCode(Document):
 		minimum_order_value: DF.Float
 		number_of_free_tickets: DF.Int
 		ticket_type: DF.Link | None
+		times_used: DF.Int
 		valid_from: DF.Date | None
 		valid_till: DF.Date | None
 	# end: auto-generated types
 
 	def autoname(self):
 		if not self.code:
-			self.code = frappe.generate_hash(length=8).upper()
+			self.code = frappe.generate_hash(length=COUPON_CODE_LENGTH).upper()
 
 	def validate(self):
 		self.validate_discount_value()
@@ -46,6 +62,12 @@ class BuzzCouponCode(Document):
 		self.validate_free_tickets_event()
 		self.validate_validity_dates()
 
+	def on_update(self):
+		clear_coupon_rules(self.name)
+
+	def on_trash(self):
+		clear_coupon_rules(self.name)
+
 	def validate_validity_dates(self):
 		if self.valid_from and self.valid_till:
 			if self.valid_from > self.valid_till:
@@ -79,26 +101,7 @@ class BuzzCouponCode(Document):
 				frappe.throw(_("Number of free tickets must be greater than 0"))
 
 	def is_valid_for_event(self, event_name):
-		if not self.is_active:
-			return False, _("Coupon is not active")
-
-		is_valid, msg = self.is_within_validity_period()
-		if not is_valid:
-			return False, msg
-
-		if not self.applies_to:
-			return True, ""
-
-		if self.applies_to == "Event":
-			if str(self.event) != str(event_name):
-				return False, _("Coupon is not valid for this event")
-			return True, ""
-
-		if self.applies_to == "Event Category":
-			event_category = frappe.get_cached_value("Buzz Event", event_name, "category")
-			if not event_category or str(event_category) != str(self.event_category):
-				return False, _("Coupon is not valid for this event category")
-			return True, ""
+		return check_coupon_rules(compile_coupon_rules(self), event_name)
 
 	def is_usage_available(self):
 		if self.max_usage_count > 0:
@@ -107,59 +110,508 @@ class BuzzCouponCode(Document):
 		return True, ""
 
 	def is_min_order_met(self, order_amount):
-		if self.minimum_order_value > 0:
-			if order_amount < self.minimum_order_value:
-				gap = self.minimum_order_value - order_amount
-				return False, _("Add {0} more to use this coupon (min order {1})").format(
-					gap, self.minimum_order_value
-				)
-		return True, ""
+		return check_min_order(compile_coupon_rules(self), order_amount)
 
 	def is_within_validity_period(self):
-		today = frappe.utils.getdate()
-
-		if self.valid_from and today < frappe.utils.getdate(self.valid_from):
-			return False, _("Coupon is not yet active (starts {0})").format(self.valid_from)
-
-		if self.valid_till and today > frappe.utils.getdate(self.valid_till):
-			return False, _("Coupon expired on {0}").format(self.valid_till)
-
-		return True, ""
+		return check_validity_period(compile_coupon_rules(self))
 
 	def is_user_limit_reached(self, user=None):
 		if not self.max_usage_per_user:
 			return False, ""
 
-		user = user or frappe.session.user
-		user_usage = frappe.db.count(
-			"Event Booking", {"coupon_code": self.name, "user": user, "docstatus": 1}
-		)
+		user_usage = self.get_user_usage(user or frappe.session.user)
 
 		if user_usage >= self.max_usage_per_user:
 			return True, _("You have reached the maximum usage limit for this coupon")
 
 		return False, ""
 
-	@property
-	def times_used(self):
-		return frappe.db.count("Event Booking", {"coupon_code": self.name, "docstatus": 1})
+	def get_user_usage(self, user: str) -> int:
+		return (
+			frappe.db.get_value("Buzz Coupon Usage", get_coupon_usage_name(self.name, user), "times_used")
+			or 0
+		)
+
+	@frappe.whitelist()
+	def reconcile_usage_counters(self):
+		frappe.only_for(["Event Manager", "System Manager"])
+		reconcile_coupon_usage(self.name)
+
+	@frappe.whitelist()
+	def generate_codes(self, count: int, prefix: str | None = None):
+		"""Queue bulk generation of `count` copies of this coupon, each with its own code."""
+		frappe.only_for(["Event Manager", "System Manager"])
+
+		count = cint(count)
+		if count <= 0:
+			frappe.throw(_("Number of codes must be greater than 0"))
+		if self.generated_from:
+			frappe.throw(_("Codes can only be generated from a template coupon"))
+
+		frappe.enqueue(
+			"buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code.generate_coupon_codes",
+			queue="long",
+			timeout=60 * 60,
+			job_id=f"generate_coupon_codes::{self.name}",
+			deduplicate=True,
+			template=self.name,
+			count=count,
+			prefix=prefix,
+		)
+
+
+def get_coupon_rules(coupon_code: str) -> frappe._dict | None:
+	"""Compiled rules of a coupon, from cache. Usage counters are live and not part of the rules."""
+	# Codes match case-insensitively, the cache is keyed by the stored name so it is cleared as one
+	# Unknown codes are not cached, so a code created later (e.g. in bulk) is found at once
+	coupon_code = frappe.db.get_value("Buzz Coupon Code", coupon_code, "name")
+	if not coupon_code:
+		return None
+
+	rules = frappe.cache.hget(COUPON_RULES_CACHE_KEY, coupon_code)
+	if rules is None:
+		rules = compile_coupon_rules(frappe.get_doc("Buzz Coupon Code", coupon_code))
+		frappe.cache.hset(COUPON_RULES_CACHE_KEY, coupon_code, rules)
+
+	return rules
+
+
+def compile_coupon_rules(coupon: BuzzCouponCode) -> frappe._dict:
+	"""Flatten a coupon into what checkout needs, resolving its scope to the events it allows."""
+	events = categories = None
+	if coupon.applies_to == "Event":
+		events = [str(coupon.event)]
+	elif coupon.applies_to == "Event Category":
+		categories = [str(coupon.event_category)]
+		events = frappe.get_all("Buzz Event", filters={"category": coupon.event_category}, pluck="name")
+		events = [str(event) for event in events]
+
+	return frappe._dict(
+		code=coupon.name,
+		is_active=coupon.is_active,
+		valid_from=getdate(coupon.valid_from) if coupon.valid_from else None,
+		valid_till=getdate(coupon.valid_till) if coupon.valid_till else None,
+		applies_to=coupon.applies_to,
+		events=events,
+		categories=categories,
+		coupon_type=coupon.coupon_type,
+		discount_type=coupon.discount_type,
+		discount_value=coupon.discount_value,
+		maximum_discount_amount=coupon.maximum_discount_amount or 0,
+		minimum_order_value=coupon.minimum_order_value or 0,
+		ticket_type=coupon.ticket_type,
+		number_of_free_tickets=coupon.number_of_free_tickets,
+		free_add_ons=[row.add_on for row in coupon.free_add_ons],
+		max_usage_count=coupon.max_usage_count,
+		max_usage_per_user=coupon.max_usage_per_user,
+	)
+
+
+def clear_coupon_rules(coupon_code: str | None = None):
+	"""Drop the compiled rules of a coupon, or of all coupons."""
+	if coupon_code:
+		frappe.cache.hdel(COUPON_RULES_CACHE_KEY, coupon_code)
+	else:
+		frappe.cache.delete_value(COUPON_RULES_CACHE_KEY)
+
+
+def clear_category_coupon_rules(doc, method=None):
+	"""Category coupons list the events of their category, so recompile them when that changes."""
+	if doc.has_value_changed("category"):
+		clear_coupon_rules()
+
+
+def check_coupon_rules(rules: frappe._dict, event: str) -> tuple[bool, str]:
+	"""Check whether a coupon can be used for an event right now, without hitting the database."""
+	if not rules.is_active:
+		return False, _("Coupon is not active")
+
+	is_valid, msg = check_validity_period(rules)
+	if not is_valid:
+		return False, msg
+
+	if rules.events is not None and str(event) not in rules.events:
+		if rules.applies_to == "Event Category":
+			return False, _("Coupon is not valid for this event category")
+		return False, _("Coupon is not valid for this event")
+
+	return True, ""
+
+
+def check_validity_period(rules: frappe._dict) -> tuple[bool, str]:
+	today = getdate()
+
+	if rules.valid_from and today < rules.valid_from:
+		return False, _("Coupon is not yet active (starts {0})").format(rules.valid_from)
+
+	if rules.valid_till and today > rules.valid_till:
+		return False, _("Coupon expired on {0}").format(rules.valid_till)
+
+	return True, ""
+
+
+def check_min_order(rules: frappe._dict, order_amount) -> tuple[bool, str]:
+	if rules.minimum_order_value > 0:
+		if order_amount < rules.minimum_order_value:
+			gap = rules.minimum_order_value - order_amount
+			return False, _("Add {0} more to use this coupon (min order {1})").format(
+				gap, rules.minimum_order_value
+			)
+	return True, ""
+
+
+def get_coupon_usage(coupon_code: str, user: str) -> frappe._dict:
+	"""Live usage counters of a coupon, overall and for one user, in a single query."""
+	BuzzCouponCode = frappe.qb.DocType("Buzz Coupon Code")
+	BuzzCouponUsage = frappe.qb.DocType("Buzz Coupon Usage")
+
+	usage = (
+		frappe.qb.from_(BuzzCouponCode)
+		.left_join(BuzzCouponUsage)
+		.on(BuzzCouponUsage.name == get_coupon_usage_name(coupon_code, user))
+		.select(
+			BuzzCouponCode.times_used,
+			BuzzCouponCode.free_tickets_claimed,
+			BuzzCouponUsage.times_used.as_("user_times_used"),
+		)
+		.where(BuzzCouponCode.name == coupon_code)
+	).run(as_dict=True)
+
+	usage = usage[0] if usage else frappe._dict(times_used=0, free_tickets_claimed=0)
+	usage.user_times_used = usage.user_times_used or 0
+	return usage
+
+
+def check_coupon_usage(rules: frappe._dict, usage: frappe._dict) -> tuple[bool, str]:
+	"""Check the usage limits of a coupon against its live counters."""
+	if rules.max_usage_count > 0 and usage.times_used >= rules.max_usage_count:
+		return False, _("Coupon usage limit reached")
+
+	if rules.max_usage_per_user and usage.user_times_used >= rules.max_usage_per_user:
+		return False, _("You have reached the maximum usage limit for this coupon")
 
-	@property
-	def free_tickets_claimed(self):
-		"""Calculate total attendees from all submitted bookings using this coupon"""
-		from frappe.query_builder.functions import Count
+	return True, ""
 
-		EventBooking = frappe.qb.DocType("Event Booking")
-		EventBookingAttendee = frappe.qb.DocType("Event Booking Attendee")
 
-		count = (
+def generate_coupon_codes(template: str, count: int, prefix: str | None = None):
+	"""Create `count` copies of a template coupon, committing and reporting progress per batch."""
+	template_doc = frappe.get_doc("Buzz Coupon Code", template)
+	prefix = (prefix or "").strip().upper()
+
+	created = 0
+	while created < count:
+		codes = get_unique_coupon_codes(min(BULK_COUPON_BATCH_SIZE, count - created), prefix)
+		insert_coupon_copies(template_doc, codes)
+		created += len(codes)
+
+		frappe.db.commit()
+		frappe.publish_progress(
+			created * 100 / count,
+			title=_("Generating Coupon Codes"),
+			doctype=template_doc.doctype,
+			docname=template_doc.name,
+			description=_("{0} of {1} codes created").format(created, count),
+		)
+
+
+def get_unique_coupon_codes(count: int, prefix: str = "") -> list[str]:
+	"""Generate codes that are not used by any coupon, checking collisions a batch at a time."""
+	codes = set()
+	while len(codes) < count:
+		candidates = {
+			prefix + frappe.generate_hash(length=COUPON_CODE_LENGTH).upper()
+			for _ in range(count - len(codes))
+		} - codes
+		existing = frappe.get_all(
+			"Buzz Coupon Code", filters={"name": ("in", list(candidates))}, pluck="name"
+		)
+		codes |= candidates - set(existing)
+
+	return list(codes)
+
+
+def insert_coupon_copies(template_doc: BuzzCouponCode, codes: list[str]):
+	"""Bulk insert copies of the template coupon (and its free add-ons) under the given codes.
+
+	The template has been validated on save, so the copies skip document validation.
+	"""
+	timestamp = now()
+	user = frappe.session.user
+	standard_values = {"creation": timestamp, "modified": timestamp, "owner": user, "modified_by": user}
+
+	meta = frappe.get_meta(template_doc.doctype)
+	values = {
+		df.fieldname: template_doc.get(df.fieldname)
+		for df in meta.fields
+		if df.fieldtype not in no_value_fields
+		and df.fieldtype not in table_fields
+		and not df.no_copy
+		and df.fieldname != "code"
+	}
+	values.update(standard_values, generated_from=template_doc.name, times_used=0, free_tickets_claimed=0)
+
+	fields = ["name", "code", *values]
+	frappe.db.bulk_insert(
+		template_doc.doctype, fields, [(code, code, *values.values()) for code in codes], chunk_size=1000
+	)
+
+	if not template_doc.free_add_ons:
+		return
+
+	add_on_fields = ["name", "parent", "parenttype", "parentfield", "idx", "add_on", *standard_values]
+	frappe.db.bulk_insert(
+		"Coupon Free Add-on",
+		add_on_fields,
+		[
+			(
+				frappe.generate_hash(length=10),
+				code,
+				template_doc.doctype,
+				"free_add_ons",
+				row.idx,
+				row.add_on,
+				*standard_values.values(),
+			)
+			for code in codes
+			for row in template_doc.free_add_ons
+		],
+		chunk_size=1000,
+	)
+
+
+@frappe.whitelist()
+def export_generated_codes(template: str):
+	"""Queue a CSV export of the codes generated from a template coupon, announced to the user when ready."""
+	frappe.only_for(["Event Manager", "System Manager"])
+
+	frappe.enqueue(
+		"buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code.build_codes_export",
+		queue="long",
+		timeout=60 * 60,
+		job_id=f"export_generated_codes::{template}::{frappe.session.user}",
+		deduplicate=True,
+		template=template,
+		user=frappe.session.user,
+	)
+
+
+def build_codes_export(template: str, user: str):
+	"""Write the generated codes of a template to a private CSV file a page at a time and notify `user`."""
+	from buzz.ticketing.report.detailed_event_registrations.detailed_event_registrations import (
+		get_file_hash,
+	)
+
+	file_name = f"{frappe.scrub(template)}-codes-{frappe.generate_hash(length=8)}.csv"
+	path = frappe.get_site_path("private", "files", file_name)
+	with open(path, "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow(["Code", "Times Used", "Is Active"])
+		for codes in iter_generated_codes(template):
+			writer.writerows(codes)
+
+	export_file = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{file_name}",
+			"is_private": 1,
+			"content_hash": get_file_hash(path),
+			"attached_to_doctype": "Buzz Coupon Code",
+			"attached_to_name": template,
+		}
+	).insert(ignore_permissions=True)
+	frappe.db.commit()
+
+	frappe.publish_realtime(
+		"buzz_generated_codes_export",
+		{"template": template, "file_url": export_file.file_url},
+		user=user,
+	)
+
+
+def iter_generated_codes(template: str, page_size: int = BULK_COUPON_BATCH_SIZE):
+	"""Yield `(code, times_used, is_active)` rows of a template's codes, a page at a time (keyset on name)."""
+	last_name = ""
+	while codes := frappe.get_all(
+		"Buzz Coupon Code",
+		filters={"generated_from": template, "name": (">", last_name)},
+		fields=["name", "times_used", "is_active"],
+		order_by="name asc",
+		limit=page_size,
+		as_list=True,
+	):
+		yield codes
+		last_name = codes[-1][0]
+
+
+def get_coupon_usage_name(coupon_code: str, user: str) -> str:
+	"""Deterministic name of the usage row of a user, so it can be updated without a lookup."""
+	return hashlib.sha256(f"{coupon_code}\0{user}".encode()).hexdigest()[:20]
+
+
+def redeem_coupon(coupon_code: str, user: str, free_tickets: int = 0):
+	"""Claim one use of a coupon, and `free_tickets` of its free tickets, for a booking.
+
+	Each limit is enforced by a conditional increment ("add if there is room"), so concurrent
+	bookings can never over-allocate and no row is locked before the claim is made.
+	"""
+	BuzzCouponCode = frappe.qb.DocType("Buzz Coupon Code")
+	(
+		frappe.qb.update(BuzzCouponCode)
+		.set(BuzzCouponCode.times_used, BuzzCouponCode.times_used + 1)
+		.set(BuzzCouponCode.free_tickets_claimed, BuzzCouponCode.free_tickets_claimed + free_tickets)
+		.where(BuzzCouponCode.name == coupon_code)
+		.where(
+			(BuzzCouponCode.max_usage_count == 0)
+			| (BuzzCouponCode.times_used + 1 <= BuzzCouponCode.max_usage_count)
+		)
+		.where(
+			(BuzzCouponCode.coupon_type != "Free Tickets")
+			| (BuzzCouponCode.free_tickets_claimed + free_tickets <= BuzzCouponCode.number_of_free_tickets)
+		)
+	).run()
+
+	if not get_affected_rows():
+		coupon = frappe.get_doc("Buzz Coupon Code", coupon_code)
+		if coupon.coupon_type == "Free Tickets":
+			remaining = max(coupon.number_of_free_tickets - coupon.free_tickets_claimed, 0)
+			frappe.throw(_("Only {0} free tickets remaining").format(remaining))
+		frappe.throw(_("Coupon usage limit reached"))
+
+	frappe.clear_document_cache("Buzz Coupon Code", coupon_code)
+
+	max_usage_per_user = frappe.db.get_value("Buzz Coupon Code", coupon_code, "max_usage_per_user")
+	if not claim_user_usage(coupon_code, user, max_usage_per_user):
+		# The coupon claim above is rolled back with the rest of the transaction
+		frappe.throw(_("You have reached the maximum usage limit for this coupon"))
+
+
+def claim_user_usage(coupon_code: str, user: str, limit: int = 0) -> bool:
+	"""Add one use to a user's usage of a coupon, unless it would exceed `limit` (0 is unlimited)."""
+	BuzzCouponUsage = frappe.qb.DocType("Buzz Coupon Usage")
+	usage_name = get_coupon_usage_name(coupon_code, user)
+
+	query = (
+		frappe.qb.update(BuzzCouponUsage)
+		.set(BuzzCouponUsage.times_used, BuzzCouponUsage.times_used + 1)
+		.where(BuzzCouponUsage.name == usage_name)
+	)
+	if limit:
+		query = query.where(BuzzCouponUsage.times_used < limit)
+	query.run()
+
+	if get_affected_rows():
+		return True
+
+	if frappe.db.exists("Buzz Coupon Usage", usage_name):
+		return False
+
+	usage = frappe.new_doc("Buzz Coupon Usage")
+	usage.name = usage_name
+	usage.coupon_code = coupon_code
+	usage.user = user
+	usage.times_used = 1
+
+	frappe.db.savepoint("buzz_coupon_usage")
+	try:
+		usage.db_insert()
+	except frappe.DuplicateEntryError:
+		# A concurrent booking by the same user created the row first
+		frappe.db.rollback(save_point="buzz_coupon_usage")
+		return claim_user_usage(coupon_code, user, limit)
+
+	return True
+
+
+def release_coupon(coupon_code: str, user: str, free_tickets: int = 0):
+	"""Give back a use of a coupon claimed by `redeem_coupon`, e.g. when the booking is cancelled."""
+	BuzzCouponCode = frappe.qb.DocType("Buzz Coupon Code")
+	BuzzCouponUsage = frappe.qb.DocType("Buzz Coupon Usage")
+
+	(
+		frappe.qb.update(BuzzCouponCode)
+		.set(BuzzCouponCode.times_used, BuzzCouponCode.times_used - 1)
+		.set(BuzzCouponCode.free_tickets_claimed, BuzzCouponCode.free_tickets_claimed - free_tickets)
+		.where(BuzzCouponCode.name == coupon_code)
+	).run()
+	(
+		frappe.qb.update(BuzzCouponUsage)
+		.set(BuzzCouponUsage.times_used, BuzzCouponUsage.times_used - 1)
+		.where(BuzzCouponUsage.name == get_coupon_usage_name(coupon_code, user))
+		.where(BuzzCouponUsage.times_used > 0)
+	).run()
+
+	frappe.clear_document_cache("Buzz Coupon Code", coupon_code)
+
+
+def reconcile_coupon_usage(coupon_code: str | None = None):
+	"""Recompute usage counters of coupons from their submitted bookings."""
+	from frappe.query_builder.functions import Count
+
+	EventBooking = frappe.qb.DocType("Event Booking")
+	EventBookingAttendee = frappe.qb.DocType("Event Booking Attendee")
+	BuzzCouponCode = frappe.qb.DocType("Buzz Coupon Code")
+
+	coupon_filters = {"name": coupon_code} if coupon_code else {}
+	coupons = frappe.get_all("Buzz Coupon Code", filters=coupon_filters, fields=["name", "ticket_type"])
+	if not coupons:
+		return
+
+	coupon_names = [coupon.name for coupon in coupons]
+	usage_by_user = (
+		frappe.qb.from_(EventBooking)
+		.select(EventBooking.coupon_code, EventBooking.user, Count("*").as_("times_used"))
+		.where(EventBooking.coupon_code.isin(coupon_names))
+		.where(EventBooking.docstatus == 1)
+		.groupby(EventBooking.coupon_code, EventBooking.user)
+	).run(as_dict=True)
+
+	# Free tickets are the attendees of the coupon's ticket type that were not charged
+	free_tickets = dict(
+		(
 			frappe.qb.from_(EventBookingAttendee)
 			.join(EventBooking)
 			.on(EventBooking.name == EventBookingAttendee.parent)
-			.where(EventBooking.coupon_code == self.name)
+			.join(BuzzCouponCode)
+			.on(BuzzCouponCode.name == EventBooking.coupon_code)
+			.select(EventBooking.coupon_code, Count("*"))
+			.where(EventBooking.coupon_code.isin(coupon_names))
 			.where(EventBooking.docstatus == 1)
-			.where(EventBookingAttendee.ticket_type == self.ticket_type)
-			.select(Count(EventBookingAttendee.name))
-		).run()[0][0]
+			.where(BuzzCouponCode.coupon_type == "Free Tickets")
+			.where(EventBookingAttendee.ticket_type == BuzzCouponCode.ticket_type)
+			.where(EventBookingAttendee.amount == 0)
+			.groupby(EventBooking.coupon_code)
+		).run()
+	)
+
+	times_used = {}
+	for row in usage_by_user:
+		times_used[row.coupon_code] = times_used.get(row.coupon_code, 0) + row.times_used
+
+	for coupon in coupon_names:
+		frappe.db.set_value(
+			"Buzz Coupon Code",
+			coupon,
+			{"times_used": times_used.get(coupon, 0), "free_tickets_claimed": free_tickets.get(coupon, 0)},
+			update_modified=False,
+		)
 
-		return count or 0
+	frappe.db.delete("Buzz Coupon Usage", {"coupon_code": ("in", coupon_names)})
+	now = frappe.utils.now()
+	frappe.db.bulk_insert(
+		"Buzz Coupon Usage",
+		["name", "coupon_code", "user", "times_used", "creation", "modified", "owner", "modified_by"],
+		[
+			(
+				get_coupon_usage_name(row.coupon_code, row.user),
+				row.coupon_code,
+				row.user,
+				row.times_used,
+				now,
+				now,
+				frappe.session.user,
+				frappe.session.user,
+			)
+			for row in usage_by_user
+		],
+	)
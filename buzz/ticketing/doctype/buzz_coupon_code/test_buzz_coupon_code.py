@@ -1,6 +1,9 @@
 # Copyright (c) 2025, BWH Studios and Contributors
 # See license.txt
 
+import csv
+from unittest.mock import patch
+
 import frappe
 from frappe.tests import IntegrationTestCase
 
@@ -247,6 +250,7 @@ class IntegrationTestBuzzCouponCode(IntegrationTestCase):
 			booking.submit()
 
 		# Verify all 5 bookings were created
+		coupon.reload()
 		self.assertEqual(coupon.times_used, 5)
 
 	# ==================== MAX DISCOUNT CAP TESTS ====================
@@ -572,6 +576,7 @@ class IntegrationTestBuzzCouponCode(IntegrationTestCase):
 		booking1.submit()
 
 		# Verify 2 claimed
+		coupon.reload()
 		self.assertEqual(coupon.free_tickets_claimed, 2)
 
 		# Second booking: claim 2 more (4 total, 1 remaining)
@@ -598,6 +603,7 @@ class IntegrationTestBuzzCouponCode(IntegrationTestCase):
 		booking2.submit()
 
 		# Verify 4 claimed
+		coupon.reload()
 		self.assertEqual(coupon.free_tickets_claimed, 4)
 
 		# Third booking: try to claim 3, but only 1 remaining
@@ -1081,6 +1087,170 @@ class IntegrationTestBuzzCouponCode(IntegrationTestCase):
 		# Coupon should be tracked in booking
 		self.assertEqual(booking.coupon_code, "TESTTRACK")
 
+	def _make_booking(self, coupon, num_attendees=1, user="Administrator"):
+		return frappe.get_doc(
+			{
+				"doctype": "Event Booking",
+				"event": self.test_event.name,
+				"user": user,
+				"coupon_code": coupon.name,
+				"attendees": [
+					{
+						"ticket_type": self.test_ticket_type.name,
+						"full_name": f"Counter User {i}",
+						"email": f"counter{i}@test.com",
+					}
+					for i in range(num_attendees)
+				],
+			}
+		).insert()
+
+	def test_usage_counters_follow_submit_and_cancel(self):
+		"""Usage counters should be maintained on submit and rolled back on cancel."""
+		coupon = frappe.get_doc(
+			{
+				"doctype": "Buzz Coupon Code",
+				"coupon_type": "Free Tickets",
+				"applies_to": "Event",
+				"event": self.test_event.name,
+				"ticket_type": self.test_ticket_type.name,
+				"number_of_free_tickets": 5,
+				"is_active": True,
+			}
+		).insert()
+
+		booking = self._make_booking(coupon, num_attendees=2)
+		booking.submit()
+		self._make_booking(coupon).submit()
+
+		coupon.reload()
+		self.assertEqual(coupon.times_used, 2)
+		self.assertEqual(coupon.free_tickets_claimed, 3)
+		self.assertEqual(coupon.get_user_usage("Administrator"), 2)
+
+		booking.cancel()
+
+		coupon.reload()
+		self.assertEqual(coupon.times_used, 1)
+		self.assertEqual(coupon.free_tickets_claimed, 1)
+		self.assertEqual(coupon.get_user_usage("Administrator"), 1)
+
+	def test_reconcile_usage_counters(self):
+		"""Reconciling should rebuild counters from submitted bookings."""
+		from buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code import reconcile_coupon_usage
+
+		coupon = frappe.get_doc(
+			{
+				"doctype": "Buzz Coupon Code",
+				"coupon_type": "Discount",
+				"discount_type": "Percentage",
+				"discount_value": 10,
+				"is_active": True,
+			}
+		).insert()
+		self._make_booking(coupon).submit()
+		self._make_booking(coupon).submit()
+
+		frappe.db.set_value("Buzz Coupon Code", coupon.name, "times_used", 0)
+		frappe.db.delete("Buzz Coupon Usage", {"coupon_code": coupon.name})
+
+		reconcile_coupon_usage(coupon.name)
+
+		coupon.reload()
+		self.assertEqual(coupon.times_used, 2)
+		self.assertEqual(coupon.get_user_usage("Administrator"), 2)
+
+	# ==================== BULK GENERATION TESTS ====================
+
+	@patch("frappe.db.commit")
+	@patch("buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code.BULK_COUPON_BATCH_SIZE", 10)
+	@patch("frappe.publish_progress")
+	def test_generate_coupon_codes_copies_template(self, mock_publish_progress, mock_commit):
+		"""Bulk generated codes should copy the template, including free add-ons."""
+		from buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code import generate_coupon_codes
+
+		template = frappe.get_doc(
+			{
+				"doctype": "Buzz Coupon Code",
+				"coupon_type": "Free Tickets",
+				"applies_to": "Event",
+				"event": self.test_event.name,
+				"ticket_type": self.test_ticket_type.name,
+				"number_of_free_tickets": 1,
+				"max_usage_per_user": 1,
+				"free_add_ons": [{"add_on": self.test_add_on.name}],
+				"is_active": True,
+			}
+		).insert()
+
+		generate_coupon_codes(template.name, 25, prefix="partner-")
+
+		codes = frappe.get_all("Buzz Coupon Code", filters={"generated_from": template.name}, pluck="name")
+		self.assertEqual(len(codes), 25)
+		self.assertTrue(all(code.startswith("PARTNER-") for code in codes))
+		# One progress update per batch
+		self.assertEqual(mock_publish_progress.call_count, 3)
+
+		coupon = frappe.get_doc("Buzz Coupon Code", codes[0])
+		self.assertEqual(coupon.code, coupon.name)
+		self.assertEqual(coupon.number_of_free_tickets, 1)
+		self.assertEqual(coupon.max_usage_per_user, 1)
+		self.assertEqual(coupon.times_used, 0)
+		self.assertEqual([row.add_on for row in coupon.free_add_ons], [self.test_add_on.name])
+
+	@patch("frappe.db.commit")
+	@patch("frappe.publish_realtime")
+	@patch("frappe.publish_progress")
+	def test_export_generated_codes_in_pages(self, mock_publish_progress, mock_publish_realtime, mock_commit):
+		"""Generated codes should be read a page at a time, each code exactly once."""
+		from buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code import (
+			build_codes_export,
+			generate_coupon_codes,
+			iter_generated_codes,
+		)
+
+		template = frappe.get_doc(
+			{
+				"doctype": "Buzz Coupon Code",
+				"coupon_type": "Discount",
+				"discount_type": "Percentage",
+				"discount_value": 10,
+				"is_active": True,
+			}
+		).insert()
+		generate_coupon_codes(template.name, 25)
+
+		pages = list(iter_generated_codes(template.name, page_size=10))
+		self.assertEqual([len(page) for page in pages], [10, 10, 5])
+		codes = [row[0] for page in pages for row in page]
+		self.assertEqual(codes, sorted(codes))
+
+		build_codes_export(template.name, "Administrator")
+		file_url = mock_publish_realtime.call_args.args[1]["file_url"]
+		with open(frappe.get_site_path(file_url.lstrip("/")), newline="") as f:
+			rows = list(csv.reader(f))
+		self.assertEqual(rows[0], ["Code", "Times Used", "Is Active"])
+		self.assertEqual([row[0] for row in rows[1:]], codes)
+
+	def test_unique_coupon_codes_skip_existing(self):
+		"""Candidate codes that already exist should be replaced."""
+		from buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code import get_unique_coupon_codes
+
+		frappe.get_doc(
+			{
+				"doctype": "Buzz Coupon Code",
+				"code": "TAKEN001",
+				"coupon_type": "Discount",
+				"discount_type": "Percentage",
+				"discount_value": 10,
+			}
+		).insert()
+
+		with patch("frappe.generate_hash", side_effect=["taken001", "fresh001", "fresh002"]):
+			codes = get_unique_coupon_codes(2)
+
+		self.assertEqual(sorted(codes), ["FRESH001", "FRESH002"])
+
 
 class TestValidateCouponAPI(IntegrationTestCase):
 	"""Test the validate_coupon API endpoint."""
@@ -1174,6 +1344,66 @@ class TestValidateCouponAPI(IntegrationTestCase):
 		self.assertFalse(result["valid"])
 		self.assertIn("error", result)
 
+	def test_validate_coupon_uses_compiled_rules(self):
+		"""Test that static coupon rules are served from cache and recompiled when the coupon is saved."""
+		from buzz.api import validate_coupon
+
+		coupon = frappe.get_doc(
+			{
+				"doctype": "Buzz Coupon Code",
+				"code": "RULESCACHE",
+				"coupon_type": "Discount",
+				"discount_type": "Percentage",
+				"discount_value": 10,
+				"applies_to": "Event Category",
+				"event_category": self.test_event.category,
+				"is_active": True,
+			}
+		).insert()
+
+		self.assertTrue(validate_coupon("RULESCACHE", str(self.test_event.name))["valid"])
+
+		compile_path = "buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code.compile_coupon_rules"
+		with patch(compile_path) as mock_compile:
+			result = validate_coupon("RULESCACHE", str(self.test_event.name))
+		mock_compile.assert_not_called()
+		self.assertEqual(result["discount_value"], 10)
+
+		coupon.discount_value = 15
+		coupon.save()
+		self.assertEqual(validate_coupon("RULESCACHE", str(self.test_event.name))["discount_value"], 15)
+
+		coupon.is_active = False
+		coupon.save()
+		result = validate_coupon("RULESCACHE", str(self.test_event.name))
+		self.assertFalse(result["valid"])
+		self.assertEqual(result["error"], "Coupon is not active")
+
+	def test_compiled_rules_shared_across_code_case(self):
+		"""Test that a code typed in another case uses the same rules, and sees the coupon disabled."""
+		from buzz.api import validate_coupon
+
+		coupon = frappe.get_doc(
+			{
+				"doctype": "Buzz Coupon Code",
+				"code": "CASECACHE",
+				"coupon_type": "Discount",
+				"discount_type": "Percentage",
+				"discount_value": 10,
+				"applies_to": "Event",
+				"event": self.test_event.name,
+				"is_active": True,
+			}
+		).insert()
+
+		self.assertTrue(validate_coupon("casecache", str(self.test_event.name))["valid"])
+
+		coupon.is_active = False
+		coupon.save()
+		result = validate_coupon("casecache", str(self.test_event.name))
+		self.assertFalse(result["valid"])
+		self.assertEqual(result["error"], "Coupon is not active")
+
 	# ==================== VALIDITY PERIOD TESTS ====================
 
 	def test_coupon_not_yet_active(self):
@@ -1336,3 +1566,91 @@ class TestValidateCouponAPI(IntegrationTestCase):
 		frappe.set_user("Administrator")
 
 		self.assertTrue(result["valid"])
+
+
+class TestCouponRedemptionConcurrency(IntegrationTestCase):
+	"""Redeem coupons from parallel database connections and check nothing is over-allocated.
+
+	Other connections only see committed data, so these tests commit their fixtures and
+	clean up after themselves.
+	"""
+
+	def setUp(self):
+		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		self.ticket_type = frappe.get_doc(
+			{"doctype": "Event Ticket Type", "event": test_event.name, "title": "Concurrency Ticket"}
+		).insert()
+		self.coupon = None
+		self.test_event = test_event
+
+	def tearDown(self):
+		if self.coupon:
+			frappe.db.delete("Buzz Coupon Usage", {"coupon_code": self.coupon.name})
+			frappe.delete_doc("Buzz Coupon Code", self.coupon.name, force=True)
+		frappe.delete_doc("Event Ticket Type", self.ticket_type.name, force=True)
+		frappe.db.commit()
+
+	def _create_coupon(self, **values):
+		self.coupon = frappe.get_doc({"doctype": "Buzz Coupon Code", "is_active": True, **values}).insert()
+		frappe.db.commit()
+		return self.coupon
+
+	def _redeem_in_parallel(self, claims: list[tuple[str, int]]) -> list[bool]:
+		"""Run `redeem_coupon` for each (user, free_tickets) claim on its own connection, all at once."""
+		import threading
+		from concurrent.futures import ThreadPoolExecutor
+
+		from buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code import redeem_coupon
+
+		site, sites_path = frappe.local.site, frappe.local.sites_path
+		barrier = threading.Barrier(len(claims))
+
+		def redeem(claim):
+			user, free_tickets = claim
+			frappe.init(site, sites_path=sites_path)
+			frappe.connect()
+			try:
+				barrier.wait()
+				redeem_coupon(self.coupon.name, user, free_tickets)
+				frappe.db.commit()
+				return True
+			except frappe.ValidationError:
+				frappe.db.rollback()
+				return False
+			finally:
+				frappe.destroy()
+
+		with ThreadPoolExecutor(max_workers=len(claims)) as executor:
+			return list(executor.map(redeem, claims))
+
+	def test_parallel_free_ticket_claims_do_not_over_allocate(self):
+		coupon = self._create_coupon(
+			coupon_type="Free Tickets",
+			applies_to="Event",
+			event=self.test_event.name,
+			ticket_type=self.ticket_type.name,
+			number_of_free_tickets=5,
+		)
+
+		results = self._redeem_in_parallel([("Administrator", 2)] * 8)
+
+		coupon.reload()
+		self.assertEqual(results.count(True), 2)
+		self.assertEqual(coupon.free_tickets_claimed, 4)
+		self.assertEqual(coupon.times_used, 2)
+
+	def test_parallel_claims_respect_per_user_limit(self):
+		coupon = self._create_coupon(
+			coupon_type="Discount",
+			discount_type="Percentage",
+			discount_value=10,
+			max_usage_per_user=1,
+		)
+
+		results = self._redeem_in_parallel([("Administrator", 0)] * 8)
+
+		coupon.reload()
+		self.assertEqual(results.count(True), 1)
+		# Failed claims must not leave their coupon increment behind
+		self.assertEqual(coupon.times_used, 1)
+		self.assertEqual(coupon.get_user_usage("Administrator"), 1)
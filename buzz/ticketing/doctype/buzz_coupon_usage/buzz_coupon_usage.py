@@ -0,0 +1,22 @@
+# Copyright (c) 2026, BWH Studios and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class BuzzCouponUsage(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		coupon_code: DF.Link
+		times_used: DF.Int
+		user: DF.Link
+	# end: auto-generated types
+
+	pass
@@ -10,5 +10,13 @@ frappe.ui.form.on("Event Booking", {
 				},
 			};
 		});
+
+		if (frm.doc.docstatus === 1 && frm.doc.ticket_generation_status === "Failed") {
+			frm.add_custom_button(__("Retry Ticket Generation"), () => {
+				frm.call({ doc: frm.doc, method: "retry_ticket_generation", freeze: true }).then(() =>
+					frm.reload_doc()
+				);
+			});
+		}
 	},
 });
@@ -5,8 +5,31 @@ import json
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from frappe.utils import add_to_date, now_datetime
 
+from buzz.buzz.doctype.buzz_custom_field.buzz_custom_field import get_custom_field_map
 from buzz.payments import mark_payment_as_received
+from buzz.qr import prerender_qr_images
+from buzz.ticketing.doctype.buzz_coupon_code.buzz_coupon_code import (
+	check_coupon_rules,
+	check_coupon_usage,
+	check_min_order,
+	get_coupon_rules,
+	get_coupon_usage,
+	redeem_coupon,
+	release_coupon,
+)
+from buzz.ticketing.doctype.event_ticket.event_ticket import (
+	enqueue_ticket_delivery,
+	generate_qr_codes_on_demand,
+)
+from buzz.ticketing.doctype.event_ticket_type.event_ticket_type import (
+	release_reserved_tickets,
+	reserve_tickets,
+)
+from buzz.utils import get_affected_rows
+
+TICKET_GENERATION_CHUNK_SIZE = 20
 
 
 class EventBooking(Document):
@@ -31,9 +54,13 @@ class EventBooking(Document):
 		event: DF.Link
 		naming_series: DF.Literal["B.###"]
 		net_amount: DF.Currency
+		reservation_status: DF.Literal["", "Held", "Converted", "Released", "Expired"]
+		reserved_until: DF.Datetime | None
 		tax_amount: DF.Currency
 		tax_label: DF.Data | None
 		tax_percentage: DF.Percent
+		ticket_generation_status: DF.Literal["", "Queued", "In Progress", "Completed", "Failed", "Cancelled"]
+		tickets_generated: DF.Int
 		total_amount: DF.Currency
 		user: DF.Link
 		utm_parameters: DF.Table[UTMParameter]
@@ -52,14 +79,36 @@ class EventBooking(Document):
 
 	def set_total(self):
 		self.net_amount = 0
+		add_ons_by_attendee = self.get_attendee_add_ons()
 		for attendee in self.attendees:
 			self.net_amount += attendee.amount
 			if attendee.add_ons:
-				attendee.add_on_total = attendee.get_add_on_total()
-				attendee.number_of_add_ons = attendee.get_number_of_add_ons()
+				add_ons = add_ons_by_attendee.get(attendee.add_ons, [])
+				attendee.add_on_total = sum(add_on.price for add_on in add_ons)
+				attendee.number_of_add_ons = len(add_ons)
 				self.net_amount += attendee.add_on_total
 		self.total_amount = self.net_amount
 
+	def get_attendee_add_ons(self, attendees: list | None = None) -> dict[str, list]:
+		"""Return add-on rows of all attendees in one query, keyed by Attendee Ticket Add-on name."""
+		add_on_doc_names = list(
+			{attendee.add_ons for attendee in attendees or self.attendees if attendee.add_ons}
+		)
+		if not add_on_doc_names:
+			return {}
+
+		add_on_rows = frappe.get_all(
+			"Ticket Add-on Value",
+			filters={"parenttype": "Attendee Ticket Add-on", "parent": ("in", add_on_doc_names)},
+			fields=["parent", "add_on", "value", "price", "currency"],
+			order_by="idx asc",
+		)
+
+		add_ons_by_attendee = {}
+		for row in add_on_rows:
+			add_ons_by_attendee.setdefault(row.parent, []).append(row)
+		return add_ons_by_attendee
+
 	def apply_taxes_if_applicable(self):
 		"""Apply tax based on event-level tax configuration."""
 		self.tax_percentage = 0
@@ -77,19 +126,23 @@ class EventBooking(Document):
 			self.tax_amount = self.total_amount * (self.tax_percentage / 100)
 			self.total_amount += self.tax_amount
 
-	def validate_ticket_availability(self):
+	def get_num_tickets_by_type(self, attendees: list | None = None) -> dict:
 		num_tickets_by_type = {}
-		for attendee in self.attendees:
+		for attendee in attendees or self.attendees:
 			if attendee.ticket_type not in num_tickets_by_type:
 				num_tickets_by_type[attendee.ticket_type] = 0
 			num_tickets_by_type[attendee.ticket_type] += 1
+		return num_tickets_by_type
 
-		for ticket_type, num_tickets in num_tickets_by_type.items():
+	def validate_ticket_availability(self):
+		for ticket_type, num_tickets in self.get_num_tickets_by_type().items():
 			ticket_type_doc = frappe.get_cached_doc("Event Ticket Type", ticket_type)
 			if not ticket_type_doc.is_published:
 				frappe.throw(frappe._(f"{ticket_type} tickets no longer available!"))
 
-			if not ticket_type_doc.are_tickets_available(num_tickets):
+			# Tickets held by this booking are already counted as reserved
+			num_already_held = num_tickets if self.reservation_status == "Held" else 0
+			if not ticket_type_doc.are_tickets_available(num_tickets - num_already_held):
 				frappe.throw(
 					frappe._(
 						f"Only {ticket_type_doc.remaining_tickets} tickets available for {ticket_type}, you are trying to book {num_tickets}!"
@@ -106,55 +159,176 @@ class EventBooking(Document):
 			if not attendee.currency:
 				attendee.currency = currency
 
-	def on_submit(self):
-		self.validate_coupon_availability()
-		self.generate_tickets()
+	def after_insert(self):
+		self.hold_tickets()
 
-	def validate_coupon_availability(self):
-		"""Re-validate coupon with lock to prevent race condition."""
-		if not self.coupon_code:
-			return
+	def hold_tickets(self):
+		"""Reserve this booking's tickets until it is paid for or the hold expires."""
+		for ticket_type, num_tickets in self.get_num_tickets_by_type().items():
+			if not reserve_tickets(ticket_type, num_tickets):
+				ticket_type_doc = frappe.get_cached_doc("Event Ticket Type", ticket_type)
+				frappe.throw(
+					_("Only {0} tickets available for {1}, you are trying to book {2}!").format(
+						max(ticket_type_doc.remaining_tickets, 0), ticket_type_doc.title, num_tickets
+					)
+				)
 
-		# Lock coupon row to prevent concurrent over-allocation
-		coupon = frappe.get_doc("Buzz Coupon Code", self.coupon_code, for_update=True)
+		hold_minutes = frappe.db.get_single_value("Buzz Settings", "ticket_hold_minutes") or 15
+		self.db_set(
+			{
+				"reservation_status": "Held",
+				"reserved_until": add_to_date(now_datetime(), minutes=hold_minutes),
+			},
+			update_modified=False,
+		)
+
+	def release_ticket_hold(self, status: str = "Released"):
+		"""Give held tickets back to the pool.
+
+		The status flip is a conditional update so a booking is released only once,
+		even if the expiry job and a payment callback race each other.
+		"""
+		if not self.end_reservation(status):
+			return
 
-		if coupon.coupon_type == "Free Tickets":
-			# Count claimed tickets excluding current booking (since it's already docstatus=1 during on_submit)
-			claimed = self.get_free_tickets_claimed_excluding_self(coupon)
-			remaining = coupon.number_of_free_tickets - claimed
+		for ticket_type, num_tickets in self.get_num_tickets_by_type().items():
+			release_reserved_tickets(ticket_type, num_tickets)
 
-			# Count only attendees that were actually discounted (amount == 0)
-			# This supports partial allocation where user books more tickets than remaining free
-			coupon_ticket_type = str(coupon.ticket_type) if coupon.ticket_type else ""
-			tickets_discounted = len(
-				[a for a in self.attendees if str(a.ticket_type) == coupon_ticket_type and a.amount == 0]
-			)
+	def end_reservation(self, status: str) -> bool:
+		"""Move a held reservation to `status`; returns False if it was not held anymore."""
+		EventBooking = frappe.qb.DocType("Event Booking")
+		(
+			frappe.qb.update(EventBooking)
+			.set(EventBooking.reservation_status, status)
+			.where(EventBooking.name == self.name)
+			.where(EventBooking.reservation_status == "Held")
+		).run()
+
+		if not get_affected_rows():
+			return False
+
+		self.reservation_status = status
+		frappe.clear_document_cache(self.doctype, self.name)
+		return True
+
+	def before_submit(self):
+		# The hold may have expired or been released while the booking waited for payment.
+		# Read under a lock, so the expiry job cannot release it between this check and the sale.
+		self.reservation_status = frappe.db.get_value(
+			self.doctype, self.name, "reservation_status", for_update=True
+		)
+		if self.reservation_status != "Held":
+			self.hold_tickets()
 
-			if remaining < tickets_discounted:
-				frappe.throw(_("Only {0} free tickets remaining").format(remaining))
+	def on_submit(self):
+		# Claimed before any ticket is generated, so a coupon that ran out stops the booking
+		# before ticket side effects (QR files, Zoom registrations) happen
+		self.redeem_coupon()
+
+		if self.should_generate_tickets_in_background():
+			self.enqueue_ticket_generation()
+		else:
+			self.generate_tickets()
+			self.db_set("tickets_generated", len(self.attendees), update_modified=False)
+			# Generated tickets now count as sold, so the hold is no longer needed
+			self.release_ticket_hold("Converted")
+
+	def should_generate_tickets_in_background(self) -> bool:
+		threshold = frappe.db.get_single_value("Buzz Settings", "background_ticket_generation_threshold")
+		return bool(threshold) and len(self.attendees) > threshold
+
+	def enqueue_ticket_generation(self):
+		self.db_set("ticket_generation_status", "Queued", update_modified=False)
+		frappe.enqueue_doc(
+			self.doctype,
+			self.name,
+			"generate_tickets_in_background",
+			queue="long",
+			timeout=60 * 60,
+			enqueue_after_commit=True,
+			job_id=f"generate_tickets::{self.name}",
+			deduplicate=True,
+		)
+
+	@frappe.whitelist()
+	def retry_ticket_generation(self):
+		"""Resume a failed background ticket generation from the first missing ticket."""
+		frappe.only_for(["Event Manager", "System Manager"])
+		if self.docstatus != 1 or self.ticket_generation_status != "Failed":
+			frappe.throw(_("Only failed ticket generation can be retried"))
+
+		self.enqueue_ticket_generation()
+
+	def generate_tickets_in_background(self):
+		"""Generate tickets in chunks, committing after each chunk.
+
+		`tickets_generated` is committed together with the tickets of a chunk, so a
+		crashed or retried job resumes from the first attendee without a ticket and
+		never creates duplicates. The job stops once the booking is cancelled.
+		"""
+		if self.ticket_generation_status == "Completed":
+			return
+		if self.docstatus == 2:
+			self.db_set("ticket_generation_status", "Cancelled", update_modified=False)
+			return
 
-	def get_free_tickets_claimed_excluding_self(self, coupon):
-		"""Get free tickets claimed excluding current booking."""
-		from frappe.query_builder.functions import Count
+		self.db_set("ticket_generation_status", "In Progress", update_modified=False, commit=True)
 
-		EventBooking = frappe.qb.DocType("Event Booking")
-		EventBookingAttendee = frappe.qb.DocType("Event Booking Attendee")
-
-		count = (
-			frappe.qb.from_(EventBookingAttendee)
-			.join(EventBooking)
-			.on(EventBooking.name == EventBookingAttendee.parent)
-			.where(EventBooking.coupon_code == coupon.name)
-			.where(EventBooking.docstatus == 1)
-			.where(EventBooking.name != self.name)
-			.where(EventBookingAttendee.ticket_type == coupon.ticket_type)
-			.select(Count(EventBookingAttendee.name))
-		).run()[0][0]
-
-		return count or 0
-
-	def generate_tickets(self):
-		for attendee in self.attendees:
+		try:
+			while pending_attendees := self.attendees[self.tickets_generated :]:
+				# The booking stays locked until the chunk is committed, so a cancellation
+				# either waits for the chunk or is seen here before the next one
+				if frappe.db.get_value(self.doctype, self.name, "docstatus", for_update=True) == 2:
+					self.db_set("ticket_generation_status", "Cancelled", update_modified=False)
+					return
+
+				chunk = pending_attendees[:TICKET_GENERATION_CHUNK_SIZE]
+				self.generate_tickets(chunk)
+
+				# Tickets of this chunk now count as sold, so release their share of the hold
+				if self.reservation_status == "Held":
+					for ticket_type, num_tickets in self.get_num_tickets_by_type(chunk).items():
+						release_reserved_tickets(ticket_type, num_tickets)
+
+				self.db_set("tickets_generated", self.tickets_generated + len(chunk), update_modified=False)
+				frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			self.db_set("ticket_generation_status", "Failed", update_modified=False, commit=True)
+			frappe.log_error(title=_("Ticket generation failed for booking {0}").format(self.name))
+			raise
+
+		self.end_reservation("Converted")
+		self.db_set("ticket_generation_status", "Completed", update_modified=False)
+
+	def get_free_tickets_used(self, coupon) -> int:
+		"""Count attendees that were actually discounted (amount == 0) by a Free Tickets coupon.
+
+		This supports partial allocation where user books more tickets than remaining free.
+		"""
+		coupon_ticket_type = str(coupon.ticket_type) if coupon.ticket_type else ""
+		return len([a for a in self.attendees if str(a.ticket_type) == coupon_ticket_type and a.amount == 0])
+
+	def get_coupon_free_tickets(self) -> int:
+		coupon = get_coupon_rules(self.coupon_code)
+		return self.get_free_tickets_used(coupon) if coupon.coupon_type == "Free Tickets" else 0
+
+	def redeem_coupon(self):
+		"""Claim the coupon for this booking, failing if it ran out since it was applied."""
+		if self.coupon_code:
+			redeem_coupon(self.coupon_code, self.user, self.get_coupon_free_tickets())
+
+	def release_coupon(self):
+		if self.coupon_code:
+			release_coupon(self.coupon_code, self.user, self.get_coupon_free_tickets())
+
+	def generate_tickets(self, attendees: list | None = None):
+		attendees = attendees or self.attendees
+		add_ons_by_attendee = self.get_attendee_add_ons(attendees)
+		# Custom field definitions give proper labels and types to attendee values
+		custom_field_map = get_custom_field_map(self.event, "Ticket")
+		tickets = []
+		for attendee in attendees:
 			ticket = frappe.new_doc("Event Ticket")
 			ticket.event = self.event
 			ticket.booking = self.name
@@ -162,9 +336,16 @@ class EventBooking(Document):
 			ticket.attendee_name = attendee.full_name
 			ticket.attendee_email = attendee.email
 
-			if attendee.add_ons:
-				add_ons_list = frappe.get_cached_doc("Attendee Ticket Add-on", attendee.add_ons).add_ons
-				ticket.add_ons = add_ons_list
+			for add_on in add_ons_by_attendee.get(attendee.add_ons, []):
+				ticket.append(
+					"add_ons",
+					{
+						"add_on": add_on.add_on,
+						"value": add_on.value,
+						"price": add_on.price,
+						"currency": add_on.currency,
+					},
+				)
 
 			# Add custom fields from attendee to ticket
 			if attendee.custom_fields:
@@ -175,14 +356,6 @@ class EventBooking(Document):
 					except (json.JSONDecodeError, TypeError):
 						custom_fields_data = {}
 
-				# Get custom field definitions for this event to get proper labels and types
-				custom_field_defs = frappe.db.get_all(
-					"Buzz Custom Field",
-					filters={"event": self.event, "enabled": 1, "applied_to": "Ticket"},
-					fields=["fieldname", "label", "fieldtype"],
-				)
-				custom_field_map = {cf["fieldname"]: cf for cf in custom_field_defs}
-
 				for field_name, field_value in custom_fields_data.items():
 					if field_value and field_name in custom_field_map:
 						field_def = custom_field_map[field_name]
@@ -197,12 +370,23 @@ class EventBooking(Document):
 						)
 
 			ticket.flags.ignore_permissions = 1
-			ticket.insert().submit()
+			tickets.append(ticket.insert())
+
+		# Render all QR codes in one batch instead of one by one on submit
+		if not generate_qr_codes_on_demand():
+			prerender_qr_images([ticket.get_qr_payload() for ticket in tickets])
+		for ticket in tickets:
+			ticket.flags.defer_ticket_email = True
+			ticket.submit()
+
+		enqueue_ticket_delivery([ticket.name for ticket in tickets])
 
 	def on_payment_authorized(self, payment_status: str):
 		if payment_status in ("Authorized", "Completed"):
 			# payment success, submit the booking
 			self.update_payment_record()
+		elif payment_status in ("Failed", "Cancelled"):
+			self.release_ticket_hold()
 
 	def update_payment_record(self):
 		try:
@@ -213,9 +397,28 @@ class EventBooking(Document):
 			frappe.log_error(frappe.get_traceback(), _("Booking Failed"))
 			frappe.throw(frappe._("Booking Failed! Please contact support."))
 
+	def on_trash(self):
+		self.release_ticket_hold()
+
 	def on_cancel(self):
 		self.ignore_linked_doctypes = ["Ticket Cancellation Request"]
 		self.cancel_all_tickets()
+		self.release_coupon()
+		self.release_pending_tickets()
+
+	def release_pending_tickets(self):
+		"""Give back the held tickets of attendees still waiting for background generation."""
+		if not self.end_reservation("Released"):
+			return
+
+		# Read after the booking row is locked, a chunk committed meanwhile is already released
+		self.tickets_generated = frappe.db.get_value(self.doctype, self.name, "tickets_generated")
+		pending_attendees = self.attendees[self.tickets_generated :]
+		if not pending_attendees:
+			return
+
+		for ticket_type, num_tickets in self.get_num_tickets_by_type(pending_attendees).items():
+			release_reserved_tickets(ticket_type, num_tickets)
 
 	def cancel_all_tickets(self):
 		tickets = frappe.db.get_all("Event Ticket", filters={"booking": self.name}, pluck="name")
@@ -228,22 +431,21 @@ class EventBooking(Document):
 		if not self.coupon_code:
 			return
 
-		coupon = frappe.get_cached_doc("Buzz Coupon Code", self.coupon_code)
+		coupon = get_coupon_rules(self.coupon_code)
+		if not coupon:
+			frappe.throw(_("Invalid coupon code"))
 
-		is_valid, error_msg = coupon.is_valid_for_event(self.event)
+		is_valid, error_msg = check_coupon_rules(coupon, self.event)
 		if not is_valid:
 			frappe.throw(error_msg)
 
-		is_available, error_msg = coupon.is_usage_available()
+		usage = get_coupon_usage(self.coupon_code, frappe.session.user)
+		is_available, error_msg = check_coupon_usage(coupon, usage)
 		if not is_available:
 			frappe.throw(error_msg)
 
-		is_limited, error_msg = coupon.is_user_limit_reached()
-		if is_limited:
-			frappe.throw(error_msg)
-
 		if coupon.coupon_type == "Discount":
-			is_met, error_msg = coupon.is_min_order_met(self.net_amount)
+			is_met, error_msg = check_min_order(coupon, self.net_amount)
 			if not is_met:
 				frappe.throw(error_msg)
 			if coupon.discount_type == "Percentage":
@@ -259,8 +461,9 @@ class EventBooking(Document):
 
 		# Free Tickets - only discount attendees with matching ticket type
 		elif coupon.coupon_type == "Free Tickets":
-			remaining = coupon.number_of_free_tickets - coupon.free_tickets_claimed
-			free_add_on_names = [row.add_on for row in coupon.free_add_ons]
+			remaining = coupon.number_of_free_tickets - usage.free_tickets_claimed
+			free_add_on_names = coupon.free_add_ons
+			add_ons_by_attendee = self.get_attendee_add_ons() if free_add_on_names else {}
 
 			# Only discount attendees with matching ticket type
 			# Use str() to handle int/string type mismatch in document names
@@ -279,8 +482,7 @@ class EventBooking(Document):
 
 				# Discount free add-ons for this attendee
 				if attendee.add_ons and free_add_on_names:
-					add_on_doc = frappe.get_cached_doc("Attendee Ticket Add-on", attendee.add_ons)
-					for add_on_row in add_on_doc.add_ons:
+					for add_on_row in add_ons_by_attendee.get(attendee.add_ons, []):
 						if add_on_row.add_on in free_add_on_names:
 							self.discount_amount += add_on_row.price
 
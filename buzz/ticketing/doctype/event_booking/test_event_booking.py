@@ -1,6 +1,8 @@
 # Copyright (c) 2025, BWH Studios and Contributors
 # See license.txt
 
+from unittest.mock import patch
+
 import frappe
 from frappe.tests import IntegrationTestCase
 
@@ -244,6 +246,243 @@ class IntegrationTestEventBooking(IntegrationTestCase):
 				}
 			).insert()
 
+	def test_unpaid_booking_holds_tickets_until_released(self):
+		from buzz.tasks import release_expired_ticket_holds
+
+		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		test_ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": test_event.name,
+				"title": "Limited",
+				"price": 500,
+				"is_published": True,
+				"max_tickets_available": 1,
+			}
+		).insert()
+
+		def make_booking():
+			return frappe.get_doc(
+				{
+					"doctype": "Event Booking",
+					"user": frappe.session.user,
+					"event": test_event.name,
+					"attendees": [
+						{
+							"full_name": "John Doe",
+							"ticket_type": test_ticket_type.name,
+							"email": "john@email.com",
+						}
+					],
+				}
+			).insert()
+
+		held_booking = make_booking()
+		self.assertEqual(held_booking.reservation_status, "Held")
+		self.assertEqual(
+			frappe.db.get_value("Event Ticket Type", test_ticket_type.name, "tickets_reserved"), 1
+		)
+
+		# The only ticket is held, so nobody else can book it
+		with self.assertRaises(frappe.ValidationError):
+			make_booking()
+
+		# Expire the hold and let the scheduler release it
+		frappe.db.set_value(
+			"Event Booking",
+			held_booking.name,
+			"reserved_until",
+			frappe.utils.add_to_date(frappe.utils.now_datetime(), minutes=-1),
+		)
+		release_expired_ticket_holds()
+
+		self.assertEqual(
+			frappe.db.get_value("Event Booking", held_booking.name, "reservation_status"), "Expired"
+		)
+		self.assertEqual(
+			frappe.db.get_value("Event Ticket Type", test_ticket_type.name, "tickets_reserved"), 0
+		)
+
+		# Freed ticket can now be booked, and submitting converts the hold into a sale
+		booking = make_booking()
+		booking.submit()
+
+		self.assertEqual(booking.reservation_status, "Converted")
+		ticket_type = frappe.get_doc("Event Ticket Type", test_ticket_type.name)
+		self.assertEqual(ticket_type.tickets_reserved, 0)
+		self.assertEqual(ticket_type.tickets_sold, 1)
+
+	def test_expired_hold_is_reserved_again_on_submit(self):
+		from buzz.tasks import release_expired_ticket_holds
+
+		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		test_ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": test_event.name,
+				"title": "Last Seats",
+				"price": 500,
+				"is_published": True,
+				"max_tickets_available": 1,
+			}
+		).insert()
+
+		def make_booking():
+			return frappe.get_doc(
+				{
+					"doctype": "Event Booking",
+					"user": frappe.session.user,
+					"event": test_event.name,
+					"attendees": [
+						{
+							"full_name": "John Doe",
+							"ticket_type": test_ticket_type.name,
+							"email": "john@email.com",
+						}
+					],
+				}
+			).insert()
+
+		def expire_hold(booking):
+			frappe.db.set_value(
+				"Event Booking",
+				booking.name,
+				"reserved_until",
+				frappe.utils.add_to_date(frappe.utils.now_datetime(), minutes=-1),
+			)
+			release_expired_ticket_holds()
+			booking.reload()
+
+		# A late payment for an expired hold takes the ticket again while it is still free
+		booking = make_booking()
+		expire_hold(booking)
+		booking.submit()
+		self.assertEqual(booking.reservation_status, "Converted")
+		ticket_type = frappe.get_doc("Event Ticket Type", test_ticket_type.name)
+		self.assertEqual(ticket_type.tickets_reserved, 0)
+		self.assertEqual(ticket_type.tickets_sold, 1)
+
+		# Once someone else has it, the late booking can not be submitted
+		booking.cancel()
+		late_booking = make_booking()
+		expire_hold(late_booking)
+		make_booking()
+		with self.assertRaises(frappe.ValidationError):
+			late_booking.submit()
+
+	@patch("frappe.enqueue_doc")
+	def test_large_booking_generates_tickets_in_background(self, mock_enqueue_doc):
+		frappe.db.set_single_value("Buzz Settings", "background_ticket_generation_threshold", 2)
+		self.addCleanup(
+			frappe.db.set_single_value, "Buzz Settings", "background_ticket_generation_threshold", 20
+		)
+
+		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		test_ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": test_event.name,
+				"title": "Group",
+				"price": 100,
+				"is_published": True,
+				"max_tickets_available": 10,
+			}
+		).insert()
+
+		booking = frappe.get_doc(
+			{
+				"doctype": "Event Booking",
+				"user": frappe.session.user,
+				"event": test_event.name,
+				"attendees": [
+					{
+						"full_name": f"Member {i}",
+						"ticket_type": test_ticket_type.name,
+						"email": f"m{i}@email.com",
+					}
+					for i in range(3)
+				],
+			}
+		).insert()
+		booking.submit()
+
+		mock_enqueue_doc.assert_called_once()
+		self.assertEqual(booking.ticket_generation_status, "Queued")
+		self.assertEqual(frappe.db.count("Event Ticket", {"booking": booking.name}), 0)
+		# Tickets stay held until they are generated
+		self.assertEqual(
+			frappe.db.get_value("Event Ticket Type", test_ticket_type.name, "tickets_reserved"), 3
+		)
+
+		booking = frappe.get_doc("Event Booking", booking.name)
+		booking.generate_tickets_in_background()
+		# Running the job again must not create duplicate tickets
+		frappe.get_doc("Event Booking", booking.name).generate_tickets_in_background()
+
+		booking.reload()
+		self.assertEqual(booking.ticket_generation_status, "Completed")
+		self.assertEqual(booking.tickets_generated, 3)
+		self.assertEqual(booking.reservation_status, "Converted")
+		self.assertEqual(frappe.db.count("Event Ticket", {"booking": booking.name}), 3)
+
+		ticket_type = frappe.get_doc("Event Ticket Type", test_ticket_type.name)
+		self.assertEqual(ticket_type.tickets_sold, 3)
+		self.assertEqual(ticket_type.tickets_reserved, 0)
+
+	@patch("frappe.enqueue_doc")
+	def test_cancel_while_ticket_generation_is_pending(self, mock_enqueue_doc):
+		frappe.db.set_single_value("Buzz Settings", "background_ticket_generation_threshold", 2)
+		self.addCleanup(
+			frappe.db.set_single_value, "Buzz Settings", "background_ticket_generation_threshold", 20
+		)
+
+		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		test_ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": test_event.name,
+				"title": "Cancelled Group",
+				"price": 100,
+				"is_published": True,
+				"max_tickets_available": 10,
+			}
+		).insert()
+
+		booking = frappe.get_doc(
+			{
+				"doctype": "Event Booking",
+				"user": frappe.session.user,
+				"event": test_event.name,
+				"attendees": [
+					{
+						"full_name": f"Member {i}",
+						"ticket_type": test_ticket_type.name,
+						"email": f"m{i}@email.com",
+					}
+					for i in range(3)
+				],
+			}
+		).insert()
+		booking.submit()
+		booking.cancel()
+
+		# The hold is given back right away, not left for the job
+		booking.reload()
+		self.assertEqual(booking.reservation_status, "Released")
+		self.assertEqual(
+			frappe.db.get_value("Event Ticket Type", test_ticket_type.name, "tickets_reserved"), 0
+		)
+
+		# The queued job then finds the booking cancelled and generates nothing
+		booking.generate_tickets_in_background()
+		booking.reload()
+		self.assertEqual(booking.ticket_generation_status, "Cancelled")
+		self.assertEqual(frappe.db.count("Event Ticket", {"booking": booking.name}), 0)
+
+		ticket_type = frappe.get_doc("Event Ticket Type", test_ticket_type.name)
+		self.assertEqual(ticket_type.tickets_sold, 0)
+		self.assertEqual(ticket_type.tickets_reserved, 0)
+
 	def test_utm_parameters_are_saved(self):
 		"""Test that UTM parameters are correctly saved with bookings."""
 		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
@@ -484,3 +723,171 @@ class TestProcessBookingAPI(IntegrationTestCase):
 
 		booking = frappe.get_doc("Event Booking", result["booking_name"])
 		self.assertEqual(len(booking.utm_parameters), 0)
+
+	def test_process_booking_creates_add_ons_in_bulk(self):
+		"""Test that add-ons of every attendee are created and copied onto their tickets."""
+		from buzz.api import process_booking
+
+		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		test_event.apply_tax = False
+		test_event.save()
+
+		test_ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": test_event.name,
+				"title": "API Test Ticket Add-ons",
+				"price": 0,
+				"is_published": True,
+			}
+		).insert()
+
+		t_shirt = frappe.get_doc(
+			{
+				"doctype": "Ticket Add-on",
+				"event": test_event.name,
+				"title": f"Bulk T-Shirt {frappe.generate_hash(length=6)}",
+				"price": 0,
+				"user_selects_option": 1,
+				"options": "S\nM\nL",
+			}
+		).insert()
+
+		attendees = [
+			{
+				"full_name": f"Bulk User {i}",
+				"email": f"bulk{i}@email.com",
+				"ticket_type": str(test_ticket_type.name),
+				"add_ons": [{"add_on": t_shirt.name, "value": size}] if size else [],
+			}
+			for i, size in enumerate(["S", "L", None])
+		]
+
+		result = process_booking(attendees=attendees, event=str(test_event.name))
+
+		booking = frappe.get_doc("Event Booking", result["booking_name"])
+		self.assertEqual([a.number_of_add_ons for a in booking.attendees], [1, 1, 0])
+		self.assertIsNone(booking.attendees[2].add_ons)
+
+		tickets = frappe.get_all(
+			"Event Ticket", filters={"booking": booking.name}, fields=["name", "attendee_name"]
+		)
+		ticket_sizes = {
+			ticket.attendee_name: frappe.db.get_value(
+				"Ticket Add-on Value", {"parent": ticket.name, "add_on": t_shirt.name}, "value"
+			)
+			for ticket in tickets
+		}
+		self.assertEqual(ticket_sizes, {"Bulk User 0": "S", "Bulk User 1": "L", "Bulk User 2": None})
+
+
+class TestEventBookingDataAPI(IntegrationTestCase):
+	"""Test the cached booking page payload returned by get_event_booking_data."""
+
+	def test_add_on_changes_invalidate_cached_payload(self):
+		from buzz.api import get_event_booking_data
+
+		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		data = get_event_booking_data("test-route")
+		add_on_title = f"Cache Test Hoodie {frappe.generate_hash(length=6)}"
+		self.assertNotIn(add_on_title, [a.title for a in data.available_add_ons])
+
+		add_on = frappe.get_doc(
+			{
+				"doctype": "Ticket Add-on",
+				"event": test_event.name,
+				"title": add_on_title,
+				"price": 100,
+				"user_selects_option": 1,
+				"options": "S\nM\nL",
+			}
+		).insert()
+
+		data = get_event_booking_data("test-route")
+		cached_add_on = next(a for a in data.available_add_ons if a.title == add_on_title)
+		self.assertEqual(cached_add_on.options, ["S", "M", "L"])
+
+		add_on.enabled = 0
+		add_on.save()
+
+		data = get_event_booking_data("test-route")
+		self.assertNotIn(add_on_title, [a.title for a in data.available_add_ons])
+
+	def test_availability_is_not_cached(self):
+		from buzz.api import get_event_booking_data
+
+		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		get_event_booking_data("test-route")
+
+		ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": test_event.name,
+				"title": "Cache Test Ticket",
+				"price": 100,
+				"is_published": True,
+			}
+		).insert()
+
+		data = get_event_booking_data("test-route")
+		self.assertIn(ticket_type.name, [tt.name for tt in data.available_ticket_types])
+
+
+class TestBookingDetailsAPI(IntegrationTestCase):
+	"""Test the booking page payload returned by get_booking_details."""
+
+	def test_booking_details_in_bounded_queries(self):
+		from buzz.api import get_booking_details, process_booking
+
+		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		test_event.apply_tax = False
+		test_event.save()
+
+		test_ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": test_event.name,
+				"title": "Booking Details Ticket",
+				"price": 0,
+				"is_published": True,
+			}
+		).insert()
+
+		t_shirt = frappe.get_doc(
+			{
+				"doctype": "Ticket Add-on",
+				"event": test_event.name,
+				"title": f"Details T-Shirt {frappe.generate_hash(length=6)}",
+				"price": 0,
+				"user_selects_option": 1,
+				"options": "S\nM\nL",
+			}
+		).insert()
+
+		attendees = [
+			{
+				"full_name": f"Details User {i}",
+				"email": f"details{i}@email.com",
+				"ticket_type": str(test_ticket_type.name),
+				"add_ons": [{"add_on": t_shirt.name, "value": size}] if size else [],
+			}
+			for i, size in enumerate(["S", "L", None, "M"])
+		]
+		booking_name = process_booking(attendees=attendees, event=str(test_event.name))["booking_name"]
+
+		# Warm up the cached documents (booking, event, settings)
+		get_booking_details(booking_name)
+
+		# Tickets, their add-ons and the cancellation request
+		with self.assertQueryCount(3):
+			details = get_booking_details(booking_name)
+
+		self.assertEqual(len(details.tickets), 4)
+		sizes = {
+			ticket.attendee_name: [(add_on["value"], add_on["options"]) for add_on in ticket.add_ons]
+			for ticket in details.tickets
+		}
+		self.assertEqual(sizes["Details User 1"], [("L", ["S", "M", "L"])])
+		self.assertEqual(sizes["Details User 2"], [])
+		self.assertIsNone(details.cancellation_request)
+		self.assertEqual(details.cancellation_requested_tickets, [])
@@ -1,7 +1,7 @@
 # Copyright (c) 2025, BWH Studios and contributors
 # For license information, please see license.txt
 
-import frappe
+# import frappe
 from frappe.model.document import Document
 
 
@@ -28,12 +28,4 @@ class EventBookingAttendee(Document):
 		ticket_type: DF.Link
 	# end: auto-generated types
 
-	def get_add_on_total(self):
-		if not self.add_ons:
-			return 0
-		doc = frappe.get_cached_doc("Attendee Ticket Add-on", self.add_ons)
-		add_ons = doc.add_ons
-		return sum(r.price for r in add_ons)
-
-	def get_number_of_add_ons(self):
-		return len(frappe.get_cached_doc("Attendee Ticket Add-on", self.add_ons).add_ons)
+	pass
@@ -1,11 +1,17 @@
 # Copyright (c) 2025, BWH Studios and contributors
 # For license information, please see license.txt
 
+from urllib.parse import quote
+
 import frappe
 from frappe.core.api.user_invitation import invite_by_email
 from frappe.model.document import Document
+from frappe.utils.html_utils import sanitize_html
 
-from buzz.utils import generate_ics_file, generate_qr_code_file, only_if_app_installed
+from buzz.qr import generate_qr_code_file
+from buzz.ticket_token import get_ticket_validity, make_ticket_token
+from buzz.ticketing.doctype.event_ticket_type.event_ticket_type import update_tickets_sold
+from buzz.utils import generate_ics_file, only_if_app_installed
 
 
 class EventTicket(Document):
@@ -29,6 +35,7 @@ class EventTicket(Document):
 		coupon_used: DF.Link | None
 		event: DF.Link | None
 		qr_code: DF.AttachImage | None
+		ticket_pdf: DF.Attach | None
 		ticket_type: DF.Link
 	# end: auto-generated types
 
@@ -37,10 +44,11 @@ class EventTicket(Document):
 		self.generate_qr_code()
 
 	def on_submit(self):
-		try:
-			self.send_ticket_email()
-		except Exception as e:
-			frappe.log_error("Error sending ticket email: " + str(e))
+		update_tickets_sold(self.ticket_type, 1)
+
+		# Bookings deliver all their tickets in one batch
+		if not self.flags.defer_ticket_email:
+			enqueue_ticket_delivery([self.name])
 
 		# TODO: bring back after we have templates
 		# try:
@@ -79,55 +87,83 @@ class EventTicket(Document):
 		)
 
 	def send_ticket_email(self, now: bool = False):
-		event_title, ticket_template, ticket_print_format, venue = frappe.get_cached_value(
-			"Buzz Event", self.event, ["title", "ticket_email_template", "ticket_print_format", "venue"]
+		send_ticket_emails([self], now=now)
+
+	def on_update_after_submit(self):
+		# Transfers change the attendee printed on the ticket
+		if self.has_value_changed("attendee_name") or self.has_value_changed("attendee_email"):
+			self.invalidate_pdf()
+
+	def get_pdf(self) -> bytes:
+		"""Return the stored ticket PDF, rendering it if it is not stored yet."""
+		if pdf_file := self.get_pdf_file():
+			return frappe.get_doc("File", pdf_file).get_content()
+
+		# GET requests are not committed, so store the PDF in a job instead
+		self.enqueue_pdf_render()
+		return self.make_pdf()
+
+	def get_pdf_file(self) -> str | None:
+		"""Return the name of the File holding the stored PDF, if any."""
+		if not self.ticket_pdf:
+			return None
+
+		return frappe.db.get_value(
+			"File",
+			{"file_url": self.ticket_pdf, "attached_to_doctype": self.doctype, "attached_to_name": self.name},
 		)
 
-		# Fallback to global setting if event-level not set
-		if not ticket_template:
-			ticket_template = frappe.db.get_single_value("Buzz Settings", "default_ticket_email_template")
+	def make_pdf(self) -> bytes:
+		print_format = frappe.get_cached_value("Buzz Event", self.event, "ticket_print_format")
+		return frappe.get_print(
+			self.doctype, self.name, print_format or "Standard Ticket", doc=self, as_pdf=True
+		)
 
-		subject = frappe._("Your ticket to {0} 🎟️").format(event_title)
-		event_doc = frappe.get_cached_doc("Buzz Event", self.event)
-		args = {
-			"doc": self,
-			"event_doc": event_doc,
-			"event_title": event_title,
-			"venue": venue,
-		}
-
-		if ticket_template:
-			from frappe.email.doctype.email_template.email_template import get_email_template
-
-			email_template = get_email_template(ticket_template, args)
-			subject = email_template.get("subject")
-			content = email_template.get("message")
-
-		if event_doc.attach_calendar_invite:
-			ics_content = generate_ics_file(event_doc, self.attendee_email)
-			attachments = {
-				"fname": f"{event_doc.title}.ics",
-				"fcontent": ics_content,
+	def render_pdf(self):
+		"""Render the ticket PDF and store it as a private file."""
+		self.clear_pdf()
+		pdf_file = frappe.get_doc(
+			{
+				"doctype": "File",
+				"content": self.make_pdf(),
+				"file_name": f"ticket-{self.name}.pdf",
+				"is_private": 1,
+				"attached_to_doctype": self.doctype,
+				"attached_to_name": self.name,
+				"attached_to_field": "ticket_pdf",
 			}
+		).save(ignore_permissions=True)
+		self.db_set("ticket_pdf", pdf_file.file_url, update_modified=False)
 
-		frappe.sendmail(
-			recipients=[self.attendee_email],
-			subject=subject,
-			content=content if ticket_template else None,
-			template="ticket" if not ticket_template else None,
-			args=args,
-			reference_doctype=self.doctype,
-			reference_name=self.name,
-			now=now,
-			attachments=[
-				{
-					"print_format_attachment": 1,
-					"doctype": self.doctype,
-					"name": self.name,
-					"print_format": ticket_print_format or "Standard Ticket",
-				}
-			]
-			+ ([attachments] if event_doc.attach_calendar_invite else []),
+	def clear_pdf(self):
+		for file_name in frappe.get_all(
+			"File",
+			filters={
+				"attached_to_doctype": self.doctype,
+				"attached_to_name": self.name,
+				"attached_to_field": "ticket_pdf",
+			},
+			pluck="name",
+		):
+			frappe.delete_doc("File", file_name, ignore_permissions=True)
+
+		if self.ticket_pdf:
+			self.db_set("ticket_pdf", None, update_modified=False)
+
+	def invalidate_pdf(self):
+		"""Drop the stored PDF and render it again with the ticket's current details."""
+		self.clear_pdf()
+		self.enqueue_pdf_render(enqueue_after_commit=True)
+
+	def enqueue_pdf_render(self, enqueue_after_commit: bool = False):
+		frappe.enqueue_doc(
+			self.doctype,
+			self.name,
+			"render_pdf",
+			queue="short",
+			enqueue_after_commit=enqueue_after_commit,
+			job_id=f"render_ticket_pdf::{self.name}",
+			deduplicate=True,
 		)
 
 	def validate_coupon_usage(self):
@@ -139,14 +175,27 @@ class EventTicket(Document):
 			frappe.throw(frappe._("Coupon has been already used up maximum number of times!"))
 
 	def generate_qr_code(self):
+		if generate_qr_codes_on_demand():
+			# Only the payload is stored, the image is rendered when first viewed
+			self.qr_code = get_qr_code_url(self.name)
+			return
+
 		self.qr_code = generate_qr_code_file(
 			doc=self,
-			data=self.name,
+			data=self.get_qr_payload(),
 			file_prefix="ticket-qr-code",
 		)
 
+	def get_qr_payload(self) -> str:
+		"""Signed token of the ticket, so a scan can be checked before looking the ticket up."""
+		start_date, end_date = frappe.get_cached_value("Buzz Event", self.event, ["start_date", "end_date"])
+		return make_ticket_token(
+			self.name, self.event, self.ticket_type, *get_ticket_validity(start_date, end_date)
+		)
+
 	def on_cancel(self):
 		self.ignore_linked_doctypes = ["Event Booking", "Ticket Cancellation Request"]
+		update_tickets_sold(self.ticket_type, -1)
 		self.send_cancellation_email()
 
 	def send_cancellation_email(self):
@@ -159,3 +208,158 @@ class EventTicket(Document):
 			delayed=False,
 			retry=2,
 		)
+
+
+def refresh_ticket_qr_codes(event: str):
+	"""Reissue the QR codes of an event's tickets, e.g. after its dates (and so their validity) moved."""
+	tickets = frappe.get_all("Event Ticket", filters={"event": event, "docstatus": 1}, pluck="name")
+	for ticket in tickets:
+		ticket = frappe.get_doc("Event Ticket", ticket)
+		ticket.generate_qr_code()
+		ticket.db_set("qr_code", ticket.qr_code, update_modified=False)
+		ticket.invalidate_pdf()
+
+
+def generate_qr_codes_on_demand() -> bool:
+	return bool(frappe.db.get_single_value("Buzz Settings", "generate_ticket_qr_on_demand"))
+
+
+def get_qr_code_url(ticket: str) -> str:
+	return f"/api/method/buzz.api.get_ticket_qr_code?ticket={quote(ticket)}"
+
+
+ICS_ATTENDEE_PLACEHOLDER = "__attendee_email__"
+
+
+def enqueue_ticket_delivery(tickets: list[str]):
+	frappe.enqueue(
+		"buzz.ticketing.doctype.event_ticket.event_ticket.deliver_tickets",
+		queue="long",
+		timeout=3600,
+		enqueue_after_commit=True,
+		tickets=tickets,
+	)
+
+
+def deliver_tickets(tickets: list[str]):
+	"""Render and store the PDFs of tickets, then email them with the stored PDF attached."""
+	ticket_docs = []
+	for ticket in tickets:
+		ticket_doc = frappe.get_doc("Event Ticket", ticket)
+		if not ticket_doc.ticket_pdf:
+			try:
+				ticket_doc.render_pdf()
+			except Exception:
+				# The email falls back to rendering the print format when it is sent
+				frappe.log_error(title=f"Failed to render PDF for ticket {ticket}")
+		ticket_docs.append(ticket_doc)
+
+	send_ticket_emails(ticket_docs)
+
+
+def send_ticket_emails(tickets: list, now: bool = False):
+	"""Send ticket emails for many tickets at once.
+
+	Everything that only depends on the event (template, venue, titles, calendar invite)
+	is prepared once per event; only the attendee specific parts are rendered per ticket.
+	With `now`, errors are raised to the caller; queued emails log them and move on.
+	"""
+	contexts = {}
+	for ticket in tickets:
+		if ticket.event not in contexts:
+			contexts[ticket.event] = get_ticket_email_context(ticket.event)
+
+		if now:
+			frappe.sendmail(**get_ticket_email_args(ticket, contexts[ticket.event]), now=True)
+			continue
+
+		try:
+			frappe.sendmail(**get_ticket_email_args(ticket, contexts[ticket.event]))
+		except Exception as e:
+			frappe.log_error("Error sending ticket email: " + str(e))
+
+
+def get_ticket_email_context(event: str) -> frappe._dict:
+	event_doc = frappe.get_cached_doc("Buzz Event", event)
+	context = frappe._dict(
+		event_doc=event_doc,
+		print_format=event_doc.ticket_print_format or "Standard Ticket",
+		venue_address=frappe.db.get_value("Event Venue", event_doc.venue, "address")
+		if event_doc.venue
+		else "",
+		ticket_type_titles={
+			str(name): title
+			for name, title in frappe.get_all(
+				"Event Ticket Type", filters={"event": event}, fields=["name", "title"], as_list=True
+			)
+		},
+		add_on_titles=dict(
+			frappe.get_all("Ticket Add-on", filters={"event": event}, fields=["name", "title"], as_list=True)
+		),
+	)
+
+	# Fallback to global setting if event-level not set
+	ticket_template = event_doc.ticket_email_template or frappe.db.get_single_value(
+		"Buzz Settings", "default_ticket_email_template"
+	)
+	if ticket_template:
+		email_template = frappe.get_doc("Email Template", ticket_template)
+		context.subject_template = email_template.subject
+		context.message_template = email_template.response_
+
+	if event_doc.attach_calendar_invite:
+		context.ics_content = generate_ics_file(event_doc, ICS_ATTENDEE_PLACEHOLDER)
+
+	return context
+
+
+def get_ticket_email_args(ticket: "EventTicket", context: frappe._dict) -> dict:
+	event_doc = context.event_doc
+	args = {
+		"doc": ticket,
+		"event_doc": event_doc,
+		"event_title": event_doc.title,
+		"venue": event_doc.venue,
+		"venue_address": context.venue_address,
+		"ticket_type_title": context.ticket_type_titles.get(str(ticket.ticket_type)),
+		"add_on_titles": context.add_on_titles,
+	}
+
+	email = {
+		"recipients": [ticket.attendee_email],
+		"subject": frappe._("Your ticket to {0} 🎟️").format(event_doc.title),
+		"template": "ticket",
+		"args": args,
+		"reference_doctype": ticket.doctype,
+		"reference_name": ticket.name,
+		"attachments": [],
+	}
+
+	if pdf_file := ticket.get_pdf_file():
+		email["attachments"].append({"fid": pdf_file})
+	else:
+		email["attachments"].append(
+			{
+				"print_format_attachment": 1,
+				"doctype": ticket.doctype,
+				"name": ticket.name,
+				"print_format": context.print_format,
+			}
+		)
+
+	if context.message_template:
+		email.update(
+			subject=sanitize_html(frappe.render_template(context.subject_template, args)),
+			content=frappe.render_template(context.message_template, args),
+			template=None,
+		)
+
+	if context.ics_content:
+		email["attachments"].append(
+			{
+				"fname": f"{event_doc.title}.ics",
+				"fcontent": context.ics_content.replace(ICS_ATTENDEE_PLACEHOLDER, ticket.attendee_email),
+			}
+		)
+
+	return email
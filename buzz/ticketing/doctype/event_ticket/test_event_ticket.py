@@ -6,7 +6,13 @@ from unittest.mock import patch
 import frappe
 from frappe.tests import IntegrationTestCase
 
-from buzz.utils import generate_qr_code_file, make_qr_image
+from buzz.qr import generate_qr_code_file, make_qr_image, prerender_qr_images, render_qr_images
+from buzz.ticket_token import encode, make_ticket_token, verify_ticket_token
+from buzz.ticketing.doctype.event_ticket.event_ticket import (
+	get_ticket_email_args,
+	get_ticket_email_context,
+	send_ticket_emails,
+)
 
 EXTRA_TEST_RECORD_DEPENDENCIES = []
 IGNORE_TEST_RECORD_DEPENDENCIES = ["Bulk Ticket Coupon"]
@@ -138,6 +144,53 @@ class TestEventTicketEmail(IntegrationTestCase):
 		mock_sendmail.assert_called_once()
 		self.assertEqual(mock_sendmail.call_args[1]["template"], "ticket")
 
+	@patch("frappe.sendmail", side_effect=frappe.OutgoingEmailError)
+	def test_send_now_raises_errors(self, mock_sendmail):
+		with self.assertRaises(frappe.OutgoingEmailError):
+			self.test_ticket.send_ticket_email(now=True)
+
+	@patch("frappe.sendmail")
+	def test_batch_prepares_event_context_once(self, mock_sendmail):
+		tickets = [self.test_ticket] + [
+			frappe.get_doc(
+				{
+					"doctype": "Event Ticket",
+					"event": self.test_event.name,
+					"ticket_type": self.test_ticket_type.name,
+					"attendee_name": f"Batch Attendee {i}",
+					"attendee_email": f"batch{i}@example.com",
+				}
+			).insert()
+			for i in range(2)
+		]
+		self.test_event.attach_calendar_invite = 1
+		self.test_event.save()
+		self.addCleanup(self.test_event.db_set, "attach_calendar_invite", 0)
+
+		with patch(
+			"buzz.ticketing.doctype.event_ticket.event_ticket.get_ticket_email_context",
+			wraps=get_ticket_email_context,
+		) as get_context:
+			send_ticket_emails(tickets)
+
+		get_context.assert_called_once_with(self.test_event.name)
+		self.assertEqual(mock_sendmail.call_count, len(tickets))
+		self.assertEqual(
+			sorted(call.kwargs["reference_name"] for call in mock_sendmail.call_args_list),
+			sorted(ticket.name for ticket in tickets),
+		)
+		for call in mock_sendmail.call_args_list:
+			self.assertNotIn("now", call.kwargs)
+
+		# The calendar invite is rendered once and addressed to each attendee
+		context = get_ticket_email_context(self.test_event.name)
+		for ticket in tickets:
+			ics_content = get_ticket_email_args(ticket, context)["attachments"][-1]["fcontent"]
+			self.assertIn(f"mailto:{ticket.attendee_email}", ics_content)
+
+		for ticket in tickets[1:]:
+			frappe.delete_doc("Event Ticket", ticket.name, force=True)
+
 
 class TestQRCodeGeneration(IntegrationTestCase):
 	"""Tests for QR code generation utility."""
@@ -174,3 +227,231 @@ class TestQRCodeGeneration(IntegrationTestCase):
 
 		# Cleanup
 		file_doc.delete()
+
+	def test_render_qr_images_in_process_pool(self):
+		"""Pooled batch rendering should produce the same images as rendering one by one."""
+		payloads = [f"pool-payload-{i}" for i in range(4)]
+
+		with patch("buzz.qr.QR_PROCESS_POOL_THRESHOLD", 2), patch("buzz.qr.os.cpu_count", return_value=2):
+			images = render_qr_images(payloads)
+
+		self.assertEqual(list(images), payloads)
+		for data in payloads:
+			self.assertEqual(images[data], make_qr_image(data))
+
+	def test_render_qr_images_inline_in_request(self):
+		"""Web requests should never start a process pool, whatever the batch size."""
+		payloads = [f"request-payload-{i}" for i in range(4)]
+
+		with (
+			patch("buzz.qr.QR_PROCESS_POOL_THRESHOLD", 2),
+			patch("buzz.qr.os.cpu_count", return_value=2),
+			patch("buzz.qr.ProcessPoolExecutor") as mock_pool,
+			patch.object(frappe.local, "request", object(), create=True),
+		):
+			images = render_qr_images(payloads)
+
+		mock_pool.assert_not_called()
+		self.assertEqual(list(images), payloads)
+
+	def test_generate_qr_code_file_reuses_stored_image(self):
+		"""Rendering the same payload again should reuse the stored PNG."""
+		first_url = generate_qr_code_file(doc=self.test_event, data="reused-qr-data", file_prefix="test-qr")
+
+		with patch("buzz.qr.make_qr_image") as make_image:
+			# Same document: the existing attachment is returned as is
+			self.assertEqual(generate_qr_code_file(doc=self.test_event, data="reused-qr-data"), first_url)
+
+			# Another document: a new File points at the same image on disk
+			ticket_type = frappe.get_doc(
+				{"doctype": "Event Ticket Type", "event": self.test_event.name, "title": "QR Test Ticket"}
+			).insert()
+			self.assertEqual(generate_qr_code_file(doc=ticket_type, data="reused-qr-data"), first_url)
+
+		make_image.assert_not_called()
+		self.assertEqual(frappe.db.count("File", {"file_url": first_url}), 2)
+
+	def test_prerendered_images_are_used(self):
+		"""Images rendered in a batch should be consumed by generate_qr_code_file."""
+		prerender_qr_images(["prerendered-qr-data"])
+
+		with patch("buzz.qr.make_qr_image") as make_image:
+			file_url = generate_qr_code_file(doc=self.test_event, data="prerendered-qr-data")
+
+		make_image.assert_not_called()
+		self.assertTrue(file_url.endswith(".png"))
+
+
+class TestOnDemandQRCode(IntegrationTestCase):
+	"""Tests for tickets that render their QR code on demand."""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+
+	def setUp(self):
+		frappe.db.set_single_value("Buzz Settings", "generate_ticket_qr_on_demand", 1)
+		self.test_ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": self.test_event.name,
+				"title": "On Demand QR Ticket",
+			}
+		).insert()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	@patch("frappe.sendmail")
+	def test_ticket_stores_only_payload_url(self, mock_sendmail):
+		ticket = frappe.get_doc(
+			{
+				"doctype": "Event Ticket",
+				"event": self.test_event.name,
+				"ticket_type": self.test_ticket_type.name,
+				"attendee_name": "Lazy QR",
+				"attendee_email": "lazy-qr@example.com",
+			}
+		).insert()
+
+		with patch("buzz.ticketing.doctype.event_ticket.event_ticket.generate_qr_code_file") as generate_file:
+			ticket.submit()
+
+		generate_file.assert_not_called()
+		self.assertEqual(ticket.qr_code, f"/api/method/buzz.api.get_ticket_qr_code?ticket={ticket.name}")
+		self.assertFalse(frappe.db.exists("File", {"attached_to_name": ticket.name}))
+
+	@patch("frappe.sendmail")
+	def test_endpoint_serves_cacheable_png(self, mock_sendmail):
+		from frappe.utils import set_request
+
+		from buzz.api import get_ticket_qr_code
+		from buzz.qr import get_qr_cache_key
+
+		ticket = frappe.get_doc(
+			{
+				"doctype": "Event Ticket",
+				"event": self.test_event.name,
+				"ticket_type": self.test_ticket_type.name,
+				"attendee_name": "Lazy QR",
+				"attendee_email": "lazy-qr@example.com",
+			}
+		).insert()
+		ticket.submit()
+
+		set_request(method="GET", path="/api/method/buzz.api.get_ticket_qr_code")
+		response = get_ticket_qr_code(ticket.name)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.mimetype, "image/png")
+		self.assertEqual(response.get_data(), make_qr_image(ticket.get_qr_payload()))
+		self.assertIn("max-age", response.headers["Cache-Control"])
+
+		# A client that already has the image gets a 304
+		etag = get_qr_cache_key(ticket.get_qr_payload())
+		set_request(method="GET", headers={"If-None-Match": f'"{etag}"'})
+		self.assertEqual(get_ticket_qr_code(ticket.name).status_code, 304)
+
+
+class TestTicketToken(IntegrationTestCase):
+	"""Tests for signed ticket QR payloads."""
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def make_token(self, event="EV-1", valid_from="2025-01-01", valid_till="2025-01-03"):
+		return make_ticket_token("TKT-1", event, "TT-1", valid_from, valid_till)
+
+	def test_token_round_trip(self):
+		claims, error = verify_ticket_token(self.make_token(), event="EV-1", on_date="2025-01-02")
+		self.assertFalse(error)
+		self.assertEqual((claims.ticket, claims.event, claims.ticket_type), ("TKT-1", "EV-1", "TT-1"))
+
+	def test_tampered_token_is_rejected(self):
+		prefix, _claims, signature = self.make_token().split(".")
+		forged = f"{prefix}.{encode(b'TKT-2|EV-1|TT-1|20250101|20250103')}.{signature}"
+		claims, _error = verify_ticket_token(forged, on_date="2025-01-02")
+		self.assertIsNone(claims)
+		self.assertIsNone(verify_ticket_token("BZ1.garbage", on_date="2025-01-02")[0])
+
+	def test_token_is_checked_against_event_and_date(self):
+		token = self.make_token()
+		self.assertIsNone(verify_ticket_token(token, event="EV-2", on_date="2025-01-02")[0])
+		self.assertIsNone(verify_ticket_token(token, on_date="2024-12-31")[0])
+		self.assertIsNone(verify_ticket_token(token, on_date="2025-01-04")[0])
+
+	@patch("frappe.sendmail")
+	def test_ticket_qr_payload_is_a_valid_token(self, mock_sendmail):
+		test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		ticket_type = frappe.get_doc(
+			{"doctype": "Event Ticket Type", "event": test_event.name, "title": "Token Test Ticket"}
+		).insert()
+		ticket = frappe.get_doc(
+			{
+				"doctype": "Event Ticket",
+				"event": test_event.name,
+				"ticket_type": ticket_type.name,
+				"attendee_name": "Token Attendee",
+				"attendee_email": "token@example.com",
+			}
+		).insert()
+
+		claims, _error = verify_ticket_token(
+			ticket.get_qr_payload(), event=test_event.name, on_date=test_event.start_date
+		)
+		self.assertEqual(claims.ticket, ticket.name)
+
+
+@patch(
+	"buzz.ticketing.doctype.event_ticket.event_ticket.EventTicket.make_pdf", return_value=b"%PDF-1.4 ticket"
+)
+class TestTicketPDF(IntegrationTestCase):
+	"""Tests for stored ticket PDFs."""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+
+	def setUp(self):
+		ticket_type = frappe.get_doc(
+			{"doctype": "Event Ticket Type", "event": self.test_event.name, "title": "PDF Test Ticket"}
+		).insert()
+		self.ticket = frappe.get_doc(
+			{
+				"doctype": "Event Ticket",
+				"event": self.test_event.name,
+				"ticket_type": ticket_type.name,
+				"attendee_name": "PDF Attendee",
+				"attendee_email": "pdf@example.com",
+			}
+		).insert()
+		with patch("frappe.enqueue"):
+			self.ticket.submit()
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_stored_pdf_is_attached_to_email(self, make_pdf):
+		self.ticket.render_pdf()
+		self.assertTrue(self.ticket.ticket_pdf)
+
+		email = get_ticket_email_args(self.ticket, get_ticket_email_context(self.test_event.name))
+		self.assertIn({"fid": self.ticket.get_pdf_file()}, email["attachments"])
+		self.assertEqual(self.ticket.get_pdf(), b"%PDF-1.4 ticket")
+		make_pdf.assert_called_once()
+
+	def test_transfer_invalidates_stored_pdf(self, make_pdf):
+		self.ticket.render_pdf()
+
+		self.ticket.attendee_name = "New Attendee"
+		with patch("frappe.enqueue_doc") as enqueue_doc:
+			self.ticket.save()
+
+		self.assertFalse(self.ticket.ticket_pdf)
+		self.assertFalse(
+			frappe.db.exists(
+				"File", {"attached_to_name": self.ticket.name, "attached_to_field": "ticket_pdf"}
+			)
+		)
+		enqueue_doc.assert_called_once()
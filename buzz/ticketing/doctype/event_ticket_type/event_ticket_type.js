@@ -1,8 +1,14 @@
 // Copyright (c) 2025, BWH Studios and contributors
 // For license information, please see license.txt
 
-// frappe.ui.form.on("Event Ticket Type", {
-// 	refresh(frm) {
+frappe.ui.form.on("Event Ticket Type", {
+	refresh(frm) {
+		if (frm.is_new()) return;
 
-// 	},
-// });
+		frm.add_custom_button(__("Reconcile Ticket Counters"), () => {
+			frm.call({ doc: frm.doc, method: "reconcile_ticket_counters", freeze: true }).then(() =>
+				frm.reload_doc()
+			);
+		});
+	},
+});
@@ -3,6 +3,9 @@
 
 import frappe
 from frappe.model.document import Document
+from frappe.query_builder.functions import Count
+
+from buzz.utils import get_affected_rows
 
 
 class EventTicketType(Document):
@@ -21,6 +24,8 @@ class EventTicketType(Document):
 		max_tickets_available: DF.Int
 		name: DF.Int | None
 		price: DF.Currency
+		tickets_reserved: DF.Int
+		tickets_sold: DF.Int
 		title: DF.Data
 	# end: auto-generated types
 
@@ -29,14 +34,139 @@ class EventTicketType(Document):
 			return False
 		return True
 
-	@property
-	def tickets_sold(self) -> int:
-		"""Returns the number of tickets sold for this ticket type."""
-		return frappe.db.count("Event Ticket", {"ticket_type": self.name, "docstatus": 1})
-
 	@property
 	def remaining_tickets(self) -> int:
 		"""Returns -1 if no limit, otherwise the number of remaining tickets."""
 		if not self.max_tickets_available:
 			return -1
-		return self.max_tickets_available - self.tickets_sold
+		return self.max_tickets_available - (self.tickets_sold or 0) - (self.tickets_reserved or 0)
+
+	@frappe.whitelist()
+	def reconcile_ticket_counters(self):
+		"""Recount submitted tickets and held bookings and repair the stored counters."""
+		frappe.only_for(["Event Manager", "System Manager"])
+		reconcile_ticket_counters(ticket_type=self.name)
+		self.reload()
+
+
+def update_tickets_sold(ticket_type: str | int, delta: int):
+	"""Atomically move the sold counter of a ticket type by `delta`.
+
+	Runs as a single UPDATE inside the caller's transaction, so the counter is
+	committed (or rolled back) together with the ticket that changed it.
+	"""
+	EventTicketType = frappe.qb.DocType("Event Ticket Type")
+	(
+		frappe.qb.update(EventTicketType)
+		.set(EventTicketType.tickets_sold, EventTicketType.tickets_sold + delta)
+		.where(EventTicketType.name == ticket_type)
+	).run()
+	frappe.clear_document_cache("Event Ticket Type", ticket_type)
+
+
+def reserve_tickets(ticket_type: str | int, num_tickets: int) -> bool:
+	"""Hold `num_tickets` of a ticket type if that many are still available.
+
+	The availability check and the increment happen in one conditional UPDATE,
+	so concurrent bookings cannot both take the last tickets.
+	"""
+	EventTicketType = frappe.qb.DocType("Event Ticket Type")
+	remaining = (
+		EventTicketType.max_tickets_available
+		- EventTicketType.tickets_sold
+		- EventTicketType.tickets_reserved
+	)
+	(
+		frappe.qb.update(EventTicketType)
+		.set(EventTicketType.tickets_reserved, EventTicketType.tickets_reserved + num_tickets)
+		.where(EventTicketType.name == ticket_type)
+		.where((EventTicketType.max_tickets_available == 0) | (remaining >= num_tickets))
+	).run()
+
+	if not get_affected_rows():
+		return False
+
+	frappe.clear_document_cache("Event Ticket Type", ticket_type)
+	return True
+
+
+def release_reserved_tickets(ticket_type: str | int, num_tickets: int):
+	"""Give `num_tickets` held tickets of a ticket type back to the pool."""
+	EventTicketType = frappe.qb.DocType("Event Ticket Type")
+	(
+		frappe.qb.update(EventTicketType)
+		.set(EventTicketType.tickets_reserved, EventTicketType.tickets_reserved - num_tickets)
+		.where(EventTicketType.name == ticket_type)
+		.where(EventTicketType.tickets_reserved >= num_tickets)
+	).run()
+	frappe.clear_document_cache("Event Ticket Type", ticket_type)
+
+
+def reconcile_ticket_counters(event: str | None = None, ticket_type: str | int | None = None):
+	"""Rebuild `tickets_sold` and `tickets_reserved` from tickets and held bookings.
+
+	Can be run from the console to repair drift:
+	    bench --site <site> execute buzz.ticketing.doctype.event_ticket_type.event_ticket_type.reconcile_ticket_counters
+	"""
+	filters = {}
+	if event:
+		filters["event"] = event
+	if ticket_type:
+		filters["name"] = ticket_type
+
+	ticket_types = frappe.get_all(
+		"Event Ticket Type", filters=filters, fields=["name", "tickets_sold", "tickets_reserved"]
+	)
+	if not ticket_types:
+		return
+
+	ticket_type_names = [tt.name for tt in ticket_types]
+
+	EventTicket = frappe.qb.DocType("Event Ticket")
+	sold_counts = (
+		frappe.qb.from_(EventTicket)
+		.select(EventTicket.ticket_type, Count(EventTicket.name))
+		.where(EventTicket.docstatus == 1)
+		.where(EventTicket.ticket_type.isin(ticket_type_names))
+		.groupby(EventTicket.ticket_type)
+	).run()
+
+	# Held bookings reserve one ticket per attendee until that attendee's ticket is
+	# generated (submitted bookings stay held while tickets are generated in the background)
+	EventBooking = frappe.qb.DocType("Event Booking")
+	EventBookingAttendee = frappe.qb.DocType("Event Booking Attendee")
+	held_counts = (
+		frappe.qb.from_(EventBookingAttendee)
+		.join(EventBooking)
+		.on(EventBooking.name == EventBookingAttendee.parent)
+		.select(EventBookingAttendee.ticket_type, Count(EventBookingAttendee.name))
+		.where(EventBooking.docstatus < 2)
+		.where(EventBooking.reservation_status == "Held")
+		.where(EventBookingAttendee.ticket_type.isin(ticket_type_names))
+		.groupby(EventBookingAttendee.ticket_type)
+	).run()
+	generated_counts = (
+		frappe.qb.from_(EventTicket)
+		.join(EventBooking)
+		.on(EventBooking.name == EventTicket.booking)
+		.select(EventTicket.ticket_type, Count(EventTicket.name))
+		.where(EventTicket.docstatus == 1)
+		.where(EventBooking.reservation_status == "Held")
+		.where(EventTicket.ticket_type.isin(ticket_type_names))
+		.groupby(EventTicket.ticket_type)
+	).run()
+
+	# Use string keys to handle type mismatches (autoincrement IDs can be int or str)
+	sold_map = {str(name): count for name, count in sold_counts}
+	reserved_map = {str(name): count for name, count in held_counts}
+	for name, count in generated_counts:
+		reserved_map[str(name)] = reserved_map.get(str(name), 0) - count
+
+	for tt in ticket_types:
+		actual = {
+			"tickets_sold": sold_map.get(str(tt.name), 0),
+			"tickets_reserved": reserved_map.get(str(tt.name), 0),
+		}
+		if tt.tickets_sold != actual["tickets_sold"] or tt.tickets_reserved != actual["tickets_reserved"]:
+			frappe.db.set_value("Event Ticket Type", tt.name, actual, update_modified=False)
+			frappe.clear_document_cache("Event Ticket Type", tt.name)
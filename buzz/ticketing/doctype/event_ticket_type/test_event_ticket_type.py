@@ -1,9 +1,11 @@
 # Copyright (c) 2025, BWH Studios and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests import IntegrationTestCase
 
+from buzz.ticketing.doctype.event_ticket_type.event_ticket_type import reconcile_ticket_counters
+
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
 # Use these module variables to add/remove to/from that list
@@ -17,4 +19,49 @@ class IntegrationTestEventTicketType(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def setUp(self):
+		self.test_event = frappe.get_doc("Buzz Event", {"route": "test-route"})
+		self.ticket_type = frappe.get_doc(
+			{
+				"doctype": "Event Ticket Type",
+				"event": self.test_event.name,
+				"title": "Counter Test",
+				"price": 100,
+				"max_tickets_available": 3,
+			}
+		).insert()
+
+	def _make_ticket(self):
+		return (
+			frappe.get_doc(
+				{
+					"doctype": "Event Ticket",
+					"ticket_type": self.ticket_type.name,
+					"attendee_name": "John Doe",
+					"attendee_email": "john@email.com",
+				}
+			)
+			.insert()
+			.submit()
+		)
+
+	def test_counter_tracks_submit_and_cancel(self):
+		ticket = self._make_ticket()
+		self._make_ticket()
+
+		ticket_type = frappe.get_cached_doc("Event Ticket Type", self.ticket_type.name)
+		self.assertEqual(ticket_type.tickets_sold, 2)
+		self.assertEqual(ticket_type.remaining_tickets, 1)
+
+		ticket.cancel()
+		ticket_type = frappe.get_cached_doc("Event Ticket Type", self.ticket_type.name)
+		self.assertEqual(ticket_type.tickets_sold, 1)
+		self.assertTrue(ticket_type.are_tickets_available(2))
+
+	def test_reconcile_repairs_drift(self):
+		self._make_ticket()
+		frappe.db.set_value("Event Ticket Type", self.ticket_type.name, "tickets_sold", 42)
+
+		reconcile_ticket_counters(event=self.test_event.name)
+
+		self.assertEqual(frappe.db.get_value("Event Ticket Type", self.ticket_type.name, "tickets_sold"), 1)
@@ -10,5 +10,77 @@ frappe.query_reports["Detailed Event Registrations"] = {
 			options: "Buzz Event",
 			reqd: 1,
 		},
+		{
+			fieldname: "ticket_type",
+			label: __("Ticket Type"),
+			fieldtype: "Link",
+			options: "Event Ticket Type",
+			get_query: () => ({ filters: { event: frappe.query_report.get_filter_value("event") } }),
+		},
+		{
+			fieldname: "add_on",
+			label: __("Add-on"),
+			fieldtype: "Link",
+			options: "Ticket Add-on",
+			get_query: () => ({ filters: { event: frappe.query_report.get_filter_value("event") } }),
+		},
+		{
+			fieldname: "add_on_value",
+			label: __("Add-on Value"),
+			fieldtype: "Data",
+			depends_on: "add_on",
+		},
+		{
+			fieldname: "custom_field",
+			label: __("Custom Field"),
+			fieldtype: "Data",
+			description: __("Fieldname of the custom field"),
+		},
+		{
+			fieldname: "custom_field_value",
+			label: __("Custom Field Value"),
+			fieldtype: "Data",
+			depends_on: "custom_field",
+		},
+		{
+			fieldname: "utm_name",
+			label: __("UTM Parameter"),
+			fieldtype: "Data",
+		},
+		{
+			fieldname: "utm_value",
+			label: __("UTM Value"),
+			fieldtype: "Data",
+			depends_on: "utm_name",
+		},
 	],
+
+	onload(report) {
+		const export_registrations = (file_format) => {
+			const event = report.get_filter_value("event");
+			if (!event) {
+				frappe.msgprint(__("Select an event to export"));
+				return;
+			}
+
+			frappe.call({
+				method: "buzz.ticketing.report.detailed_event_registrations.detailed_event_registrations.export_registrations",
+				args: { event, file_format, filters: report.get_filter_values() },
+				callback: () => {
+					frappe.show_alert({
+						message: __("Export started, the file will download when it is ready"),
+						indicator: "blue",
+					});
+				},
+			});
+		};
+
+		report.page.add_inner_button(__("CSV"), () => export_registrations("CSV"), __("Full Export"));
+		report.page.add_inner_button(__("Excel"), () => export_registrations("Excel"), __("Full Export"));
+
+		frappe.realtime.off("buzz_registrations_export");
+		frappe.realtime.on("buzz_registrations_export", (data) => {
+			window.open(data.file_url);
+		});
+	},
 };
@@ -1,8 +1,32 @@
 # Copyright (c) 2025, BWH Studios and contributors
 # For license information, please see license.txt
 
+import csv
+import hashlib
+
 import frappe
 from frappe import _
+from frappe.query_builder import Order
+from frappe.query_builder.functions import Count
+from frappe.utils import cint
+
+from buzz.buzz.doctype.buzz_custom_field.buzz_custom_field import get_custom_field_definitions
+
+# Tickets fetched per page when the report is streamed for an export
+EXPORT_PAGE_SIZE = 1000
+
+DEFAULT_PAGE_LENGTH = 50
+MAX_PAGE_LENGTH = 500
+
+# Fixed columns rows can be sorted by, mapped to their Event Ticket field (None for joined ones)
+SORT_FIELDS = {
+	"ticket_id": "name",
+	"attendee_name": "attendee_name",
+	"attendee_email": "attendee_email",
+	"booking_id": "booking",
+	"ticket_type": None,
+	"booking_user": None,
+}
 
 
 def execute(filters=None):
@@ -12,13 +36,14 @@ def execute(filters=None):
 	if not filters.get("event"):
 		return [], []
 
-	columns = get_columns(filters)
-	data = get_data(filters, columns)
+	config = get_row_config(filters.get("event"))
+	columns = get_columns(filters, config)
+	data = get_data(filters, columns, config)
 	return columns, data
 
 
-def get_columns(filters):
-	event = filters.get("event")
+def get_columns(filters, config=None):
+	config = config or get_row_config(filters.get("event"))
 
 	# Fixed columns
 	columns = [
@@ -64,8 +89,7 @@ def get_columns(filters):
 	]
 
 	# Dynamic custom field columns
-	custom_fields = get_custom_fields_for_event(event)
-	for cf in custom_fields:
+	for cf in config.custom_fields:
 		columns.append(
 			{
 				"fieldname": f"cf_{cf.fieldname}",
@@ -76,8 +100,7 @@ def get_columns(filters):
 		)
 
 	# Dynamic add-on columns
-	add_ons = get_add_ons_for_event(event)
-	for addon in add_ons:
+	for addon in config.add_ons:
 		columns.append(
 			{
 				"fieldname": f"addon_{addon.name}",
@@ -88,8 +111,7 @@ def get_columns(filters):
 		)
 
 	# Dynamic UTM parameter columns
-	utm_params = get_utm_params_for_event(event)
-	for utm in utm_params:
+	for utm in config.utm_params:
 		columns.append(
 			{
 				"fieldname": f"utm_{utm}",
@@ -102,36 +124,174 @@ def get_columns(filters):
 	return columns
 
 
-def get_data(filters, columns):
+def get_data(filters, columns, config=None):
 	event = filters.get("event")
 
-	# Get all submitted tickets for the event
-	tickets = frappe.get_all(
-		"Event Ticket",
-		filters={"event": event, "docstatus": 1},
-		fields=["name", "attendee_name", "attendee_email", "booking", "ticket_type"],
-	)
+	# Get all submitted tickets for the event, with the row filters applied in SQL
+	tickets = get_tickets(event, filters=filters)
 
 	if not tickets:
 		return []
 
-	# Get ticket type titles
-	ticket_type_map = get_ticket_type_map(event)
+	return build_rows(tickets, config or get_row_config(event))
+
+
+@frappe.whitelist()
+def get_registrations(
+	event,
+	filters=None,
+	sort_by="ticket_id",
+	sort_order="asc",
+	start=0,
+	page_length=DEFAULT_PAGE_LENGTH,
+	cursor=None,
+):
+	"""Return one page of report rows, filtered and sorted in the database.
+
+	Pages are addressed by `start`, or by `cursor` (the last ticket of the previous page)
+	when sorting by ticket id, which stays fast however deep the page is.
+	"""
+	frappe.only_for(["Event Manager", "System Manager"])
+
+	filters = frappe.parse_json(filters) or {}
+	page_length = min(cint(page_length) or DEFAULT_PAGE_LENGTH, MAX_PAGE_LENGTH)
+	tickets = get_tickets(
+		event,
+		filters=filters,
+		after=cursor,
+		limit=page_length,
+		start=cint(start),
+		sort_by=sort_by,
+		sort_order=sort_order,
+	)
 
-	# Get booking details
-	booking_ids = list(set([t.booking for t in tickets if t.booking]))
-	booking_map = get_booking_map(booking_ids)
+	# The event level lookups are shared by the columns and the rows
+	config = get_row_config(event)
+	return {
+		"columns": get_columns({"event": event}, config),
+		"data": build_rows(tickets, config) if tickets else [],
+		"total_count": get_ticket_query(event, filters).select(Count("*")).run()[0][0],
+		"next_cursor": tickets[-1].name if sort_by == "ticket_id" and len(tickets) == page_length else None,
+	}
+
+
+def get_tickets(event, filters=None, after=None, limit=None, start=0, sort_by="ticket_id", sort_order="asc"):
+	"""Submitted tickets of the event matching the row filters.
+
+	`after` continues from a ticket (keyset) and only applies to the default ticket id order.
+	"""
+	if sort_by not in SORT_FIELDS:
+		frappe.throw(_("Cannot sort by {0}").format(sort_by))
+
+	EventTicket = frappe.qb.DocType("Event Ticket")
+	EventBooking = frappe.qb.DocType("Event Booking")
+	EventTicketType = frappe.qb.DocType("Event Ticket Type")
+	order = Order.desc if str(sort_order).lower() == "desc" else Order.asc
+
+	query = get_ticket_query(event, filters).select(
+		EventTicket.name,
+		EventTicket.attendee_name,
+		EventTicket.attendee_email,
+		EventTicket.booking,
+		EventTicket.ticket_type,
+	)
 
-	# Get custom fields configuration
-	custom_fields = get_custom_fields_for_event(event)
-	custom_field_names = [cf.fieldname for cf in custom_fields]
+	if sort_by == "booking_user":
+		query = query.left_join(EventBooking).on(EventBooking.name == EventTicket.booking)
+		query = query.orderby(EventBooking.user, order=order)
+	elif sort_by == "ticket_type":
+		# Rows show the ticket type's title, so sort by it rather than by its id
+		query = query.left_join(EventTicketType).on(EventTicketType.name == EventTicket.ticket_type)
+		query = query.orderby(EventTicketType.title, order=order)
+	elif sort_by != "ticket_id":
+		query = query.orderby(getattr(EventTicket, SORT_FIELDS[sort_by]), order=order)
+
+	if after:
+		if sort_by != "ticket_id":
+			frappe.throw(_("A cursor can only be used when sorting by Ticket ID"))
+		query = query.where(EventTicket.name < after if order == Order.desc else EventTicket.name > after)
+
+	# Ticket id last, so that rows with equal sort values keep a stable order across pages
+	query = query.orderby(EventTicket.name, order=order)
+	if limit:
+		query = query.limit(limit).offset(start)
+
+	return query.run(as_dict=True)
+
+
+def get_ticket_query(event, filters=None):
+	"""Base query on the event's submitted tickets, with the row filters pushed down as subqueries."""
+	filters = filters or {}
+
+	EventTicket = frappe.qb.DocType("Event Ticket")
+	AdditionalField = frappe.qb.DocType("Additional Field")
+	TicketAddonValue = frappe.qb.DocType("Ticket Add-on Value")
+	UTMParameter = frappe.qb.DocType("UTM Parameter")
+
+	query = frappe.qb.from_(EventTicket).where(EventTicket.event == event).where(EventTicket.docstatus == 1)
+
+	if filters.get("ticket_type"):
+		query = query.where(EventTicket.ticket_type == filters.get("ticket_type"))
+
+	if filters.get("add_on"):
+		add_on_tickets = (
+			frappe.qb.from_(TicketAddonValue)
+			.select(TicketAddonValue.parent)
+			.where(TicketAddonValue.parenttype == "Event Ticket")
+			.where(TicketAddonValue.add_on == filters.get("add_on"))
+		)
+		if filters.get("add_on_value"):
+			add_on_value = filters.get("add_on_value")
+			add_on_tickets = add_on_tickets.where(TicketAddonValue.value.like(f"%{add_on_value}%"))
+		query = query.where(EventTicket.name.isin(add_on_tickets))
+
+	if filters.get("custom_field") and filters.get("custom_field_value"):
+		# Custom field values are shown from the ticket or else its booking, so match either
+		def parents_with_value(parenttype):
+			return (
+				frappe.qb.from_(AdditionalField)
+				.select(AdditionalField.parent)
+				.where(AdditionalField.parenttype == parenttype)
+				.where(AdditionalField.fieldname == filters.get("custom_field"))
+				.where(AdditionalField.value.like(f"%{filters.get('custom_field_value')}%"))
+			)
+
+		query = query.where(
+			EventTicket.name.isin(parents_with_value("Event Ticket"))
+			| EventTicket.booking.isin(parents_with_value("Event Booking"))
+		)
+
+	if filters.get("utm_name") and filters.get("utm_value"):
+		utm_bookings = (
+			frappe.qb.from_(UTMParameter)
+			.select(UTMParameter.parent)
+			.where(UTMParameter.parenttype == "Event Booking")
+			.where(UTMParameter.utm_name == filters.get("utm_name"))
+			.where(UTMParameter.value.like(f"%{filters.get('utm_value')}%"))
+		)
+		query = query.where(EventTicket.booking.isin(utm_bookings))
+
+	return query
 
-	# Get add-ons configuration
+
+def get_row_config(event):
+	"""Event level lookups shared by the columns and every row: ticket types and dynamic columns."""
+	custom_fields = get_custom_fields_for_event(event)
 	add_ons = get_add_ons_for_event(event)
-	add_on_names = [addon.name for addon in add_ons]
+	return frappe._dict(
+		ticket_type_map=get_ticket_type_map(event),
+		custom_fields=custom_fields,
+		custom_field_names=[cf.fieldname for cf in custom_fields],
+		add_ons=add_ons,
+		add_on_names=[addon.name for addon in add_ons],
+		utm_params=get_utm_params_for_event(event),
+	)
 
-	# Get UTM params
-	utm_params = get_utm_params_for_event(event)
+
+def build_rows(tickets, config):
+	"""Build one wide row per ticket, fetching the side tables of just these tickets."""
+	booking_ids = list(set([t.booking for t in tickets if t.booking]))
+	booking_map = get_booking_map(booking_ids)
 
 	# Get ticket additional fields
 	ticket_ids = [t.name for t in tickets]
@@ -154,23 +314,23 @@ def get_data(filters, columns):
 			"attendee_name": ticket.attendee_name,
 			"attendee_email": ticket.attendee_email,
 			"booking_id": ticket.booking,
-			"ticket_type": ticket_type_map.get(str(ticket.ticket_type), ticket.ticket_type),
+			"ticket_type": config.ticket_type_map.get(str(ticket.ticket_type), ticket.ticket_type),
 			"booking_user": booking_map.get(ticket.booking, {}).get("user", ""),
 		}
 
 		# Add custom field values (ticket takes priority over booking)
-		for cf_name in custom_field_names:
+		for cf_name in config.custom_field_names:
 			ticket_cf_value = ticket_additional_fields.get(ticket.name, {}).get(cf_name)
 			booking_cf_value = booking_additional_fields.get(ticket.booking, {}).get(cf_name)
 			row[f"cf_{cf_name}"] = ticket_cf_value or booking_cf_value or ""
 
 		# Add add-on values
-		for addon_name in add_on_names:
+		for addon_name in config.add_on_names:
 			addon_value = ticket_add_ons.get(ticket.name, {}).get(addon_name)
 			row[f"addon_{addon_name}"] = addon_value or ""
 
 		# Add UTM parameter values
-		for utm in utm_params:
+		for utm in config.utm_params:
 			utm_value = booking_utm_params.get(ticket.booking, {}).get(utm)
 			row[f"utm_{utm}"] = utm_value or ""
 
@@ -179,15 +339,107 @@ def get_data(filters, columns):
 	return data
 
 
-def get_custom_fields_for_event(event):
-	return frappe.get_all(
-		"Buzz Custom Field",
-		filters={"event": event, "enabled": 1},
-		fields=["fieldname", "label", "applied_to"],
-		order_by="order asc",
+def iter_rows(event, filters=None, page_size=EXPORT_PAGE_SIZE, config=None):
+	"""Yield report rows a page of tickets at a time, so memory does not grow with the event."""
+	config = config or get_row_config(event)
+	after = None
+	while tickets := get_tickets(event, filters=filters, after=after, limit=page_size):
+		yield from build_rows(tickets, config)
+		after = tickets[-1].name
+
+
+@frappe.whitelist()
+def export_registrations(event, file_format="CSV", filters=None):
+	"""Queue an export of the full report, the file is announced to the user when ready."""
+	frappe.only_for(["Event Manager", "System Manager"])
+	if file_format not in ("CSV", "Excel"):
+		frappe.throw(_("Unsupported export format {0}").format(file_format))
+
+	frappe.enqueue(
+		"buzz.ticketing.report.detailed_event_registrations.detailed_event_registrations.build_export",
+		queue="long",
+		timeout=60 * 60,
+		job_id=f"export_registrations::{event}::{file_format}::{frappe.session.user}",
+		deduplicate=True,
+		event=event,
+		file_format=file_format,
+		user=frappe.session.user,
+		filters=frappe.parse_json(filters),
+	)
+
+
+def build_export(event, file_format, user, filters=None):
+	"""Write the report to a private file row by row and notify `user` of its url."""
+	config = get_row_config(event)
+	columns = get_columns({"event": event}, config)
+	fieldnames = [column["fieldname"] for column in columns]
+	header = [column["label"] for column in columns]
+
+	file_name = "{}-registrations-{}.{}".format(
+		frappe.scrub(str(event)), frappe.generate_hash(length=8), "csv" if file_format == "CSV" else "xlsx"
+	)
+	path = frappe.get_site_path("private", "files", file_name)
+	rows = (
+		[row.get(fieldname) for fieldname in fieldnames] for row in iter_rows(event, filters, config=config)
+	)
+
+	if file_format == "CSV":
+		write_csv(path, header, rows)
+	else:
+		write_xlsx(path, header, rows)
+
+	export_file = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{file_name}",
+			"is_private": 1,
+			# Hashed here in chunks, File would otherwise read the whole export into memory
+			"content_hash": get_file_hash(path),
+			"attached_to_doctype": "Buzz Event",
+			"attached_to_name": event,
+		}
+	).insert(ignore_permissions=True)
+	frappe.db.commit()
+
+	frappe.publish_realtime(
+		"buzz_registrations_export",
+		{"event": event, "file_url": export_file.file_url},
+		user=user,
 	)
 
 
+def get_file_hash(path):
+	file_hash = hashlib.md5(usedforsecurity=False)
+	with open(path, "rb") as f:
+		while chunk := f.read(1024 * 1024):
+			file_hash.update(chunk)
+	return file_hash.hexdigest()
+
+
+def write_csv(path, header, rows):
+	with open(path, "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow(header)
+		writer.writerows(rows)
+
+
+def write_xlsx(path, header, rows):
+	from openpyxl import Workbook
+
+	# A write-only workbook streams rows to disk instead of keeping the sheet in memory
+	workbook = Workbook(write_only=True)
+	sheet = workbook.create_sheet(_("Registrations"))
+	sheet.append(header)
+	for row in rows:
+		sheet.append(row)
+	workbook.save(path)
+
+
+def get_custom_fields_for_event(event):
+	return get_custom_field_definitions(event)
+
+
 def get_add_ons_for_event(event):
 	return frappe.get_all(
 		"Ticket Add-on",
@@ -1,10 +1,15 @@
 # Copyright (c) 2025, BWH Studios and Contributors
 # See license.txt
 
+import csv
+import os
+from unittest.mock import patch
+
 import frappe
 from frappe.tests import IntegrationTestCase
 
 from buzz.ticketing.report.detailed_event_registrations.detailed_event_registrations import (
+	build_export,
 	execute,
 	get_add_ons_for_event,
 	get_booking_additional_fields,
@@ -13,10 +18,12 @@ from buzz.ticketing.report.detailed_event_registrations.detailed_event_registrat
 	get_columns,
 	get_custom_fields_for_event,
 	get_data,
+	get_registrations,
 	get_ticket_add_ons,
 	get_ticket_additional_fields,
 	get_ticket_type_map,
 	get_utm_params_for_event,
+	iter_rows,
 )
 
 
@@ -826,3 +833,123 @@ class TestDetailedEventRegistrationsReport(IntegrationTestCase):
 		# Clean up
 		custom_field.delete()
 		add_on.delete()
+
+	# ==================== Test paginated registrations ====================
+
+	def test_get_registrations_filters_in_query(self):
+		"""Test that ticket type, add-on and UTM filters select the matching tickets."""
+		add_on = self._create_ticket_add_on("Filter Size")
+		attendee_add_on = frappe.get_doc(
+			{"doctype": "Attendee Ticket Add-on", "add_ons": [{"add_on": add_on.name, "value": "XL"}]}
+		).insert()
+
+		vip_booking = self._create_booking_with_tickets(
+			attendees_data=[
+				{
+					"full_name": "Filter VIP",
+					"email": "filter-vip@test.com",
+					"ticket_type": self.test_ticket_type_vip.name,
+					"add_ons": attendee_add_on.name,
+				}
+			],
+			utm_parameters=[{"utm_name": "utm_source", "value": "filter-newsletter"}],
+		)
+		self._create_booking_with_tickets()
+		vip_ticket = self._get_ticket_for_booking(vip_booking.name)
+
+		for filters in (
+			{"ticket_type": self.test_ticket_type_vip.name},
+			{"add_on": add_on.name, "add_on_value": "X"},
+			{"utm_name": "utm_source", "utm_value": "newsletter"},
+		):
+			result = get_registrations(self.test_event.name, filters=filters, page_length=500)
+			ticket_ids = [row["ticket_id"] for row in result["data"]]
+			self.assertIn(vip_ticket.name, ticket_ids)
+			self.assertEqual(result["total_count"], len(ticket_ids))
+
+		result = get_registrations(self.test_event.name, filters={"add_on": add_on.name, "add_on_value": "S"})
+		self.assertEqual(result["data"], [])
+
+		add_on.delete()
+
+	def test_get_registrations_pages_with_cursor_and_offset(self):
+		"""Test that cursor and offset pagination walk the same sorted rows."""
+		self._create_booking_with_tickets(
+			attendees_data=[
+				{
+					"full_name": f"Page {i}",
+					"email": f"page{i}@test.com",
+					"ticket_type": self.test_ticket_type.name,
+				}
+				for i in range(5)
+			]
+		)
+
+		total = get_registrations(self.test_event.name, page_length=1)["total_count"]
+
+		by_cursor, cursor = [], None
+		while True:
+			page = get_registrations(self.test_event.name, page_length=2, cursor=cursor)
+			by_cursor += [row["ticket_id"] for row in page["data"]]
+			if not (cursor := page["next_cursor"]):
+				break
+
+		by_offset = []
+		for start in range(0, total, 2):
+			page = get_registrations(self.test_event.name, page_length=2, start=start)
+			by_offset += [row["ticket_id"] for row in page["data"]]
+
+		self.assertEqual(by_cursor, sorted(by_cursor))
+		self.assertEqual(by_cursor, by_offset)
+		self.assertEqual(len(by_cursor), total)
+
+		names = [
+			row["attendee_name"]
+			for row in get_registrations(
+				self.test_event.name, sort_by="attendee_name", sort_order="desc", page_length=500
+			)["data"]
+		]
+		self.assertEqual(names, sorted(names, key=str.casefold, reverse=True))
+
+	# ==================== Test streaming export ====================
+
+	def test_iter_rows_pages_through_all_tickets(self):
+		"""Test that paging through tickets in keyset order yields the same rows as the full report."""
+		self._create_booking_with_tickets(
+			attendees_data=[
+				{
+					"full_name": f"Paged {i}",
+					"email": f"paged{i}@test.com",
+					"ticket_type": self.test_ticket_type.name,
+				}
+				for i in range(5)
+			]
+		)
+
+		columns = get_columns({"event": self.test_event.name})
+		data = get_data({"event": self.test_event.name}, columns)
+
+		paged = list(iter_rows(self.test_event.name, page_size=2))
+		by_ticket = lambda row: row["ticket_id"]  # noqa: E731
+		self.assertEqual(sorted(paged, key=by_ticket), sorted(data, key=by_ticket))
+
+	@patch("frappe.publish_realtime")
+	@patch("frappe.db.commit")
+	def test_build_export_writes_csv_file(self, mock_commit, mock_publish_realtime):
+		"""Test that the background export writes every ticket to a private file and announces it."""
+		booking = self._create_booking_with_tickets()
+		ticket = self._get_ticket_for_booking(booking.name)
+
+		build_export(self.test_event.name, "CSV", "Administrator")
+
+		file_url = mock_publish_realtime.call_args.args[1]["file_url"]
+		export_file = frappe.get_doc("File", {"file_url": file_url})
+		self.assertTrue(export_file.is_private)
+
+		path = export_file.get_full_path()
+		with open(path, newline="", encoding="utf-8") as f:
+			rows = list(csv.reader(f))
+		os.remove(path)
+
+		self.assertEqual(rows[0][0], "Ticket ID")
+		self.assertIn(ticket.name, [row[0] for row in rows[1:]])
@@ -37,6 +37,15 @@ def only_if_app_installed(app_name: str, raise_exception: bool = False) -> Calla
 	return decorator
 
 
+def get_affected_rows() -> int:
+	"""Return the number of rows changed by the last UPDATE/DELETE on this connection.
+
+	Used with conditional updates (`UPDATE ... WHERE <guard>`) to know whether the
+	guard held, without taking an explicit row lock first.
+	"""
+	return frappe.db._cursor.rowcount or 0
+
+
 def add_buzz_user_role(doc, event=None):
 	doc.add_roles("Buzz User")
 
@@ -85,58 +94,6 @@ def delete_custom_fields(custom_fields):
 			frappe.clear_cache(doctype=doctype)
 
 
-def make_qr_image(data: str) -> bytes:
-	"""
-	Generate QR code image bytes from data string.
-
-	:param data: The data to encode in the QR code
-	:return: PNG image as bytes
-	"""
-	import io
-
-	import qrcode
-	from qrcode.image.styledpil import StyledPilImage
-	from qrcode.image.styles.moduledrawers.pil import HorizontalBarsDrawer
-
-	qr = qrcode.QRCode(
-		version=1,
-		error_correction=qrcode.constants.ERROR_CORRECT_H,
-		box_size=10,
-		border=4,
-	)
-	qr.add_data(data)
-	qr.make(fit=True)
-
-	img = qr.make_image(image_factory=StyledPilImage, module_drawer=HorizontalBarsDrawer())
-	output = io.BytesIO()
-	img.save(output, format="PNG")
-	return output.getvalue()
-
-
-def generate_qr_code_file(doc, data: str, field_name: str = "qr_code", file_prefix: str = "qr-code") -> str:
-	"""
-	Generate QR code image and attach as File to a document.
-
-	:param doc: The Frappe document to attach the QR code to
-	:param data: The data to encode in the QR code
-	:param field_name: The field name to attach the file to (default: "qr_code")
-	:param file_prefix: Prefix for the file name (default: "qr-code")
-	:return: The file URL of the created QR code image
-	"""
-	qr_data = make_qr_image(data)
-	qr_code_file = frappe.get_doc(
-		{
-			"doctype": "File",
-			"content": qr_data,
-			"attached_to_doctype": doc.doctype,
-			"attached_to_name": doc.name,
-			"attached_to_field": field_name,
-			"file_name": f"{file_prefix}-{doc.name}.png",
-		}
-	).save(ignore_permissions=True)
-	return qr_code_file.file_url
-
-
 def build_event_datetimes(event_doc):
 	from datetime import datetime, timedelta
 
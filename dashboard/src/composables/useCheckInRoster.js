@@ -0,0 +1,131 @@
+import { createResource } from "frappe-ui";
+import { ref } from "vue";
+
+// Roster of the selected event, so scans can be validated on the device
+const ROSTER_SYNC_INTERVAL_MS = 30 * 1000;
+
+const rosterEvent = ref(null);
+const rosterVersion = ref(null);
+const roster = new Map();
+const ticketTypes = ref({});
+let syncTimer = null;
+// Public key of the site, to check signed QR codes without the server
+let verificationKey = null;
+
+const rosterResource = createResource({
+	url: "buzz.api.get_checkin_roster",
+	onSuccess: (data) => {
+		// The scanner moved on to another event meanwhile
+		if (String(data.event) !== String(rosterEvent.value)) return;
+
+		if (data.full) {
+			roster.clear();
+			ticketTypes.value = data.ticket_types;
+		}
+		data.tickets.forEach((ticket) => roster.set(String(ticket.id), ticket));
+		rosterVersion.value = data.version;
+	},
+});
+
+// base64url, as used by signed ticket tokens
+const decode = (data) =>
+	Uint8Array.from(atob(data.replace(/-/g, "+").replace(/_/g, "/")), (char) => char.charCodeAt(0));
+
+const verificationKeyResource = createResource({
+	url: "buzz.api.get_ticket_verification_key",
+	onSuccess: async (key) => {
+		try {
+			verificationKey = await crypto.subtle.importKey(
+				"raw",
+				decode(key),
+				{ name: "Ed25519" },
+				false,
+				["verify"]
+			);
+		} catch {
+			// Browsers without Ed25519 (or insecure contexts) leave token scans unverified
+			verificationKey = null;
+		}
+	},
+});
+
+const syncRoster = () => {
+	if (!rosterEvent.value || rosterResource.loading || !navigator.onLine) return;
+	rosterResource.submit({ event: rosterEvent.value, since: rosterVersion.value });
+};
+
+// Signed QR codes carry the ticket id as the first claim, trusted only once the signature checks out
+const readTicketId = async (data) => {
+	if (!data.startsWith("BZ1.")) return { id: data, verified: true };
+	try {
+		const [, claims, signature] = data.split(".");
+		const id = new TextDecoder().decode(decode(claims)).split("|")[0];
+		if (!verificationKey) return { id, verified: false };
+
+		const verified = await crypto.subtle.verify(
+			"Ed25519",
+			verificationKey,
+			decode(signature),
+			decode(claims)
+		);
+		return verified ? { id, verified } : { error: __("Invalid ticket QR code") };
+	} catch {
+		return { error: __("Invalid ticket QR code") };
+	}
+};
+
+export function useCheckInRoster() {
+	const loadRoster = (event) => {
+		unloadRoster();
+		rosterEvent.value = event;
+		if (!verificationKey && !verificationKeyResource.loading) verificationKeyResource.fetch();
+		syncRoster();
+		syncTimer = setInterval(syncRoster, ROSTER_SYNC_INTERVAL_MS);
+	};
+
+	const unloadRoster = () => {
+		clearInterval(syncTimer);
+		rosterEvent.value = null;
+		rosterVersion.value = null;
+		roster.clear();
+	};
+
+	// Local verdict for a scan, or null when the roster can't tell. A match is `unverified` when
+	// the QR signature could not be checked on the device, so it must not be taken as a check-in.
+	const lookupTicket = async (data) => {
+		if (!rosterVersion.value) return null;
+
+		const { id, verified, error } = await readTicketId(data);
+		if (error) return { error };
+
+		const ticket = roster.get(String(id));
+		const unverified = !verified;
+		if (!ticket) return { unverified, error: __("Ticket not found") };
+		if (ticket.cancelled) {
+			return {
+				ticket,
+				unverified,
+				error: __("This ticket has been cancelled and cannot be checked in"),
+			};
+		}
+		if (ticket.checked_in) {
+			return { ticket, unverified, error: __("This ticket was already checked in today.") };
+		}
+		return { ticket, unverified };
+	};
+
+	const markCheckedIn = (ticketId) => {
+		const ticket = roster.get(String(ticketId));
+		if (ticket) ticket.checked_in = true;
+	};
+
+	return {
+		rosterEvent,
+		rosterVersion,
+		ticketTypes,
+		loadRoster,
+		unloadRoster,
+		lookupTicket,
+		markCheckedIn,
+	};
+}
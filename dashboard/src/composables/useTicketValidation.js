@@ -1,7 +1,8 @@
-import { createResource, toast } from "frappe-ui";
+import { createResource, dayjsLocal, toast } from "frappe-ui";
 import { ref } from "vue";
 import beepFailSound from "../assets/audio/beep-fail.wav";
 import beepSound from "../assets/audio/beep.wav";
+import { useCheckInRoster } from "./useCheckInRoster.js";
 
 let ticketValidationState = null;
 
@@ -10,6 +11,17 @@ const isCheckingIn = ref(false);
 const validationResult = ref(null);
 const showTicketModal = ref(false);
 
+// Scans taken while offline, kept across reloads until they are synced
+const PENDING_SCANS_KEY = "buzz:pending_checkins";
+const MAX_SYNC_BATCH = 500;
+const pendingScans = ref(JSON.parse(localStorage.getItem(PENDING_SCANS_KEY) || "[]"));
+
+const { rosterEvent, lookupTicket, markCheckedIn } = useCheckInRoster();
+
+const savePendingScans = () => {
+	localStorage.setItem(PENDING_SCANS_KEY, JSON.stringify(pendingScans.value));
+};
+
 let lastToastMessage = null;
 let lastToastTime = 0;
 const TOAST_DEBOUNCE_MS = 500;
@@ -77,21 +89,98 @@ const checkInResource = createResource({
 		validationResult.value = data;
 		showTicketModal.value = false;
 		isCheckingIn.value = false;
+
+		markCheckedIn(data.ticket.id);
 	},
 	onError: (error) => {
 		isCheckingIn.value = false;
 	},
 });
 
+// Batch check-in of buffered scans
+const syncCheckInsResource = createResource({
+	url: "buzz.api.sync_checkins",
+	onSuccess: (data) => {
+		const synced = new Set(data.results.map((result) => result.client_id));
+		pendingScans.value = pendingScans.value.filter((scan) => !synced.has(scan.client_id));
+		savePendingScans();
+
+		const checkedIn = data.results.filter((result) => result.status === "checked_in").length;
+		const failed = data.results.filter(
+			(result) => !["checked_in", "already_checked_in"].includes(result.status)
+		);
+		toast.success(__("Synced {0} offline check-ins", [checkedIn]));
+		failed.forEach((result) => toast.error(`${result.ticket_id}: ${result.message}`));
+
+		// Continue with the next batch, if any
+		syncPendingScans();
+	},
+});
+
+const syncPendingScans = () => {
+	if (!pendingScans.value.length || syncCheckInsResource.loading || !navigator.onLine) return;
+
+	// Each batch is checked against the event its scans were taken at
+	const event = pendingScans.value[0].event;
+	const scans = pendingScans.value.filter((scan) => scan.event === event).slice(0, MAX_SYNC_BATCH);
+	syncCheckInsResource.submit({ scans, event });
+};
+
+const queueOfflineScan = async (ticketId) => {
+	// With the event's roster loaded, bad scans are turned away on the spot
+	const local = await lookupTicket(ticketId);
+	if (local?.error) {
+		playErrorSound();
+		showDebouncedToast(local.error);
+		return;
+	}
+
+	pendingScans.value.push({
+		client_id: `${Date.now()}-${Math.random().toString(36).slice(2, 10)}`,
+		ticket_id: ticketId,
+		event: rosterEvent.value,
+		scanned_at: dayjsLocal().format("YYYY-MM-DD HH:mm:ss"),
+	});
+	savePendingScans();
+	playSuccessSound();
+
+	// A QR code whose signature could not be checked is only confirmed by the sync
+	if (local && !local.unverified) {
+		markCheckedIn(local.ticket.id);
+		showDebouncedToast(
+			__("Checked in {0}, will sync when back online", [local.ticket.attendee_name]),
+			"success"
+		);
+		return;
+	}
+	showDebouncedToast(__("Saved offline, will check in when back online"), "success");
+};
+
+window.addEventListener("online", syncPendingScans);
+syncPendingScans();
+
 export function useTicketValidation() {
 	if (ticketValidationState) {
 		return ticketValidationState;
 	}
 
 	// Methods
-	const validateTicket = (ticketId) => {
+	const validateTicket = async (ticketId) => {
+		if (!navigator.onLine) {
+			queueOfflineScan(ticketId);
+			return;
+		}
+
+		// Tickets the roster knows are cancelled or used today need no round trip
+		const local = await lookupTicket(ticketId);
+		if (local?.ticket && local.error) {
+			playErrorSound();
+			showDebouncedToast(local.error);
+			return;
+		}
+
 		isProcessingTicket.value = true;
-		validateTicketResource.submit({ ticket_id: ticketId });
+		validateTicketResource.submit({ ticket_id: ticketId, event: rosterEvent.value });
 	};
 
 	const checkInTicket = () => {
@@ -118,12 +207,14 @@ export function useTicketValidation() {
 		isCheckingIn,
 		validationResult,
 		showTicketModal,
+		pendingScans,
 
 		// Methods
 		validateTicket,
 		checkInTicket,
 		clearResults,
 		closeModal,
+		syncPendingScans,
 	};
 
 	return ticketValidationState;